@@ -10,9 +10,17 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 import requests
+import hashlib
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 load_dotenv()
 
+# Concurrent GPT calls when prefetching issue recommendations
+DASHBOARD_MAX_CONCURRENT_GPT = int(os.getenv("DASHBOARD_MAX_CONCURRENT_GPT", 5))
+
 # Page configuration
 st.set_page_config(
     page_title="Smart Property Management Dashboard", 
@@ -169,6 +177,40 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Persistent GPT memoization - survives reruns, sessions and restarts
+@st.cache_resource
+def get_gpt_memo_cache():
+    """Open the on-disk cache for dashboard GPT answers (None if the core system is unavailable)"""
+    try:
+        from unified_property_management import PersistentCache, DATA_DIR
+    except ImportError:
+        return None
+    return PersistentCache(os.path.join(DATA_DIR, "dashboard_gpt_cache.db"), ttl_seconds=30 * 24 * 3600)
+
+def gpt_memo_key(kind, issue_key, problem, place, guest_comment):
+    """Cache key: answer kind + issue type + hash of the issue (problem, location/category) and guest comment.
+    
+    One comment often yields several issues, so the comment alone does not identify an answer.
+    """
+    issue = "\x1f".join(str(part or "").strip() for part in (problem, place, guest_comment))
+    issue_hash = hashlib.sha256(issue.encode('utf-8')).hexdigest()
+    return f"{kind}:{issue_key}:{issue_hash}"
+
+def post_openai_chat(api_key, payload, timeout):
+    """POST a chat completion through the pipeline's shared rate limiter and pooled HTTP client. Returns (status, json or None)."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    try:
+        from unified_property_management import OPENAI_RATE_LIMITER
+    except ImportError:
+        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=timeout)
+        return response.status_code, response.json() if response.status_code == 200 else None
+    
+    return OPENAI_RATE_LIMITER.post_chat_sync(headers, payload, timeout)
+
 # Enhanced GPT-4 Recommendation Generator (simplified for dashboard)
 def generate_gpt_recommendations(issue_type, problem, location_or_category, severity_or_urgency, guest_comment):
     """Generate intelligent recommendations using GPT-4 intelligence"""
@@ -177,27 +219,32 @@ def generate_gpt_recommendations(issue_type, problem, location_or_category, seve
     if not api_key:
         return ["API key not configured"]
     
+    memo_cache = get_gpt_memo_cache()
+    memo_key = gpt_memo_key("recommendations", issue_type, problem, location_or_category, guest_comment)
+    if memo_cache is not None:
+        cached = memo_cache.get(memo_key)
+        if cached is not None:
+            return cached
+    
     if issue_type == "cleaning":
         prompt = f"""You are an expert cleaning supervisor. A guest complained:
 
 GUEST COMPLAINT: "{guest_comment}"
+ISSUE: {problem} ({location_or_category})
 
 Provide 5-6 specific cleaning recommendations to fix this exact issue. Be practical and actionable."""
     else:
         prompt = f"""You are an expert maintenance technician. A guest complained:
 
 GUEST COMPLAINT: "{guest_comment}"
+ISSUE: {problem} ({location_or_category})
 
 Provide 5-6 specific troubleshooting steps to fix this exact issue. Be practical and actionable."""
     
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
+        status, result = post_openai_chat(
+            api_key,
+            {
                 "model": "gpt-4",
                 "messages": [
                     {
@@ -215,8 +262,7 @@ Provide 5-6 specific troubleshooting steps to fix this exact issue. Be practical
             timeout=30
         )
         
-        if response.status_code == 200:
-            result = response.json()
+        if status == 200:
             gpt_response = result["choices"][0]["message"]["content"].strip()
             
             # Extract recommendations
@@ -233,7 +279,10 @@ Provide 5-6 specific troubleshooting steps to fix this exact issue. Be practical
                     if clean_line:
                         recommendations.append(clean_line)
             
-            return recommendations[:7] if recommendations else ["Address the guest's specific concern"]
+            recommendations = recommendations[:7] if recommendations else ["Address the guest's specific concern"]
+            if memo_cache is not None:
+                memo_cache.set(memo_key, recommendations)
+            return recommendations
             
     except Exception as e:
         print(f"Error generating recommendations: {e}")
@@ -241,16 +290,24 @@ Provide 5-6 specific troubleshooting steps to fix this exact issue. Be practical
     # Simple fallback
     return [f"Address the {issue_type} issue mentioned by guest"]
 
-def get_gpt_time_cost_estimates(category, severity, guest_comment):
+def get_gpt_time_cost_estimates(category, severity, guest_comment, problem=""):
     """Get intelligent time and cost estimates using GPT-4"""
     
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         return "1-2 hours", "$50-150"
     
+    memo_cache = get_gpt_memo_cache()
+    memo_key = gpt_memo_key("estimates", category, problem, category, guest_comment)
+    if memo_cache is not None:
+        cached = memo_cache.get(memo_key)
+        if cached is not None:
+            return tuple(cached)
+    
     prompt = f"""Based on this guest complaint, provide realistic estimates:
 
 GUEST COMPLAINT: "{guest_comment}"
+ISSUE: {problem}
 CATEGORY: {category}
 
 Provide in this format:
@@ -258,13 +315,9 @@ TIME: [range like "30 minutes - 2 hours"]
 COST: [range like "$25-100"]"""
     
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
+        status, result = post_openai_chat(
+            api_key,
+            {
                 "model": "gpt-4",
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": 0.2,
@@ -273,8 +326,7 @@ COST: [range like "$25-100"]"""
             timeout=15
         )
         
-        if response.status_code == 200:
-            result = response.json()
+        if status == 200:
             gpt_response = result["choices"][0]["message"]["content"].strip()
             
             # Parse response
@@ -287,6 +339,8 @@ COST: [range like "$25-100"]"""
                 elif 'COST:' in line.upper():
                     cost_estimate = line.split(':', 1)[1].strip()
             
+            if memo_cache is not None:
+                memo_cache.set(memo_key, [time_estimate, cost_estimate])
             return time_estimate, cost_estimate
             
     except Exception as e:
@@ -294,18 +348,119 @@ COST: [range like "$25-100"]"""
     
     return "1-2 hours", "$50-150"
 
+def prefetch_issue_insights(issue_jobs):
+    """Run every issue's GPT helpers concurrently and yield (index, results) as each issue completes.
+    
+    issue_jobs is a list with one dict per issue, mapping a result name to a zero-argument callable.
+    """
+    ctx = get_script_run_ctx()
+    results = [{} for _ in issue_jobs]
+    remaining = [len(jobs) for jobs in issue_jobs]
+    
+    with ThreadPoolExecutor(
+        max_workers=DASHBOARD_MAX_CONCURRENT_GPT,
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    ) as executor:
+        futures = {}
+        for idx, jobs in enumerate(issue_jobs):
+            for name, job in jobs.items():
+                futures[executor.submit(job)] = (idx, name)
+        
+        for future in as_completed(futures):
+            idx, name = futures[future]
+            results[idx][name] = future.result()
+            remaining[idx] -= 1
+            if remaining[idx] == 0:
+                yield idx, results[idx]
+
+def render_cleaning_issue(issue, recommendations):
+    """Expander with details and AI recommendations for one cleaning issue"""
+    severity_emoji = "🚨" if issue['Severity'] == 'High' else "⚠️" if issue['Severity'] == 'Medium' else "ℹ️"
+    
+    with st.expander(f"{severity_emoji} {issue['Property']} - {issue['Location'].title()} ({issue['Severity']} Priority)", expanded=issue['Severity'] == 'High'):
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            st.markdown("**Issue Details:**")
+            st.write(f"**Property:** {issue['Property']}")
+            st.write(f"**Problem:** {issue['Problem']}")
+            st.write(f"**Location:** {issue['Location'].title()}")
+            st.write(f"**Severity:** {issue['Severity']}")
+            if issue.get('Reported By', 1) > 1:
+                st.write(f"**Reported By:** {issue['Reported By']} guests")
+            st.markdown("**Real Guest Comment:**")
+            st.info(f"\"{issue['Guest Comment']}\"")
+        
+        with col2:
+            st.markdown("**AI Cleaning Recommendations:**")
+            for i, rec in enumerate(recommendations, 1):
+                st.write(f"**{i}.** {rec}")
+            
+            # Add time estimates
+            time_estimate = "30-45 minutes" if issue['Severity'] == 'High' else "15-30 minutes" if issue['Severity'] == 'Medium' else "10-15 minutes"
+            st.success(f"⏱️ **Estimated Time:** {time_estimate}")
+            
+            # Add priority level
+            if issue['Severity'] == 'High':
+                st.error("🚨 **Priority:** Address Today")
+            elif issue['Severity'] == 'Medium':
+                st.warning("⚠️ **Priority:** Address Within 2 Days")
+            else:
+                st.info("ℹ️ **Priority:** Address This Week")
+
+def render_maintenance_issue(issue, recommendations, time_estimate, cost_estimate):
+    """Expander with details, AI recommendations and estimates for one maintenance issue"""
+    urgency_emoji = "⚡" if issue['Urgency'] == 'Urgent' else "🔜" if issue['Urgency'] == 'Soon' else "📅"
+    severity_emoji = "🚨" if issue['Severity'] == 'High' else "⚠️" if issue['Severity'] == 'Medium' else "ℹ️"
+    
+    with st.expander(f"{urgency_emoji} {severity_emoji} {issue['Property']} - {issue['Category']} ({issue['Urgency']})", expanded=issue['Urgency'] == 'Urgent' or issue['Severity'] == 'High'):
+        col1, col2 = st.columns([1, 1])
+        
+        with col1:
+            st.markdown("**Issue Details:**")
+            st.write(f"**Property:** {issue['Property']}")
+            st.write(f"**Category:** {issue['Category']}")
+            st.write(f"**Problem:** {issue['Problem']}")
+            st.write(f"**Urgency:** {issue['Urgency']}")
+            st.write(f"**Severity:** {issue['Severity']}")
+            if issue.get('Reported By', 1) > 1:
+                st.write(f"**Reported By:** {issue['Reported By']} guests")
+            st.markdown("**Real Guest Comment:**")
+            st.info(f"\"{issue['Guest Comment']}\"")
+        
+        with col2:
+            st.markdown("**AI Maintenance Recommendations:**")
+            for i, rec in enumerate(recommendations, 1):
+                st.write(f"**{i}.** {rec}")
+            
+            # Add AI generated estimates
+            st.success(f"⏱️ **AI Time Estimate:** {time_estimate}")
+            st.success(f"💰 **AI Cost Estimate:** {cost_estimate}")
+            
+            # Add urgency level
+            if issue['Urgency'] == 'Urgent':
+                st.error("⚡ **Action Required:** Same Day")
+            elif issue['Urgency'] == 'Soon':
+                st.warning("🔜 **Action Required:** Within 1-2 Days")
+            else:
+                st.info("📅 **Action Required:** Within a Week")
+
 # Initialize session state with enhanced data integration
 def initialize_system():
     """Initialize system and load enhanced data if available"""
     if 'system_initialized' not in st.session_state:
         # Check if we can import the enhanced system
         try:
-            from unified_property_management import UltraFastSmartPropertyManager, EMAIL_CONFIG
+            from unified_property_management import UltraFastSmartPropertyManager, EMAIL_CONFIG, ReviewStore, load_portfolio
             st.session_state.real_system_available = True
+            st.session_state.review_store = ReviewStore()
+            st.session_state.portfolio = load_portfolio()
             st.session_state.email_config = EMAIL_CONFIG
             st.session_state.system_type = "Ultra-Fast Multi-Framework System"
         except ImportError:
             st.session_state.real_system_available = False
+            st.session_state.review_store = None
+            st.session_state.portfolio = None
             st.session_state.email_config = {}
             st.session_state.system_type = "Demo Mode"
         
@@ -314,6 +469,7 @@ def initialize_system():
         st.session_state.detailed_analyses = {}
         st.session_state.pricing_decisions = {}
         st.session_state.real_reviews_data = None
+        st.session_state.review_type_counts = {}
         st.session_state.framework_performance = {
             "smart_ai_analyses": 0,
             "pricing_decisions": 0,
@@ -428,10 +584,25 @@ if st.session_state.real_system_available:
                     status_text.text("Initializing Smart AI system...")
                     progress_bar.progress(5)
                     
+                    # Streamed issues are shown as soon as GPT emits them
+                    streamed_issue_count = {"cleaning_issues": 0, "maintenance_issues": 0}
+                    
+                    def show_streamed_issue(property_name, issue_key, issue):
+                        streamed_issue_count[issue_key] += 1
+                        status_text.text(
+                            f"AI analysis in progress - {streamed_issue_count['cleaning_issues']} cleaning / "
+                            f"{streamed_issue_count['maintenance_issues']} maintenance issues so far "
+                            f"(latest: {property_name} - {issue.get('problem', 'issue')[:60]})"
+                        )
+                    
                     # Run the enhanced system
                     async def run_complete_analysis():
-                        manager = UltraFastSmartPropertyManager()
-                        result = await manager.run_ultra_fast_analysis()
+                        manager = UltraFastSmartPropertyManager(on_issue=show_streamed_issue)
+                        try:
+                            result = await manager.run_ultra_fast_analysis()
+                            await manager.dispatch_outbox()
+                        finally:
+                            await manager.close()
                         return manager, result
                     
                     status_text.text("Scraping real guest reviews from Booking.com...")
@@ -460,11 +631,17 @@ if st.session_state.real_system_available:
                         if result and "error" not in result:
                             st.success("🎉 Complete Smart Analysis & Email Testing Completed Successfully!")
                             
-                            # Load enhanced data into session state
-                            st.session_state.satisfaction_scores = manager.satisfaction_scores
-                            st.session_state.detailed_analyses = manager.detailed_analyses
-                            st.session_state.pricing_decisions = manager.pricing_decisions
-                            st.session_state.real_reviews_data = manager.review_data
+                            # Load enhanced data into session state (the manager keys by listing id, the dashboard shows names)
+                            portfolio = manager.portfolio
+                            st.session_state.satisfaction_scores = portfolio.labelled(manager.satisfaction_scores)
+                            st.session_state.detailed_analyses = portfolio.labelled(manager.detailed_analyses)
+                            st.session_state.pricing_decisions = portfolio.labelled(manager.pricing_decisions)
+                            # Only the newest reviews are loaded; the totals are counted in the review store
+                            recent_reviews = manager.recent_reviews()
+                            st.session_state.real_reviews_data = recent_reviews.assign(
+                                listing=recent_reviews["listing"].map(portfolio.label)
+                            )
+                            st.session_state.review_type_counts = manager.review_store.type_counts(manager.detailed_analyses)
                             st.session_state.framework_performance = result.get('framework_performance', {})
                             st.session_state.last_real_update = datetime.now()
                             
@@ -499,9 +676,10 @@ if st.session_state.real_system_available:
                             
                             # Show system execution summary
                             if st.session_state.real_reviews_data is not None:
-                                total_reviews = len(st.session_state.real_reviews_data)
-                                positive_reviews = len(st.session_state.real_reviews_data[st.session_state.real_reviews_data['type'] == 'positive'])
-                                negative_reviews = len(st.session_state.real_reviews_data[st.session_state.real_reviews_data['type'] == 'negative'])
+                                type_counts = st.session_state.review_type_counts
+                                total_reviews = sum(type_counts.values())
+                                positive_reviews = type_counts.get('positive', 0)
+                                negative_reviews = type_counts.get('negative', 0)
                                 
                                 st.markdown(f"""
                                 <div class="success-box">
@@ -713,7 +891,8 @@ with tab1:
                 "Location": issue.get('location', 'general'),
                 "Problem": issue.get('problem', 'cleaning issue'),
                 "Severity": issue.get('severity', 'Medium'),
-                "Guest Comment": issue.get('guest_comment', '')
+                "Guest Comment": issue.get('guest_comment', ''),
+                "Reported By": issue.get('occurrences', 1)
             })
     
     if all_cleaning_issues:
@@ -750,48 +929,30 @@ with tab1:
         # Detailed cleaning issues with AI recommendations
         st.subheader("Cleaning Issues & AI Recommendations (From Real Comments)")
         
+        # Start every recommendation at once; each expander renders as soon as its answer arrives
+        cleaning_placeholders = []
         for issue in all_cleaning_issues:
-            severity_emoji = "🚨" if issue['Severity'] == 'High' else "⚠️" if issue['Severity'] == 'Medium' else "ℹ️"
-            
-            # Generate AI recommendations based on real guest comment
-            with st.spinner(f"Generating AI recommendations for {issue['Property']}..."):
-                recommendations = generate_gpt_recommendations(
-                    "cleaning", 
-                    issue['Problem'], 
-                    issue['Location'], 
-                    issue['Severity'], 
+            placeholder = st.empty()
+            placeholder.info(f"⏳ Generating AI recommendations for {issue['Property']} - {issue['Location'].title()}...")
+            cleaning_placeholders.append(placeholder)
+        
+        cleaning_jobs = [
+            {
+                "recommendations": partial(
+                    generate_gpt_recommendations,
+                    "cleaning",
+                    issue['Problem'],
+                    issue['Location'],
+                    issue['Severity'],
                     issue['Guest Comment']
                 )
-            
-            # Create expandable section for each issue
-            with st.expander(f"{severity_emoji} {issue['Property']} - {issue['Location'].title()} ({issue['Severity']} Priority)", expanded=issue['Severity'] == 'High'):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown("**Issue Details:**")
-                    st.write(f"**Property:** {issue['Property']}")
-                    st.write(f"**Problem:** {issue['Problem']}")
-                    st.write(f"**Location:** {issue['Location'].title()}")
-                    st.write(f"**Severity:** {issue['Severity']}")
-                    st.markdown("**Real Guest Comment:**")
-                    st.info(f"\"{issue['Guest Comment']}\"")
-                
-                with col2:
-                    st.markdown("**AI Cleaning Recommendations:**")
-                    for i, rec in enumerate(recommendations, 1):
-                        st.write(f"**{i}.** {rec}")
-                    
-                    # Add time estimates
-                    time_estimate = "30-45 minutes" if issue['Severity'] == 'High' else "15-30 minutes" if issue['Severity'] == 'Medium' else "10-15 minutes"
-                    st.success(f"⏱️ **Estimated Time:** {time_estimate}")
-                    
-                    # Add priority level
-                    if issue['Severity'] == 'High':
-                        st.error("🚨 **Priority:** Address Today")
-                    elif issue['Severity'] == 'Medium':
-                        st.warning("⚠️ **Priority:** Address Within 2 Days")
-                    else:
-                        st.info("ℹ️ **Priority:** Address This Week")
+            }
+            for issue in all_cleaning_issues
+        ]
+        
+        for idx, insights in prefetch_issue_insights(cleaning_jobs):
+            with cleaning_placeholders[idx].container():
+                render_cleaning_issue(all_cleaning_issues[idx], insights["recommendations"])
     else:
         if st.session_state.last_real_update:
             st.success("🎉 No cleaning issues detected by AI analysis! All properties meet cleanliness standards.")
@@ -811,7 +972,8 @@ with tab2:
                 "Problem": issue.get('problem', 'maintenance needed'),
                 "Severity": issue.get('severity', 'Medium'),
                 "Urgency": issue.get('urgency', 'Soon'),
-                "Guest Comment": issue.get('guest_comment', '')
+                "Guest Comment": issue.get('guest_comment', ''),
+                "Reported By": issue.get('occurrences', 1)
             })
     
     if all_maintenance_issues:
@@ -851,56 +1013,40 @@ with tab2:
                                                                              'High': 3, 'Medium': 2, 'Low': 1}), 
                                                          ascending=False)
         
-        for _, issue in maintenance_df_sorted.iterrows():
-            urgency_emoji = "⚡" if issue['Urgency'] == 'Urgent' else "🔜" if issue['Urgency'] == 'Soon' else "📅"
-            severity_emoji = "🚨" if issue['Severity'] == 'High' else "⚠️" if issue['Severity'] == 'Medium' else "ℹ️"
-            
-            # Generate AI recommendations
-            with st.spinner(f"Generating AI recommendations for {issue['Property']}..."):
-                recommendations = generate_gpt_recommendations(
-                    "maintenance", 
-                    issue['Problem'], 
-                    issue['Category'], 
-                    issue['Urgency'], 
-                    issue['Guest Comment']
-                )
-                
-                time_estimate, cost_estimate = get_gpt_time_cost_estimates(
-                    issue['Category'], 
-                    issue['Severity'], 
+        sorted_maintenance_issues = maintenance_df_sorted.to_dict('records')
+        
+        # Start every recommendation and estimate at once; render each issue when both arrive
+        maintenance_placeholders = []
+        for issue in sorted_maintenance_issues:
+            placeholder = st.empty()
+            placeholder.info(f"⏳ Generating AI recommendations for {issue['Property']} - {issue['Category']}...")
+            maintenance_placeholders.append(placeholder)
+        
+        maintenance_jobs = [
+            {
+                "recommendations": partial(
+                    generate_gpt_recommendations,
+                    "maintenance",
+                    issue['Problem'],
+                    issue['Category'],
+                    issue['Urgency'],
                     issue['Guest Comment']
+                ),
+                "estimates": partial(
+                    get_gpt_time_cost_estimates,
+                    issue['Category'],
+                    issue['Severity'],
+                    issue['Guest Comment'],
+                    issue['Problem']
                 )
-            
-            # Create expandable section for each issue
-            with st.expander(f"{urgency_emoji} {severity_emoji} {issue['Property']} - {issue['Category']} ({issue['Urgency']})", expanded=issue['Urgency'] == 'Urgent' or issue['Severity'] == 'High'):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown("**Issue Details:**")
-                    st.write(f"**Property:** {issue['Property']}")
-                    st.write(f"**Category:** {issue['Category']}")
-                    st.write(f"**Problem:** {issue['Problem']}")
-                    st.write(f"**Urgency:** {issue['Urgency']}")
-                    st.write(f"**Severity:** {issue['Severity']}")
-                    st.markdown("**Real Guest Comment:**")
-                    st.info(f"\"{issue['Guest Comment']}\"")
-                
-                with col2:
-                    st.markdown("**AI Maintenance Recommendations:**")
-                    for i, rec in enumerate(recommendations, 1):
-                        st.write(f"**{i}.** {rec}")
-                    
-                    # Add AI generated estimates
-                    st.success(f"⏱️ **AI Time Estimate:** {time_estimate}")
-                    st.success(f"💰 **AI Cost Estimate:** {cost_estimate}")
-                    
-                    # Add urgency level
-                    if issue['Urgency'] == 'Urgent':
-                        st.error("⚡ **Action Required:** Same Day")
-                    elif issue['Urgency'] == 'Soon':
-                        st.warning("🔜 **Action Required:** Within 1-2 Days")
-                    else:
-                        st.info("📅 **Action Required:** Within a Week")
+            }
+            for issue in sorted_maintenance_issues
+        ]
+        
+        for idx, insights in prefetch_issue_insights(maintenance_jobs):
+            time_estimate, cost_estimate = insights["estimates"]
+            with maintenance_placeholders[idx].container():
+                render_maintenance_issue(sorted_maintenance_issues[idx], insights["recommendations"], time_estimate, cost_estimate)
     else:
         if st.session_state.last_real_update:
             st.success("🎉 No maintenance issues detected by AI analysis! All systems functioning properly.")
@@ -991,9 +1137,10 @@ with tab4:
         with col2:
             st.markdown("#### Data Summary")
             if st.session_state.real_reviews_data is not None:
-                total_reviews = len(st.session_state.real_reviews_data)
-                positive_reviews = len(st.session_state.real_reviews_data[st.session_state.real_reviews_data['type'] == 'positive'])
-                negative_reviews = len(st.session_state.real_reviews_data[st.session_state.real_reviews_data['type'] == 'negative'])
+                type_counts = st.session_state.get('review_type_counts', {})
+                total_reviews = sum(type_counts.values())
+                positive_reviews = type_counts.get('positive', 0)
+                negative_reviews = type_counts.get('negative', 0)
                 
                 st.write(f"• **Total Reviews Scraped:** {total_reviews}")
                 st.write(f"• **Positive Comments:** {positive_reviews}")
@@ -1002,6 +1149,30 @@ with tab4:
                 st.success("**All processed by full AI intelligence**")
     else:
         st.info("📊 AI insights will appear here after running analysis with full AI intelligence.")
+    
+    # Stored review history - queried from the persistent review store, no rescraping needed
+    review_store = st.session_state.get('review_store')
+    if review_store is not None and review_store.count() > 0:
+        st.markdown("#### Review History (Persistent Store)")
+        col1, col2, col3 = st.columns([2, 1, 1])
+        
+        with col1:
+            portfolio = st.session_state.get('portfolio')
+            listing_label = portfolio.label if portfolio is not None else str
+            history_listing = st.selectbox("Property", review_store.listings(), format_func=listing_label, key="history_listing")
+        with col2:
+            history_type = st.selectbox("Comment Type", ["all", "positive", "negative"], key="history_type")
+        with col3:
+            history_days = st.number_input("Last N Days", min_value=1, max_value=3650, value=90, key="history_days")
+        
+        history_df = review_store.query(
+            listings=[history_listing],
+            review_type=None if history_type == "all" else history_type,
+            since=(datetime.now() - timedelta(days=int(history_days))).strftime('%Y-%m-%d'),
+            limit=500
+        )
+        st.write(f"• **Stored Reviews for {listing_label(history_listing)}:** {review_store.count(history_listing)} total, {len(history_df)} in selected window")
+        st.dataframe(history_df, use_container_width=True, hide_index=True)
 
 # Professional Footer
 st.markdown("---")
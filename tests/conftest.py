@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# Configuration is read from the environment at import time: keep every store, key and email offline
+os.environ.setdefault("PROPERTY_DATA_DIR", tempfile.mkdtemp(prefix="property_data_"))
+os.environ.setdefault("APIFY_API_KEY", "test-apify-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+os.environ.setdefault("SENDER_EMAIL", "owner@example.com")
+os.environ.setdefault("CLEANING_TEAM_EMAIL", "cleaning@example.com")
+os.environ.setdefault("APIFY_POLL_INTERVAL_SECONDS", "0.01")
+os.environ.setdefault("PIPELINE_PACK_LINGER_SECONDS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import unified_property_management as upm
+
+
+@pytest.fixture
+def offline_gpt(monkeypatch):
+    """Every GPT request fails, so analyses come from the local keyword fallback"""
+    async def no_answer(self, *args, **kwargs):
+        return None
+    monkeypatch.setattr(upm.EnhancedGPTProcessor, "_request_analysis_json", no_answer)
+    monkeypatch.setattr(upm.EnhancedGPTProcessor, "_stream_analysis_json", no_answer)
+
+
+@pytest.fixture
+def portfolio():
+    return upm.Portfolio([
+        upm.Listing("loft-1", "Old Port Loft", "https://example.com/hotel/ca/loft-1.html", 250),
+        upm.Listing("studio-2", "Plateau Studio", "https://example.com/hotel/ca/studio-2.html", 120),
+    ])
+
+
+@pytest.fixture
+def reviews_by_url():
+    """Review items the local Apify client serves per listing URL (4 loft reviews, 1 studio review)"""
+    return {
+        "https://example.com/hotel/ca/loft-1.html": [
+            {"reviewDate": "2026-09-01T10:00:00", "likedText": "Great location", "dislikedText": "The bathroom was dirty and the sheets had stains"},
+            {"reviewDate": "2026-09-10T10:00:00", "likedText": "Lovely host", "dislikedText": "The heating was broken all night"},
+        ],
+        "https://example.com/hotel/ca/studio-2.html": [
+            {"reviewDate": "2026-08-20T10:00:00", "likedText": "Very clean and quiet", "dislikedText": ""},
+        ],
+    }
+
+
+@pytest.fixture
+def fake_apify(reviews_by_url):
+    return upm.LocalApifyClient(reviews_by_url)
+
+
+@pytest.fixture
+def make_manager(tmp_path, portfolio, fake_apify):
+    """make_manager(portfolio=, data_dir=, client=): a manager with stores under tmp_path, scraping through the local client"""
+    def make(portfolio=portfolio, data_dir=tmp_path, client=fake_apify):
+        return upm.UltraFastSmartPropertyManager(portfolio=portfolio, data_dir=str(data_dir),
+                                                 apify_client_factory=lambda api_key: client)
+    return make
+
+
+@pytest.fixture
+def run_closing():
+    """run_closing(manager, body): await body() on a fresh event loop, then close the manager's loop-bound resources"""
+    def run(manager, body):
+        async def main():
+            try:
+                return await body()
+            finally:
+                await manager.close()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def run_cycles(run_closing):
+    """run_cycles(manager, count, before_each=None): reports of count full cycles; before_each(n) runs ahead of cycle n"""
+    def run(manager, count=1, before_each=None):
+        async def cycles():
+            reports = []
+            for n in range(count):
+                if before_each is not None:
+                    before_each(n)
+                reports.append(await manager.run_ultra_fast_analysis())
+            return reports
+        return run_closing(manager, cycles)
+    return run
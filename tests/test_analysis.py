@@ -0,0 +1,101 @@
+import asyncio
+
+import unified_property_management as upm
+from unified_property_management import Listing, Portfolio, UltraFastSmartPropertyManager
+
+
+def analysis(score, *comments):
+    return {
+        "satisfaction_score": score,
+        "guest_sentiment": "neutral",
+        "cleaning_issues": [{"problem": f"Issue: {comment}", "location": "bathroom", "guest_comment": comment} for comment in comments],
+        "maintenance_issues": [],
+    }
+
+
+def test_merged_history_is_bounded_and_follows_new_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(upm, "MERGED_MAX_ISSUES", 3)
+    monkeypatch.setattr(upm, "MERGED_HISTORY_MAX_WEIGHT", 10)
+    manager = UltraFastSmartPropertyManager(portfolio=Portfolio([Listing("a", "A", "https://example.com/a", 100)]), data_dir=str(tmp_path))
+    
+    stored = analysis(90, "hair in the sink", "stained towels", "dusty shelves")
+    update = analysis(40, "Hair in the sink!", "mould on the tiles")
+    merged = manager._merge_incremental_analysis(stored, 1000, update, 10)
+    
+    # The repeated complaint keeps the new wording, the oldest issue falls off the end
+    assert [issue["guest_comment"] for issue in merged["cleaning_issues"]] == ["Hair in the sink!", "mould on the tiles", "stained towels"]
+    # 1000 old comments weigh no more than 10: the new batch moves the score halfway
+    assert merged["satisfaction_score"] == 65.0
+
+
+def test_each_cache_miss_is_counted_once(tmp_path, offline_gpt):
+    cache = upm.PersistentCache(str(tmp_path / "cache.db"))
+    processor = upm.EnhancedGPTProcessor("test-key", cache=cache)
+    listings = [
+        {"name": "loft-1", "positive_comments": ["Great host"], "negative_comments": ["The bathroom was dirty"]},
+        {"name": "studio-2", "positive_comments": [], "negative_comments": ["Broken heater"]},
+    ]
+    
+    async def analyze(pack_small):
+        try:
+            return await processor.batch_analyze_properties(listings, pack_small=pack_small)
+        finally:
+            await upm.SHARED_HTTP_CLIENT.close_async()
+    
+    for pack_small, expected_misses in ((True, 2), (False, 4)):
+        analyses = asyncio.run(analyze(pack_small))
+        assert set(analyses) == {"loft-1", "studio-2"}
+        assert (cache.hits, cache.misses) == (0, expected_misses)
+
+
+def test_comments_are_chunked_within_the_token_budget():
+    processor = upm.EnhancedGPTProcessor("test-key")
+    positive = [f"Great stay number {i}, the host was lovely" for i in range(5)]
+    negative = [f"Problem {i}: the shower drain was blocked again" for i in range(7)]
+    
+    chunks = processor._chunk_comments(positive, negative, budget=40, comment_counts={negative[0]: 3})
+    
+    assert len(chunks) > 1
+    assert all(sum(upm.count_tokens(line) for line in chunk["lines"]) <= 40 for chunk in chunks)
+    # Every comment lands in exactly one chunk, in order, under its label
+    assert [comment for chunk in chunks for comment in chunk["positive_comments"]] == positive
+    assert [comment for chunk in chunks for comment in chunk["negative_comments"]] == negative
+    lines = [line for chunk in chunks for line in chunk["lines"]]
+    assert lines[0].startswith("POSITIVE 1: ") and lines[5] == f"NEGATIVE 1: {negative[0]} [mentioned by 3 guests]"
+    assert processor._chunk_comments(positive, negative, comment_counts={negative[0]: 3}) == [
+        {"lines": lines, "positive_comments": positive, "negative_comments": negative}
+    ]
+
+
+def test_chunk_analyses_are_reduced_by_comment_weight(monkeypatch):
+    monkeypatch.setattr(upm, "ANALYSIS_CHUNK_TOKEN_BUDGET", 40)
+    processor = upm.EnhancedGPTProcessor("test-key")
+    negative = [f"Problem {i}: the shower drain was blocked again" for i in range(4)]
+    chunk_sizes = [len(chunk["lines"]) for chunk in processor._chunk_comments([], negative)]
+    scores = iter([90, 30, 60, 60])
+    
+    async def answer(label, prompt):
+        # Every chunk reports the same blocked drain plus one issue of its own
+        own = prompt.count("NEGATIVE")
+        return {
+            "satisfaction_score": next(scores), "guest_sentiment": "negative", "cleaning_issues": [],
+            "maintenance_issues": [
+                {"problem": "Blocked drain", "category": "plumbing", "guest_comment": "the shower drain was blocked"},
+                {"problem": f"Issue {own}", "category": "plumbing", "guest_comment": f"chunk with {own} comments"},
+            ],
+        }
+    processor._request_analysis_json = answer
+    
+    async def analyze():
+        try:
+            return await processor.analyze_single_property_enhanced("loft-1", [], negative)
+        finally:
+            await upm.SHARED_HTTP_CLIENT.close_async()
+    
+    analysis = asyncio.run(analyze())
+    
+    assert len(chunk_sizes) > 1
+    expected_score = sum(score * size for score, size in zip([90, 30, 60, 60], chunk_sizes)) / sum(chunk_sizes)
+    assert analysis["satisfaction_score"] == round(expected_score, 1)
+    # The shared issue is reported once; chunk-specific issues are all kept
+    assert [issue["problem"] for issue in analysis["maintenance_issues"]].count("Blocked drain") == 1
@@ -0,0 +1,32 @@
+from unified_property_management import PersistentCache
+
+
+def test_expired_entries_are_misses_and_are_dropped(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), ttl_seconds=60, max_entries=10)
+    cache.set("fresh", {"score": 1})
+    cache.set("stale", {"score": 2})
+    with cache._lock, cache._conn:
+        cache._conn.execute("UPDATE cache SET created_at = created_at - 120 WHERE key = 'stale'")
+    
+    assert cache.get("fresh") == {"score": 1}
+    assert cache.get("stale") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted_over_the_limit(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), ttl_seconds=0, max_entries=2)
+    cache.set("a", "first")
+    cache.set("b", "second")
+    cache.get("a")  # a is now more recently used than b
+    cache.set("c", "third")
+    
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "first" and cache.get("c") == "third"
+
+
+def test_entries_survive_reopening(tmp_path):
+    PersistentCache(str(tmp_path / "cache.db")).set("key", ["value"])
+    
+    assert PersistentCache(str(tmp_path / "cache.db")).get("key") == ["value"]
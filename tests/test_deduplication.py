@@ -0,0 +1,30 @@
+from unified_property_management import CommentDeduplicator
+
+
+def test_word_order_does_not_split_clusters():
+    representatives, counts = CommentDeduplicator().collapse([
+        "dirty bathroom", "bathroom dirty", "The bathroom was dirty!", "Bathroom was really dirty and smelly", "wifi slow", "wifi fast"
+    ])
+    
+    assert counts["Bathroom was really dirty and smelly"] == 4
+    assert counts["wifi slow"] == 1 and counts["wifi fast"] == 1
+    assert len(representatives) == 3
+
+
+def test_issue_counts_resolve_to_one_cluster():
+    comment_counts = {"Bathroom was really dirty and smelly": 4, "wifi": 3, "The wifi was slow in the evening": 1}
+    analysis = {"cleaning_issues": [
+        {"guest_comment": "Bathroom was really dirty and smelly [mentioned by 4 guests]"},
+        {"guest_comment": "really dirty and smelly"},
+    ], "maintenance_issues": [
+        {"guest_comment": "The wifi was slow in the evening"},
+        {"guest_comment": "wifi was slow"},
+        {"guest_comment": "The heater is broken"},
+    ]}
+    
+    CommentDeduplicator.expand_issue_counts(analysis, comment_counts)
+    
+    assert [issue["occurrences"] for issue in analysis["cleaning_issues"]] == [4, 4]
+    # "wifi" alone is a different cluster, even though its text is inside these quotes
+    assert [issue["occurrences"] for issue in analysis["maintenance_issues"]] == [1, 1, 1]
+    assert analysis["cleaning_issues"][0]["guest_comment"] == "Bathroom was really dirty and smelly"
@@ -0,0 +1,30 @@
+from unified_property_management import CLEANING_EMAIL_TEMPLATE, MAINTENANCE_EMAIL_TEMPLATE
+
+
+PROPERTIES = {
+    "Loft <b>A</b>": [{
+        "severity": "High", "urgency": "Urgent", "location": "bathroom", "category": "Plumbing",
+        "problem": "Leak {index} & <script>alert(1)</script>", "guest_comment": "Water \"everywhere\"",
+        "occurrences": 3, "keywords_detected": ["leak", "<wet>"], "notice": "new",
+    }],
+}
+
+
+def test_html_fields_are_escaped_and_plain_text_is_verbatim():
+    for template in (CLEANING_EMAIL_TEMPLATE, MAINTENANCE_EMAIL_TEMPLATE):
+        plain, html_content = template.render(template.summarize(PROPERTIES))
+        
+        assert "Leak {index} & <script>alert(1)</script>" in plain
+        assert "Loft <b>A</b>" in plain
+        assert "<script>" not in html_content and "<wet>" not in html_content and "<b>A</b>" not in html_content
+        assert "Leak {index} &amp; &lt;script&gt;" in html_content
+        assert "Reported by 3 guests" in plain and "Reported by 3 guests" in html_content
+        assert "[NEW]" in plain
+
+
+def test_optional_snippets_are_left_out():
+    plain, html_content = CLEANING_EMAIL_TEMPLATE.render(CLEANING_EMAIL_TEMPLATE.summarize({"Loft": [{"problem": "Dusty shelves"}]}))
+    
+    assert "   1. ⚠️ Medium Priority - General\n      Issue: Dusty shelves\n" in plain
+    assert "Reported by" not in plain and "Keywords" not in plain
+    assert "Reported by" not in html_content and "<strong>[" not in html_content
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from unified_property_management import SharedHTTPClient
+
+
+def test_one_async_session_per_event_loop():
+    client = SharedHTTPClient()
+    
+    async def use():
+        first = await client.session()
+        assert await client.session() is first
+        return first
+    
+    # Explicit loops: nest_asyncio makes asyncio.run reuse the same one
+    loop = asyncio.new_event_loop()
+    first = loop.run_until_complete(use())
+    loop.close()
+    
+    async def next_loop():
+        session = await client.session()
+        # The closed loop's session is dropped rather than reused from the wrong loop
+        assert session is not first and list(client._async_sessions.values()) == [session]
+        await client.close_async()
+        await first.close()
+        return session
+    
+    loop = asyncio.new_event_loop()
+    session = loop.run_until_complete(next_loop())
+    loop.close()
+    
+    assert session.closed
+    assert client._async_sessions == {}
+
+
+def test_closed_session_is_replaced_on_the_same_loop():
+    client = SharedHTTPClient()
+    
+    async def reopen():
+        first = await client.session()
+        await first.close()
+        second = await client.session()
+        await client.close_async()
+        return first, second
+    
+    first, second = asyncio.run(reopen())
+    
+    assert second is not first and second.closed
+
+
+def test_threads_share_one_blocking_client_until_closed():
+    client = SharedHTTPClient()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(client.sync_client())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(seen) == 4 and all(sync_client is seen[0] for sync_client in seen)
+    
+    client.close()
+    assert client._sync_client is None
+    assert client.sync_client() is not seen[0]
+    client.close()
@@ -0,0 +1,36 @@
+from unified_property_management import LocalApifyClient
+
+
+def test_index_only_sees_new_reviews(portfolio, make_manager, run_cycles, offline_gpt):
+    loft, studio = (listing.url for listing in portfolio)
+    fake = LocalApifyClient()
+    manager = make_manager(client=fake)
+    emailed = []
+    
+    async def capture_emails(cleaning, maintenance, pricing):
+        emailed.append(cleaning)
+        return 0
+    manager.email_system.send_all_emails_parallel = capture_emails
+    
+    batches = [
+        {loft: [{"reviewDate": "2026-09-01", "dislikedText": "The bathroom was dirty"}],
+         studio: [{"reviewDate": "2026-09-01", "likedText": "Lovely"}]},
+        # Nothing new for the loft: its open issue must neither be re-sent nor resolved
+        {studio: [{"reviewDate": "2026-09-05", "likedText": "Still lovely"}]},
+        # New loft reviews without the complaint: the issue is resolved
+        {loft: [{"reviewDate": "2026-09-08", "likedText": "Spotless this time"}]},
+    ]
+    
+    def publish(n):
+        for url, items in batches[n].items():
+            fake.reviews_by_url.setdefault(url, []).extend(items)
+    
+    run_cycles(manager, len(batches), before_each=publish)
+    
+    assert list(emailed[0]) == ["Old Port Loft"]
+    assert emailed[1] == {} and emailed[2] == {}
+    
+    stored_issue = manager.detailed_analyses["loft-1"]["cleaning_issues"][0]
+    record = manager.issue_index.get(manager.issue_index.fingerprint("loft-1", "cleaning", stored_issue))
+    assert record["times_seen"] == 1
+    assert record["resolved_at"] is not None
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from unified_property_management import KEYWORD_MATCHER, CommentTriage
+
+
+def keywords(*comments):
+    return KEYWORD_MATCHER.find_keywords(pd.Series(list(comments))).tolist()
+
+
+def test_inflected_complaints_match_their_keyword():
+    assert keywords(
+        "The room was smelly", "stinky towels", "it smelled of smoke", "dirtier than the photos",
+        "mouldy grout", "the tap leaks", "leaky shower", "needs dusting", "messier than expected"
+    ) == [["smell"], ["stink"], ["smell"], ["dirt"], ["mould"], ["leak"], ["leak"], ["dust"], ["mess"]]
+
+
+def test_exact_keywords_still_win():
+    assert keywords("dirty floor", "not working", "wifi slow") == [["dirty"], ["not working"], ["wifi slow"]]
+
+
+def test_unrelated_words_sharing_a_prefix_do_not_match():
+    assert keywords("great hotel", "hardly any noise at all", "host sent a message", "spotless kitchen") == [[], [], [], []]
+
+
+def test_categories_resolve_for_inflections():
+    hits = KEYWORD_MATCHER.category_hits(pd.Series(["smelly and dirtier bathroom"]))
+    assert hits[0]["cleaning"] == [("odors", "smell"), ("dirty", "dirt")]
+
+
+def test_triage_sends_only_likely_issues_to_gpt():
+    triage = CommentTriage()
+    listings = [
+        {"name": "loft-1",
+         "positive_comments": ["Great location", "Lovely host but the shower was leaking"],
+         "negative_comments": ["Nothing", "The bathroom was dirty", "Parking was too expensive"]},
+        {"name": "studio-2", "positive_comments": ["Very quiet and cosy"], "negative_comments": ["All good!"]},
+    ]
+    
+    gpt_listings, local_parts = triage.triage(listings)
+    
+    assert gpt_listings == [{
+        "name": "loft-1",
+        "positive_comments": ["Lovely host but the shower was leaking"],
+        "negative_comments": ["The bathroom was dirty", "Parking was too expensive"],
+    }]
+    # Skipped comments are scored locally, weighted by how many were skipped
+    loft_analysis, loft_weight = local_parts["loft-1"]
+    assert loft_weight == 2 and loft_analysis["cleaning_issues"] == [] and loft_analysis["maintenance_issues"] == []
+    studio_analysis, studio_weight = local_parts["studio-2"]
+    assert studio_weight == 2
+    assert studio_analysis["satisfaction_score"] == (CommentTriage.POSITIVE_LOCAL_SCORE + CommentTriage.NEGATIVE_LOCAL_SCORE) / 2
+    assert triage.stats == {"comments_sent": 3, "comments_skipped": 4, "properties_sent": 1, "properties_skipped": 1}
+    
+    triage.reset_stats()
+    assert triage.stats["comments_sent"] == 0
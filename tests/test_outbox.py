@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from unified_property_management import EmailOutbox, OutboxDispatcher
+
+
+class RecordingEmailSystem:
+    """Stands in for FastEmailSystem: records every delivery, optionally failing or taking a while"""
+    
+    def __init__(self, fail=False, send_seconds=0):
+        self.fail = fail
+        self.send_seconds = send_seconds
+        self.sent = []
+    
+    async def deliver(self, subject, body, recipient, html_body=None):
+        await asyncio.sleep(self.send_seconds)
+        if self.fail:
+            raise ConnectionError("SMTP down")
+        self.sent.append((recipient, subject, body))
+    
+    async def close_transport(self):
+        pass
+    
+    def print_transport_stats(self):
+        pass
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return EmailOutbox(str(tmp_path / "outbox.db"))
+
+
+def test_queued_emails_are_coalesced_into_one_digest_per_recipient(outbox):
+    for n in range(3):
+        outbox.enqueue("cleaning@example.com", f"Cleaning alert {n}", f"body {n}")
+    outbox.enqueue("owner@example.com", "Pricing update", "prices")
+    email_system = RecordingEmailSystem()
+    
+    result = asyncio.run(OutboxDispatcher(outbox, email_system, rate_per_minute=600).run_once())
+    
+    assert result == {"emails": 4, "sends": 2}
+    sent = {recipient: (subject, body) for recipient, subject, body in email_system.sent}
+    assert sent["cleaning@example.com"][0].startswith("📬 ALERT DIGEST - 3 updates")
+    assert all(f"body {n}" in sent["cleaning@example.com"][1] for n in range(3))
+    assert sent["owner@example.com"] == ("Pricing update", "prices")
+    assert outbox.counts() == {"sent": 4}
+
+
+def test_concurrent_dispatchers_send_each_email_once(outbox):
+    outbox.enqueue("cleaning@example.com", "Cleaning alert", "body")
+    outbox.enqueue("owner@example.com", "Pricing update", "prices")
+    email_system = RecordingEmailSystem(send_seconds=0.05)
+    
+    async def dashboard_and_dispatcher():
+        dispatchers = [OutboxDispatcher(outbox, email_system, rate_per_minute=600) for _ in range(3)]
+        return await asyncio.gather(*(dispatcher.run_once() for dispatcher in dispatchers))
+    
+    results = asyncio.run(dashboard_and_dispatcher())
+    
+    assert sum(result["emails"] for result in results) == 2
+    assert sorted(recipient for recipient, _, _ in email_system.sent) == ["cleaning@example.com", "owner@example.com"]
+
+
+def test_claims_of_a_crashed_dispatcher_come_back_after_their_lease(outbox):
+    outbox.enqueue("cleaning@example.com", "Cleaning alert", "body")
+    claimed = outbox.claim_due("crashed-dispatcher")
+    
+    assert outbox.claim_due("other") == []
+    assert [email["id"] for email in outbox.claim_due("other", now=claimed[0]["created_at"] + outbox.lease_seconds + 1)] == \
+        [claimed[0]["id"]]
+
+
+def test_failed_sends_back_off_then_go_dead(outbox):
+    email_id = outbox.enqueue("cleaning@example.com", "Cleaning alert", "body")
+    dispatcher = OutboxDispatcher(outbox, RecordingEmailSystem(fail=True), rate_per_minute=600,
+                                  max_attempts=3, retry_base=10, retry_max=15)
+    
+    def next_attempt_in():
+        with outbox._lock:
+            next_attempt_at, = outbox._conn.execute("SELECT next_attempt_at FROM outbox WHERE id = ?", (email_id,)).fetchone()
+        return next_attempt_at - time.time()
+    
+    def make_due():
+        with outbox._lock, outbox._conn:
+            outbox._conn.execute("UPDATE outbox SET next_attempt_at = 0 WHERE id = ?", (email_id,))
+    
+    assert asyncio.run(dispatcher.run_once()) == {"emails": 0, "sends": 0}
+    assert 4 <= next_attempt_in() <= 10  # jittered: half to all of retry_base * 2^0
+    assert outbox.claim_due("other") == []  # not due again until the backoff has passed
+    
+    make_due()
+    asyncio.run(dispatcher.run_once())
+    assert 7 <= next_attempt_in() <= 15  # half to all of retry_base * 2^1, capped at retry_max
+    assert outbox.counts() == {"pending": 1}
+    
+    make_due()
+    asyncio.run(dispatcher.run_once())
+    assert outbox.counts() == {"dead": 1}
+    make_due()
+    assert outbox.claim_due("other") == []
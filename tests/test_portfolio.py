@@ -0,0 +1,19 @@
+import pytest
+
+from unified_property_management import Listing, Portfolio
+
+
+def test_names_may_repeat_but_ids_are_unique():
+    portfolio = Portfolio([
+        Listing("a", "Downtown Room", "https://example.com/a", 100),
+        Listing("b", "Downtown Room", "https://example.com/b", 150),
+        Listing("c", "Loft", "https://example.com/c", 200),
+    ])
+    
+    assert portfolio.base_pricing() == {"a": 100, "b": 150, "c": 200}
+    assert portfolio.by_name("Downtown Room").listing_id == "a"
+    assert [portfolio.label(listing_id) for listing_id in ("a", "b", "c")] == ["Downtown Room [a]", "Downtown Room [b]", "Loft"]
+    assert portfolio.labelled({"c": 1, "unknown": 2}) == {"Loft": 1, "unknown": 2}
+    
+    with pytest.raises(ValueError):
+        Portfolio([Listing("a", "One", "https://example.com/1", 100), Listing("a", "Two", "https://example.com/2", 100)])
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import aiohttp
+import pytest
+
+import unified_property_management as upm
+from unified_property_management import OpenAIRateLimiter, count_tokens
+
+
+def test_reservation_uses_expected_completion_not_max_tokens():
+    payload = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 4000}
+    assert OpenAIRateLimiter.estimate_tokens(payload) == count_tokens("x" * 400) + upm.OPENAI_EXPECTED_COMPLETION_TOKENS
+    assert OpenAIRateLimiter.estimate_tokens({"messages": [], "max_tokens": 50}) == 50
+
+
+def test_settling_with_usage_frees_the_unused_reservation():
+    limiter = OpenAIRateLimiter(rpm=1000, tpm=10000)
+    assert limiter._reserve(9000) == 0
+    assert limiter._reserve(9000) > 0  # the bucket is in debt
+    
+    limiter.settle(9000, {"total_tokens": 500})
+    limiter.settle(9000, None)  # rejected request: nothing was used
+    assert limiter._reserve(8000) == 0
+
+
+def test_stats_are_exact_under_concurrency():
+    limiter = OpenAIRateLimiter()
+    
+    def hammer():
+        for _ in range(2000):
+            limiter._count("requests")
+    
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.stats["requests"] == 16000
+
+
+class DroppingResponse:
+    """A 200 stream that sends one delta and then loses the connection"""
+    
+    status = 200
+    headers = {}
+    
+    def __init__(self):
+        self.content = self.lines()
+    
+    async def lines(self):
+        yield b'data: {"choices": [{"delta": {"content": "HELLO "}}]}\n'
+        raise aiohttp.ClientPayloadError("connection lost")
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class DroppingSession:
+    def __init__(self):
+        self.posts = 0
+    
+    def post(self, url, **kwargs):
+        self.posts += 1
+        return DroppingResponse()
+
+
+def test_stream_dropped_midway_is_not_replayed():
+    limiter = OpenAIRateLimiter(rpm=1000, tpm=100000)
+    session = DroppingSession()
+    received = []
+    
+    async def consume():
+        async for delta in limiter.stream_chat_async(session, {}, {"messages": [], "max_tokens": 10}):
+            received.append(delta)
+    
+    with pytest.raises(aiohttp.ClientPayloadError):
+        asyncio.run(consume())
+    assert received == ["HELLO "]
+    assert session.posts == 1
@@ -0,0 +1,36 @@
+from unified_property_management import ReviewStore
+
+
+def review(listing, date, review_type, comment):
+    return {"listing": listing, "date": date, "type": review_type, "comment": comment}
+
+
+REVIEWS = [
+    review("loft-1", "2026-09-01", "negative", "The bathroom was dirty"),
+    review("loft-1", "2026-09-10", "positive", "Lovely host"),
+    review("studio-2", "2026-08-20", "positive", "Very clean and quiet"),
+]
+
+
+def test_upsert_ignores_reviews_already_stored(tmp_path):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    
+    assert store.upsert_reviews(REVIEWS) == 3
+    assert store.upsert_reviews(REVIEWS + [review("studio-2", "2026-09-12", "negative", "Noisy street")]) == 1
+    assert store.upsert_reviews([]) == 0
+    assert store.count() == 4
+    assert store.count("loft-1") == 2
+    assert store.listings() == ["loft-1", "studio-2"]
+
+
+def test_query_filters_and_orders_newest_first(tmp_path):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    store.upsert_reviews(REVIEWS)
+    
+    assert list(store.query()["date"]) == ["2026-09-10", "2026-09-01", "2026-08-20"]
+    assert list(store.query(listings=["loft-1"], review_type="positive")["comment"]) == ["Lovely host"]
+    assert list(store.query(since="2026-08-25", until="2026-09-05")["comment"]) == ["The bathroom was dirty"]
+    assert list(store.query(limit=1)["listing"]) == ["loft-1"]
+    assert store.query(listings=["missing"]).empty
+    assert store.type_counts() == {"positive": 2, "negative": 1}
+    assert store.type_counts(listings=["studio-2"]) == {"positive": 1}
@@ -0,0 +1,195 @@
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+
+import unified_property_management as upm
+from unified_property_management import Listing, LocalApifyClient, ParallelScrapingEngine, Portfolio, ScrapeWebhookReceiver
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_full_cycle_through_local_client(make_manager, fake_apify, run_cycles, offline_gpt):
+    manager = make_manager()
+    
+    first, second = run_cycles(manager, 2)
+    
+    assert first["properties_analyzed"] == 2
+    assert first["cleaning_issues"] >= 1 and first["maintenance_issues"] >= 1
+    assert manager.review_store.count() == 5
+    assert len(fake_apify.run_inputs) == 4
+    assert "cutoffDate" not in fake_apify.run_inputs[0]
+    assert second["properties_analyzed"] == 2
+
+
+def test_webhook_mode_through_local_client(portfolio, reviews_by_url):
+    fake = LocalApifyClient(reviews_by_url, run_seconds=0.05, fail_urls={"https://example.com/hotel/ca/studio-2.html"})
+    port = free_port()
+    receiver = ScrapeWebhookReceiver(public_url=f"http://127.0.0.1:{port}", host="127.0.0.1", port=port, secret="s3cret")
+    engine = ParallelScrapingEngine("key", client_factory=lambda api_key: fake, webhook_receiver=receiver, portfolio=portfolio)
+    
+    async def scrape():
+        try:
+            return await asyncio.wait_for(engine.scrape_all_properties_parallel(), 10)
+        finally:
+            await receiver.stop()
+    
+    review_counts = asyncio.run(scrape())
+    
+    assert review_counts == {"loft-1": 4}
+    assert all(run_input["startUrls"][0]["url"] in reviews_by_url for run_input in fake.run_inputs)
+
+
+def test_webhook_receiver_rejects_forged_events():
+    assert ScrapeWebhookReceiver().host == "127.0.0.1"
+    with pytest.raises(ValueError):
+        asyncio.run(ScrapeWebhookReceiver(public_url="https://hooks.example.com", secret="").start())
+    
+    port = free_port()
+    receiver = ScrapeWebhookReceiver(public_url=f"http://127.0.0.1:{port}", host="127.0.0.1", port=port, secret="s3cret")
+    forged = {"eventType": "ACTOR.RUN.SUCCEEDED", "resource": {"id": "run-1", "status": "SUCCEEDED"}}
+    
+    async def post(token):
+        url = f"http://127.0.0.1:{port}{upm.APIFY_WEBHOOK_PATH}?token={token}"
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=forged) as response:
+                return response.status
+    
+    async def attempt():
+        await receiver.start()
+        try:
+            return await post("guess"), receiver.queue.qsize(), await post("s3cret"), receiver.queue.qsize()
+        finally:
+            await receiver.stop()
+    
+    assert asyncio.run(attempt()) == (403, 0, 200, 1)
+
+
+def test_fire_and_poll_keys_results_by_listing_id(make_manager, fake_apify, run_cycles, offline_gpt):
+    manager = make_manager()
+    
+    run_cycles(manager, 2)
+    
+    assert set(manager.detailed_analyses) == {"loft-1", "studio-2"}
+    assert set(manager.review_store.listings()) == {"loft-1", "studio-2"}
+    assert {listing_id: decision["base_price"] for listing_id, decision in manager.pricing_decisions.items()} == {"loft-1": 250, "studio-2": 120}
+    # The second cycle only asks for reviews from each listing's watermark (minus a day of slack)
+    assert [run_input.get("cutoffDate") for run_input in fake_apify.run_inputs[2:]] == ["2026-09-09", "2026-08-19"]
+
+
+def test_listings_sharing_a_name_keep_separate_state(make_manager, run_cycles, offline_gpt):
+    twins = Portfolio([
+        Listing("loft-1", "Downtown Room", "https://example.com/hotel/ca/loft-1.html", 250),
+        Listing("studio-2", "Downtown Room", "https://example.com/hotel/ca/studio-2.html", 120),
+    ])
+    manager = make_manager(portfolio=twins)
+    emailed = {}
+    
+    async def capture_emails(cleaning, maintenance, pricing):
+        emailed.update(cleaning=cleaning, maintenance=maintenance, pricing=pricing)
+        return 0
+    manager.email_system.send_all_emails_parallel = capture_emails
+    
+    run_cycles(manager)
+    
+    assert {listing_id: decision["base_price"] for listing_id, decision in manager.pricing_decisions.items()} == {"loft-1": 250, "studio-2": 120}
+    assert set(manager.listing_state.get("loft-1")["seen_hashes"]) != set(manager.listing_state.get("studio-2")["seen_hashes"])
+    assert set(emailed["pricing"]) == {"Downtown Room [loft-1]", "Downtown Room [studio-2]"}
+    assert list(emailed["cleaning"]) == ["Downtown Room [loft-1]"]
+
+
+class ShortPageDataset:
+    """Serves pages shorter than the limit (as skipped empty items do) and no total"""
+    
+    def __init__(self, items, served_per_page):
+        self.items = items
+        self.served_per_page = served_per_page
+        self.requests = []
+    
+    async def list_items(self, offset=0, limit=None, **kwargs):
+        self.requests.append(offset)
+        page = self.items[offset:offset + min(limit, self.served_per_page)]
+        return upm.LocalListPage(items=page, offset=offset, limit=limit, count=len(page), total=0)
+
+
+def test_review_pages_continue_past_short_pages(portfolio):
+    items = [{"reviewDate": f"2026-09-{day:02d}", "dislikedText": f"complaint {day}"} for day in range(1, 8)]
+    dataset = ShortPageDataset(items, served_per_page=3)
+    client = type("Client", (), {"dataset": lambda self, dataset_id: dataset})()
+    engine = ParallelScrapingEngine("key", portfolio=portfolio)
+    
+    async def collect():
+        return [review async for page in engine.iter_review_pages(client, "loft-1", "ds", page_size=5) for review in page]
+    
+    reviews = asyncio.run(collect())
+    
+    assert [review["comment"] for review in reviews] == [f"complaint {day}" for day in range(1, 8)]
+    assert dataset.requests == [0, 3, 6, 7]
+
+
+def test_failed_run_starts_are_retried(portfolio, reviews_by_url, monkeypatch):
+    monkeypatch.setattr(upm, "APIFY_START_RETRY_BASE_SECONDS", 0)
+    loft_url, studio_url = (listing.url for listing in portfolio)
+    # The loft's start recovers on its third attempt; the studio never starts
+    fake = LocalApifyClient(reviews_by_url, start_errors={loft_url: 2, studio_url: upm.APIFY_START_RETRIES + 1})
+    engine = ParallelScrapingEngine("key", portfolio=portfolio)
+    
+    review_counts = asyncio.run(engine.scrape_all_properties_fire_and_poll(fake))
+    
+    assert review_counts == {"loft-1": 4}
+    assert [run_input["startUrls"][0]["url"] for run_input in fake.run_inputs].count(loft_url) == 3
+    assert [run_input["startUrls"][0]["url"] for run_input in fake.run_inputs].count(studio_url) == upm.APIFY_START_RETRIES + 1
+    
+    # The blocking actor.call path retries the same way
+    fake = LocalApifyClient(reviews_by_url, start_errors={loft_url: 1})
+    assert len(asyncio.run(engine.scrape_single_property(portfolio.listings[0], client=fake))) == 4
+
+
+def test_cycle_keeps_reviews_in_the_store_not_in_memory(make_manager, run_closing, offline_gpt):
+    manager = make_manager()
+    handed_over = {}
+    
+    review_counts, _ = run_closing(manager, lambda: manager._run_pipeline(
+        on_reviews=lambda listing_id, reviews: handed_over.update({listing_id: len(reviews)})
+    ))
+    
+    # The pipeline reports counts; each listing's reviews were handed to analysis and the store only
+    assert review_counts == handed_over == {"loft-1": 4, "studio-2": 1}
+    assert manager.review_store.type_counts() == {"positive": 3, "negative": 2}
+    assert manager.review_store.type_counts(["studio-2"]) == {"positive": 1}
+    recent = manager.recent_reviews(limit=2)
+    assert len(recent) == 2 and list(recent["date"]) == ["2026-09-10", "2026-09-10"]
+
+
+def test_slow_analysis_holds_back_scraped_listings(make_manager, run_closing, monkeypatch):
+    monkeypatch.setattr(upm, "PIPELINE_QUEUE_SIZE", 1)
+    monkeypatch.setattr(upm, "PACKED_MAX_LISTINGS", 1)
+    listings = [Listing(f"unit-{i}", f"Unit {i}", f"https://example.com/hotel/ca/unit-{i}.html", 100) for i in range(12)]
+    manager = make_manager(portfolio=Portfolio(listings))
+    progress = {"handed_over": 0, "analyzed": 0, "most_waiting": 0}
+    
+    async def scrape_instantly(on_property=None):
+        for listing in listings:
+            await on_property(listing.listing_id, [{"listing": listing.listing_id, "type": "negative", "comment": "Dirty floor"}])
+            progress["handed_over"] += 1
+            progress["most_waiting"] = max(progress["most_waiting"], progress["handed_over"] - progress["analyzed"])
+        return {listing.listing_id: 1 for listing in listings}
+    
+    async def analyze_slowly(batch):
+        await asyncio.sleep(0.01)
+        progress["analyzed"] += len(batch)
+        return {listing_id: {"satisfaction_score": 80} for listing_id, _ in batch}
+    
+    manager.scraper.scrape_all_properties_parallel = scrape_instantly
+    manager._analyze_listings = analyze_slowly
+    
+    review_counts, _ = run_closing(manager, manager._run_pipeline)
+    
+    assert len(review_counts) == len(manager.pricing_decisions) == 12
+    # At most a full queue plus one listing per analysis worker is ever scraped ahead of analysis
+    assert progress["most_waiting"] <= upm.PIPELINE_QUEUE_SIZE + upm.PIPELINE_ANALYSIS_WORKERS
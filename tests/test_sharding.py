@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+from unified_property_management import (
+    Listing, Portfolio, ShardCoordinator, ShardQueue, ShardWorker, stop_local_workers
+)
+
+# A `--mode worker` process, with the local Apify client and GPT answering nothing (keyword fallback)
+WORKER_PROCESS = """
+import asyncio, json, sys
+sys.path.insert(0, {root!r})
+import unified_property_management as upm
+
+async def no_answer(self, *args, **kwargs):
+    return None
+upm.EnhancedGPTProcessor._request_analysis_json = no_answer
+upm.EnhancedGPTProcessor._stream_analysis_json = no_answer
+
+queue_path, worker_id, data_dir, reviews_by_url = sys.argv[1:5]
+fake = upm.LocalApifyClient(json.loads(reviews_by_url))
+manager = upm.UltraFastSmartPropertyManager(data_dir=data_dir, apify_client_factory=lambda api_key: fake)
+worker = upm.ShardWorker(upm.ShardQueue(queue_path), worker_id=worker_id, manager=manager)
+asyncio.run(worker.run(exit_when_idle=True, idle_poll_seconds=0.05))
+"""
+
+
+def test_state_round_trips_through_the_queue(tmp_path, make_manager, fake_apify, run_closing, offline_gpt):
+    """Each cycle runs on a worker with empty local stores; watermarks still carry over via the coordinator"""
+    queue = ShardQueue(str(tmp_path / "queue.db"))
+    coordinator = ShardCoordinator(queue, manager=make_manager(data_dir=tmp_path / "coordinator"), shard_size=1)
+    
+    async def cycle(node):
+        worker = ShardWorker(queue, worker_id=node, manager=make_manager(data_dir=tmp_path / node))
+        
+        runs = []
+        
+        async def start_worker(cycle_id):
+            runs.append(asyncio.ensure_future(worker.run(exit_when_idle=True, idle_poll_seconds=0.01)))
+        
+        report = await coordinator.run_cycle(poll_seconds=0.01, on_enqueued=start_worker)
+        assert await runs[0] == 2
+        return report
+    
+    async def two_cycles():
+        return await cycle("node-a"), await cycle("node-b")
+    
+    first, second = run_closing(coordinator.manager, two_cycles)
+    
+    assert first["properties_analyzed"] == 2 and second["properties_analyzed"] == 2
+    assert coordinator.manager.review_store.count() == 5
+    assert coordinator.manager.listing_state.get("loft-1")["latest_review_date"] == "2026-09-10"
+    assert sorted(run_input.get("cutoffDate") for run_input in fake_apify.run_inputs[2:]) == ["2026-08-19", "2026-09-09"]
+
+
+def test_stuck_local_workers_are_stopped():
+    async def run():
+        stuck = await asyncio.create_subprocess_exec(sys.executable, "-c", "import time; time.sleep(60)")
+        done = await asyncio.create_subprocess_exec(sys.executable, "-c", "pass")
+        started = time.time()
+        await stop_local_workers([stuck, done], grace_seconds=0.5)
+        return stuck.returncode, done.returncode, time.time() - started
+    
+    stuck_code, done_code, elapsed = asyncio.run(run())
+    
+    assert stuck_code is not None and stuck_code != 0
+    assert done_code == 0
+    assert elapsed < 10
+
+
+def test_worker_processes_share_one_queue(tmp_path, make_manager, run_closing):
+    listings = [Listing(f"unit-{i}", f"Unit {i}", f"https://example.com/hotel/ca/unit-{i}.html", 100) for i in range(6)]
+    reviews_by_url = {listing.url: [{"reviewDate": "2026-09-10", "dislikedText": f"Dirty floor in unit {i}"}]
+                      for i, listing in enumerate(listings)}
+    queue_path = str(tmp_path / "queue.db")
+    queue = ShardQueue(queue_path)
+    coordinator = ShardCoordinator(queue, manager=make_manager(portfolio=Portfolio(listings), data_dir=tmp_path / "coordinator"),
+                                   shard_size=1)
+    script = WORKER_PROCESS.format(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    workers = []
+    
+    async def start_workers(cycle_id):
+        for n in range(3):
+            workers.append(await asyncio.create_subprocess_exec(
+                sys.executable, "-c", script, queue_path, f"proc-{n}", str(tmp_path / f"proc-{n}"), json.dumps(reviews_by_url)))
+    
+    async def cycle():
+        report = await coordinator.run_cycle(timeout=120, poll_seconds=0.05, on_enqueued=start_workers)
+        await stop_local_workers(workers, grace_seconds=30)
+        return report
+    
+    report = run_closing(coordinator.manager, cycle)
+    
+    assert report["shards"] == {"done": 6}
+    assert [worker.returncode for worker in workers] == [0, 0, 0]
+    assert set(coordinator.manager.detailed_analyses) == {listing.listing_id for listing in listings}
+    assert coordinator.manager.review_store.count() == 6
+    with queue._lock:
+        journal_mode = queue._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "delete"
+
+
+def test_abandoned_cycles_do_not_keep_workers_busy(tmp_path, portfolio):
+    queue = ShardQueue(str(tmp_path / "queue.db"), max_age_seconds=60)
+    queue.enqueue_cycle("timed-out", [portfolio.listings])
+    queue.enqueue_cycle("crashed", [portfolio.listings])
+    leased = queue.claim("worker-a")
+    assert leased["cycle_id"] == "timed-out"
+    
+    # The coordinator gave up on its cycle: the lease holder loses it, and nothing is left to claim
+    assert queue.cancel_cycle("timed-out") == 1
+    assert not queue.heartbeat("timed-out", leased["shard_id"], "worker-a")
+    
+    # A coordinator that died never cancels; its shards expire by age
+    with queue._lock:
+        queue._conn.execute("UPDATE shards SET created_at = created_at - 120 WHERE cycle_id = 'crashed'")
+        queue._conn.commit()
+    assert not queue.has_open_work()
+    assert queue.claim("worker-b") is None
+    assert queue.progress("crashed") == {"expired": 1}
@@ -0,0 +1,119 @@
+import asyncio
+import email
+import smtplib
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+import pytest
+
+from unified_property_management import AsyncSMTPPool, LocalSMTPSink, SMTPConnectionPool
+
+
+def make_message(subject, to):
+    msg = MIMEText(f"Guest said: {subject}", "plain", "utf-8")
+    msg["Subject"] = subject
+    msg["From"] = "owner@example.com"
+    msg["To"] = to
+    return msg
+
+
+def run_against_sink(scenario, **sink_options):
+    async def run():
+        sink = await LocalSMTPSink(**sink_options).start()
+        pool = AsyncSMTPPool("owner@example.com", None, host=sink.host, port=sink.port, max_size=3, use_tls=False)
+        try:
+            return await scenario(pool), sink, pool
+        finally:
+            await pool.close()
+            await sink.stop()
+    return asyncio.run(run())
+
+
+def test_pool_reuses_its_connections():
+    async def send_all(pool):
+        await asyncio.gather(*(pool.send(make_message(f"alert {i}", "team@example.com")) for i in range(20)))
+    
+    _, sink, pool = run_against_sink(send_all)
+    
+    assert sink.messages_received == 20
+    assert sink.connections <= 3 and pool.stats["connections"] == sink.connections
+    assert pool.stats["sent"] == 20
+
+
+def test_refused_recipients_do_not_get_an_empty_message():
+    async def send(pool):
+        return await pool.send(make_message("bathroom dirty", "team@example.com, gone@example.com"))
+    
+    sent, sink, _ = run_against_sink(send, refuse_recipients={"gone@example.com"})
+    
+    assert sent
+    [(recipients, body)] = sink.messages
+    assert recipients == ["team@example.com"]
+    assert email.message_from_bytes(body).get_payload(decode=True) == "Guest said: bathroom dirty".encode("utf-8")
+
+
+def test_message_refused_for_everyone_keeps_the_session_usable():
+    async def send(pool):
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            await pool.send(make_message("lost", "gone@example.com"))
+        await pool.send(make_message("delivered", "team@example.com"))
+    
+    _, sink, pool = run_against_sink(send, refuse_recipients={"gone@example.com"})
+    
+    assert [recipients for recipients, _ in sink.messages] == [["team@example.com"]]
+    assert pool.stats["connections"] == 1
+
+
+def test_async_retry_skips_other_stale_idle_connections():
+    async def send_after_drop(pool):
+        stale = [await pool._checkout() for _ in range(2)]
+        for connection in stale:
+            connection._writer.transport.abort()  # e.g. the server restarted while they sat idle
+            pool._idle.append(connection)
+        return await pool.send(make_message("after restart", "team@example.com"))
+    
+    sent, sink, pool = run_against_sink(send_after_drop)
+    
+    assert sent and sink.messages_received == 1
+    assert pool.stats["reconnects"] == 1
+    assert pool.stats["connections"] == 3
+
+def run_threaded_against_sink(scenario, **sink_options):
+    """scenario(pool) runs in a thread while the sink serves on the event loop"""
+    async def run():
+        sink = await LocalSMTPSink(**sink_options).start()
+        pool = SMTPConnectionPool("owner@example.com", None, host=sink.host, port=sink.port, max_size=4, use_tls=False)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, scenario, pool), sink, pool
+        finally:
+            await asyncio.get_running_loop().run_in_executor(None, pool.close)
+            await sink.stop()
+    return asyncio.run(run())
+
+
+def test_threaded_pool_counts_every_send():
+    def send_all(pool):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: pool.send(make_message(f"alert {i}", "team@example.com")), range(40)))
+    
+    _, sink, pool = run_threaded_against_sink(send_all)
+    
+    assert sink.messages_received == 40
+    assert pool.stats["sent"] == 40
+    assert pool.stats["connections"] + pool.stats["reused"] == 40
+
+
+def test_retry_skips_other_stale_idle_connections():
+    def send_after_drop(pool):
+        stale = [pool._connect() for _ in range(2)]
+        for server in stale:
+            server.sock.shutdown(socket.SHUT_RDWR)  # e.g. the server restarted while they sat idle
+            pool._checkin(server)
+        return pool.send(make_message("after restart", "team@example.com"))
+    
+    sent, sink, pool = run_threaded_against_sink(send_after_drop)
+    
+    assert sent and sink.messages_received == 1
+    assert pool.stats["reconnects"] == 1
+    assert pool.stats["connections"] == 3  # the two stale ones and the fresh one the retry used
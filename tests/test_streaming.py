@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from unified_property_management import EnhancedGPTProcessor
+
+
+class BrokenStreamLimiter:
+    """Streams the first issue of an answer, then the connection drops"""
+    
+    def __init__(self, issue):
+        self.issue = issue
+    
+    async def stream_chat_async(self, session, headers, payload):
+        yield '{"cleaning_issues": [' + json.dumps(self.issue) + ', {"guest_comm'
+        raise ConnectionError("stream reset")
+
+
+def test_fallback_does_not_redeliver_streamed_issues():
+    comment = "The bathroom was dirty and the sheets were stained, hair everywhere"
+    streamed = {"guest_comment": "bathroom was dirty", "problem": "Dirty bathroom", "location": "bathroom"}
+    processor = EnhancedGPTProcessor("test-key", rate_limiter=BrokenStreamLimiter(streamed))
+    delivered = []
+    
+    async def on_issue(name, issue_key, issue):
+        delivered.append((issue_key, issue["guest_comment"]))
+    
+    analysis = asyncio.run(processor.analyze_single_property_enhanced("loft-1", [], [comment], on_issue=on_issue))
+    
+    # The stream failed, so the returned analysis is the keyword fallback for the comment ...
+    assert analysis["cleaning_issues"]
+    assert all(issue["guest_comment"] == comment for issue in analysis["cleaning_issues"])
+    # ... but the comment's cleaning issue already reached the caller once, from the stream
+    assert delivered == [("cleaning_issues", "bathroom was dirty")]
+
+
+def test_fallback_still_delivers_comments_the_stream_never_reached():
+    quoted = "Kitchen was dirty"
+    missed = "Found mold in the shower and stains on the carpet"
+    streamed = {"guest_comment": quoted, "problem": "Dirty kitchen", "location": "kitchen"}
+    processor = EnhancedGPTProcessor("test-key", rate_limiter=BrokenStreamLimiter(streamed))
+    delivered = []
+    
+    analysis = asyncio.run(processor.analyze_single_property_enhanced(
+        "loft-1", [], [quoted, missed], on_issue=lambda name, key, issue: delivered.append(issue["guest_comment"])
+    ))
+    
+    assert delivered[0] == quoted
+    assert missed in delivered[1:]
+    assert quoted not in delivered[1:]
+    assert {issue["guest_comment"] for issue in analysis["cleaning_issues"]} >= {quoted, missed}
@@ -19,10 +19,32 @@ from dotenv import load_dotenv
 import logging
 import time
 import hashlib
-from typing import Dict, List, Any, Optional
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hmac
+import base64
+import html
+from typing import Dict, List, Any, Optional, NamedTuple, Tuple
+import csv
+import sys
+import socket
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+import threading
+import random
+import re
 import aiohttp
+from aiohttp import web
+
+try:
+    import tiktoken  # optional: exact token counts for chunking
+except ImportError:
+    tiktoken = None
+
+try:
+    import httpx  # optional: HTTP/2 for the blocking client (httpx[http2] in requirements.txt)
+    import h2  # noqa: F401  httpx.Client(http2=True) fails without it
+except ImportError:
+    httpx = None
 
 load_dotenv()
 nest_asyncio.apply()
@@ -44,7 +66,7 @@ EMAIL_CONFIG = {
     'demo_mode': False
 }
 
-# ALL 7 PROPERTIES
+# DEFAULT PORTFOLIO (used when PORTFOLIO_SOURCE is not set)
 LISTINGS = [
     ("Room N5 Downtown", "https://www.booking.com/hotel/ca/room-n5-in-a-shared-apartment-in-downtown-montreal.fr.html", 200),
     ("Room 1 Full Luxury", "https://www.booking.com/hotel/ca/room-1-full-equipped-in-big-luxury-apartment-in-downtown-montreal.fr.html", 300),
@@ -55,10 +77,1367 @@ LISTINGS = [
     ("Room N7 Shared", "https://www.booking.com/hotel/ca/room-n7-in-a-shared-apartment-in-downtown-montreal.fr.html", 155),
 ]
 
+# PORTFOLIO SOURCE (CSV / JSON / SQLite file) AND OPTIONAL SUBSET FILTERS (comma-separated)
+PORTFOLIO_SOURCE = os.getenv("PORTFOLIO_SOURCE")
+PORTFOLIO_TAGS = os.getenv("PORTFOLIO_TAGS")
+PORTFOLIO_CITIES = os.getenv("PORTFOLIO_CITIES")
+PORTFOLIO_OWNERS = os.getenv("PORTFOLIO_OWNERS")
+DEFAULT_BASE_PRICE = 200
+
 # PARALLEL PROCESSING LIMITS
 MAX_CONCURRENT_SCRAPING = 3
 MAX_CONCURRENT_GPT = 5
-MAX_CONCURRENT_EMAILS = 3
+MAX_CONCURRENT_EMAILS = 3  # also the size of the SMTP connection pool
+
+# REVIEW SCRAPING (dataset is paged so memory stays flat as the review cap grows)
+APIFY_REVIEWS_ACTOR = "voyager/booking-reviews-scraper"
+MAX_REVIEWS_PER_LISTING = int(os.getenv("MAX_REVIEWS_PER_LISTING", 40))
+APIFY_DATASET_PAGE_SIZE = int(os.getenv("APIFY_DATASET_PAGE_SIZE", 200))
+APIFY_REVIEW_FIELDS = ["reviewDate", "likedText", "dislikedText"]
+INCREMENTAL_SCRAPING = os.getenv("INCREMENTAL_SCRAPING", "true").lower() == "true"  # newest first, stop at known reviews
+
+# FIRE-AND-POLL ORCHESTRATION (all actor runs start at once; only dataset downloads are limited)
+APIFY_FIRE_AND_POLL = os.getenv("APIFY_FIRE_AND_POLL", "true").lower() == "true"
+APIFY_POLL_INTERVAL_SECONDS = float(os.getenv("APIFY_POLL_INTERVAL_SECONDS", 5))
+APIFY_RUN_TIMEOUT_SECONDS = int(os.getenv("APIFY_RUN_TIMEOUT_SECONDS", 300))
+APIFY_TERMINAL_FAILURES = {"FAILED", "ABORTED", "TIMED-OUT"}
+APIFY_START_RETRIES = int(os.getenv("APIFY_START_RETRIES", 3))  # extra attempts for a run that fails to start
+APIFY_START_RETRY_BASE_SECONDS = float(os.getenv("APIFY_START_RETRY_BASE_SECONDS", 2))
+APIFY_START_RETRY_MAX_SECONDS = float(os.getenv("APIFY_START_RETRY_MAX_SECONDS", 30))
+
+# RUN-COMPLETION WEBHOOKS (set APIFY_WEBHOOK_URL to the public address of the local receiver, and a secret)
+APIFY_WEBHOOK_URL = os.getenv("APIFY_WEBHOOK_URL")
+APIFY_WEBHOOK_SECRET = os.getenv("APIFY_WEBHOOK_SECRET", "")  # required whenever APIFY_WEBHOOK_URL is set
+APIFY_WEBHOOK_HOST = os.getenv("APIFY_WEBHOOK_HOST", "127.0.0.1")  # e.g. 0.0.0.0 when no local reverse proxy forwards to it
+APIFY_WEBHOOK_PORT = int(os.getenv("APIFY_WEBHOOK_PORT", 8787))
+APIFY_WEBHOOK_PATH = "/apify/run-finished"
+APIFY_WEBHOOK_EVENTS = ["ACTOR.RUN.SUCCEEDED", "ACTOR.RUN.FAILED", "ACTOR.RUN.ABORTED", "ACTOR.RUN.TIMED_OUT"]
+APIFY_WEBHOOK_FALLBACK_POLL_SECONDS = float(os.getenv("APIFY_WEBHOOK_FALLBACK_POLL_SECONDS", 60))  # in case a webhook is lost
+
+# PIPELINE STAGES (scrape → analyze → price per listing; bounded queues give backpressure)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+PIPELINE_ANALYSIS_WORKERS = int(os.getenv("PIPELINE_ANALYSIS_WORKERS", 2))
+PIPELINE_PACK_LINGER_SECONDS = float(os.getenv("PIPELINE_PACK_LINGER_SECONDS", 2.0))  # wait for neighbours to pack with
+
+# GPT MODEL & PROMPT VERSIONING (bump PROMPT_VERSION whenever the prompt changes)
+GPT_MODEL = "gpt-4"
+PROMPT_VERSION = "enhanced-v2"
+
+# PER-REQUEST COMMENT BUDGET (tokens of guest comments per GPT request; larger listings are map-reduced)
+ANALYSIS_CHUNK_TOKEN_BUDGET = int(os.getenv("ANALYSIS_CHUNK_TOKEN_BUDGET", 3000))
+
+# PACKED PROMPTS (small listings share one request and one copy of the inspection prompt)
+PACK_SMALL_LISTINGS = os.getenv("PACK_SMALL_LISTINGS", "true").lower() == "true"
+PACKED_LISTING_MAX_TOKENS = int(os.getenv("PACKED_LISTING_MAX_TOKENS", 400))
+PACKED_MAX_LISTINGS = int(os.getenv("PACKED_MAX_LISTINGS", 6))
+
+# LOCAL PRE-TRIAGE (only comments likely to contain issues are sent to GPT)
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "true").lower() == "true"
+
+# OPENAI ACCOUNT LIMITS (shared by the pipeline and the dashboard)
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", 500))
+OPENAI_TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", 40000))  # gpt-4 at usage tier 2; set to the account's limit
+OPENAI_EXPECTED_COMPLETION_TOKENS = int(os.getenv("OPENAI_EXPECTED_COMPLETION_TOKENS", 1000))  # reserved per request, reconciled with usage
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+
+# SHARED HTTP CONNECTION POOL (keep-alive, per-host limits, DNS cache)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 60
+HTTP_REQUEST_TIMEOUT = 45  # thorough analyses can take a while
+
+# LOCAL DATA & ANALYSIS CACHE
+DATA_DIR = os.getenv("PROPERTY_DATA_DIR", ".property_data")
+ANALYSIS_CACHE_PATH = os.path.join(DATA_DIR, "analysis_cache.db")
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 5000))
+LISTING_STATE_PATH = os.path.join(DATA_DIR, "listing_state.db")
+REVIEW_STORE_PATH = os.path.join(DATA_DIR, "reviews.db")
+REVIEW_DATA_LIMIT = int(os.getenv("REVIEW_DATA_LIMIT", 500))  # newest stored reviews loaded for display after a cycle
+MERGED_MAX_ISSUES = int(os.getenv("MERGED_MAX_ISSUES", 30))  # per kind in a listing's accumulated analysis, newest kept
+MERGED_HISTORY_MAX_WEIGHT = int(os.getenv("MERGED_HISTORY_MAX_WEIGHT", 50))  # comments the stored history counts as, at most
+
+# SMTP TRANSPORT (authenticated connections are pooled and reused across messages)
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+SMTP_SEND_RETRIES = int(os.getenv("SMTP_SEND_RETRIES", 1))  # reconnect-and-resend attempts after a dropped connection
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"  # STARTTLS; off only for local sinks
+SMTP_ASYNC = os.getenv("SMTP_ASYNC", "true").lower() == "true"  # asyncio client instead of smtplib in threads
+
+# DURABLE EMAIL OUTBOX (cycles enqueue; a dispatcher drains with retries, per-recipient digests and a send rate)
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "true").lower() == "true"
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(DATA_DIR, "outbox.db"))
+OUTBOX_HOLD_SECONDS = float(os.getenv("OUTBOX_HOLD_SECONDS", 0))  # >0 lets back-to-back cycles merge into one digest
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", 30))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", 3600))
+OUTBOX_DIGEST_MAX_MESSAGES = int(os.getenv("OUTBOX_DIGEST_MAX_MESSAGES", 20))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 30))
+OUTBOX_SEND_LEASE_SECONDS = float(os.getenv("OUTBOX_SEND_LEASE_SECONDS", 600))  # a crashed dispatcher's claimed emails return after this
+EMAIL_SEND_RATE_PER_MINUTE = int(os.getenv("EMAIL_SEND_RATE_PER_MINUTE", 20))
+
+# ISSUE FINGERPRINT INDEX (teams are only re-notified about new, escalated or reopened issues)
+ISSUE_SUPPRESSION_ENABLED = os.getenv("ISSUE_SUPPRESSION_ENABLED", "true").lower() == "true"
+ISSUE_INDEX_PATH = os.path.join(DATA_DIR, "issues.db")
+
+# SHARDED CYCLES (coordinator enqueues listing shards; workers lease them from a shared SQLite queue)
+WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH", os.path.join(DATA_DIR, "work_queue.db"))
+SHARD_SIZE = int(os.getenv("SHARD_SIZE", 25))
+SHARD_LEASE_SECONDS = int(os.getenv("SHARD_LEASE_SECONDS", 300))
+SHARD_MAX_ATTEMPTS = int(os.getenv("SHARD_MAX_ATTEMPTS", 3))
+CYCLE_TIMEOUT_SECONDS = int(os.getenv("CYCLE_TIMEOUT_SECONDS", 3600))
+WORKER_EXIT_GRACE_SECONDS = int(os.getenv("WORKER_EXIT_GRACE_SECONDS", 60))  # local workers still running after a cycle are stopped
+
+# ============================================================================
+# PORTFOLIO (INDEXED LISTINGS LOADED FROM CSV / JSON / SQLITE)
+# ============================================================================
+
+class Listing(NamedTuple):
+    """One rentable listing; repeated strings (city, owner, tags) are interned"""
+    listing_id: str
+    name: str
+    url: str
+    base_price: int
+    city: str = ""
+    owner: str = ""
+    tags: Tuple[str, ...] = ()
+
+class Portfolio:
+    """Immutable listing collection with O(1) lookups by id/name and indexes for subset selection.
+    
+    listing_id is the unique key for everything stored per listing; names are display labels
+    and may repeat (label() disambiguates them).
+    """
+    
+    FIELDS = Listing._fields
+    
+    def __init__(self, listings):
+        self.listings = tuple(listings)
+        self._by_id = {}
+        self._by_name = {}
+        self._by_tag, self._by_city, self._by_owner = {}, {}, {}
+        
+        for position, listing in enumerate(self.listings):
+            if listing.listing_id in self._by_id:
+                raise ValueError(f"Duplicate listing id in portfolio: {listing.listing_id}")
+            self._by_id[listing.listing_id] = position
+            self._by_name.setdefault(listing.name, []).append(position)
+            for tag in listing.tags:
+                self._by_tag.setdefault(tag, []).append(position)
+            if listing.city:
+                self._by_city.setdefault(listing.city, []).append(position)
+            if listing.owner:
+                self._by_owner.setdefault(listing.owner, []).append(position)
+    
+    def __len__(self):
+        return len(self.listings)
+    
+    def __iter__(self):
+        return iter(self.listings)
+    
+    def get(self, listing_id):
+        position = self._by_id.get(listing_id)
+        return self.listings[position] if position is not None else None
+    
+    def by_name(self, name):
+        """First listing with this name"""
+        positions = self._by_name.get(name)
+        return self.listings[positions[0]] if positions else None
+    
+    def label(self, listing_id):
+        """Display name for a listing id; shared names get the id appended"""
+        listing = self.get(listing_id)
+        if listing is None:
+            return listing_id
+        return listing.name if len(self._by_name[listing.name]) == 1 else f"{listing.name} [{listing_id}]"
+    
+    def labelled(self, by_id):
+        """{listing id: value} re-keyed by display label (emails, dashboard)"""
+        return {self.label(listing_id): value for listing_id, value in by_id.items()}
+    
+    def base_pricing(self):
+        """{listing id: base nightly price}"""
+        return {listing.listing_id: listing.base_price for listing in self.listings}
+    
+    def select(self, tags=None, cities=None, owners=None, listing_ids=None):
+        """Subset portfolio: each given filter matches any of its values, filters are ANDed"""
+        positions = None
+        for index, values in ((self._by_tag, tags), (self._by_city, cities), (self._by_owner, owners)):
+            if values:
+                matched = {position for value in values for position in index.get(value, ())}
+                positions = matched if positions is None else positions & matched
+        if listing_ids:
+            matched = {self._by_id[listing_id] for listing_id in listing_ids if listing_id in self._by_id}
+            positions = matched if positions is None else positions & matched
+        if positions is None:
+            return self
+        return Portfolio(self.listings[position] for position in sorted(positions))
+    
+    def describe(self):
+        cities = len(self._by_city)
+        owners = len(self._by_owner)
+        return f"{len(self)} properties" + (f" in {cities} cities" if cities else "") + (f", {owners} owners" if owners else "")
+    
+    # ---- loaders ---------------------------------------------------------------
+    
+    @staticmethod
+    def make_listing(row):
+        """Listing from a loosely typed record (CSV row, JSON object, SQLite row)"""
+        tags = row.get("tags") or ()
+        if isinstance(tags, str):
+            tags = re.split(r"[;|,]", tags)
+        return Listing(
+            listing_id=str(row.get("listing_id") or row.get("id") or row["name"]),
+            name=row["name"],
+            url=row["url"],
+            base_price=int(float(row.get("base_price") or DEFAULT_BASE_PRICE)),
+            city=sys.intern((row.get("city") or "").strip()),
+            owner=sys.intern((row.get("owner") or "").strip()),
+            tags=tuple(sys.intern(tag.strip()) for tag in tags if tag and tag.strip())
+        )
+    
+    @classmethod
+    def from_source(cls, path):
+        """Load from .csv, .json or a SQLite file with a 'listings' table"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".csv":
+            with open(path, newline="", encoding="utf-8") as f:
+                return cls(cls.make_listing(row) for row in csv.DictReader(f))
+        if extension == ".json":
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(cls.make_listing(row) for row in (data.get("listings", []) if isinstance(data, dict) else data))
+        if extension in (".db", ".sqlite", ".sqlite3"):
+            conn = sqlite3.connect(path)
+            try:
+                conn.row_factory = sqlite3.Row
+                rows = conn.execute("SELECT * FROM listings").fetchall()
+                return cls(cls.make_listing(dict(row)) for row in rows)
+            finally:
+                conn.close()
+        raise ValueError(f"Unsupported portfolio source: {path}")
+    
+    @classmethod
+    def default(cls):
+        """The built-in LISTINGS, ids taken from the Booking.com URL slug"""
+        return cls(
+            Listing(re.search(r"/hotel/[^/]+/([^./]+)", url).group(1), name, url, price)
+            for name, url, price in LISTINGS
+        )
+
+def load_portfolio(source=None, tags=None, cities=None, owners=None):
+    """Portfolio from PORTFOLIO_SOURCE (or the built-in listings), narrowed by the PORTFOLIO_* filters"""
+    source = source or PORTFOLIO_SOURCE
+    portfolio = Portfolio.from_source(source) if source else Portfolio.default()
+    split = lambda value: [part.strip() for part in value.split(",") if part.strip()] if value else None
+    return portfolio.select(
+        tags=tags or split(PORTFOLIO_TAGS),
+        cities=cities or split(PORTFOLIO_CITIES),
+        owners=owners or split(PORTFOLIO_OWNERS)
+    )
+
+# ============================================================================
+# PERSISTENT RESULT CACHE (CONTENT-ADDRESSED, TTL + LRU)
+# ============================================================================
+
+def content_hash(*parts):
+    """Stable SHA-256 hex digest of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def connect_sqlite(path, journal_mode="WAL"):
+    """Open a SQLite database under DATA_DIR, safe to share across threads.
+    
+    WAL needs shared memory, so it only works for processes on one host; files shared between
+    machines must use a rollback journal (journal_mode="DELETE").
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.execute("PRAGMA synchronous=NORMAL" if journal_mode == "WAL" else "PRAGMA synchronous=FULL")
+    return conn
+
+class PersistentCache:
+    """SQLite-backed key/value cache with TTL expiry and size-bounded LRU eviction"""
+    
+    def __init__(self, path, ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS, max_entries=ANALYSIS_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache(last_access)")
+    
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            with self._conn:
+                if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(value)
+    
+    def set(self, key, value):
+        """Store a JSON-serializable value and evict least recently used entries over the limit"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            if self.ttl_seconds:
+                self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            if self.max_entries:
+                self._conn.execute("""
+                    DELETE FROM cache WHERE key IN (
+                        SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )""", (self.max_entries,))
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+# ============================================================================
+# TOKEN COUNTING & ANALYSIS MERGING
+# ============================================================================
+
+_token_encoding = None
+
+def _get_token_encoding():
+    global _token_encoding
+    if _token_encoding is None and tiktoken is not None:
+        try:
+            _token_encoding = tiktoken.encoding_for_model(GPT_MODEL)
+        except Exception:
+            _token_encoding = False  # unknown model or offline: use the heuristic
+    return _token_encoding or None
+
+def count_tokens(text):
+    """Tokens in text (tiktoken when installed, else ~4 characters per token)"""
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text so it fits in max_tokens"""
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+def issue_identity(issue_key, issue):
+    """(place, normalized guest comment): the same complaint across batches despite GPT rewording"""
+    place = issue.get("category") if issue_key.startswith("maintenance") else issue.get("location")
+    comment = MENTION_COUNT_SUFFIX.sub("", issue.get("guest_comment", "")) or issue.get("problem", "")
+    return (place or "general").strip().lower(), tuple(CommentDeduplicator.normalize(comment))
+
+def combine_weighted_analyses(weighted_analyses):
+    """Merge [(analysis, weight), ...] into one analysis.
+    
+    Scores are weight-averaged, issues are deduplicated by issue_identity (the first
+    analysis listing an issue wins), sentiment is the one carrying the most weight and
+    statistics are summed.
+    """
+    weighted_analyses = [(analysis, weight) for analysis, weight in weighted_analyses if analysis and weight > 0]
+    if not weighted_analyses:
+        return None
+    if len(weighted_analyses) == 1:
+        return weighted_analyses[0][0]
+    
+    total = sum(weight for _, weight in weighted_analyses)
+    
+    def weighted(key, default):
+        return sum(analysis.get(key, default) * weight for analysis, weight in weighted_analyses) / total
+    
+    combined = dict(weighted_analyses[0][0])
+    combined["satisfaction_score"] = round(weighted("satisfaction_score", 80), 1)
+    combined["recommended_price_change"] = round(weighted("recommended_price_change", 0), 1)
+    combined["confidence"] = round(weighted("confidence", 0.5), 2)
+    
+    sentiment_weight = {}
+    for analysis, weight in weighted_analyses:
+        sentiment = analysis.get("guest_sentiment", "neutral")
+        sentiment_weight[sentiment] = sentiment_weight.get(sentiment, 0) + weight
+    combined["guest_sentiment"] = max(sentiment_weight, key=sentiment_weight.get)
+    
+    for key in ("cleaning_issues", "maintenance_issues"):
+        issues, known = [], set()
+        for analysis, _ in weighted_analyses:
+            for issue in analysis.get(key, []):
+                identity = issue_identity(key, issue)
+                if identity not in known:
+                    known.add(identity)
+                    issues.append(issue)
+        combined[key] = issues
+    
+    stats = {}
+    for analysis, _ in weighted_analyses:
+        for stat, value in analysis.get("analysis_statistics", {}).items():
+            if isinstance(value, (int, float)):
+                stats[stat] = stats.get(stat, 0) + value
+    combined["analysis_statistics"] = stats
+    return combined
+
+# ============================================================================
+# SHARED HTTP CLIENT (ONE POOLED CONNECTION SET PER PROCESS)
+# ============================================================================
+
+class SharedHTTPClient:
+    """Process-wide pooled HTTP clients so repeated API calls reuse warm TLS connections.
+    
+    aiohttp sessions are bound to an event loop, so one session is kept per loop;
+    threads share one blocking client (HTTP/2 via httpx when available, else requests).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async_sessions = {}
+        self._sync_client = None
+    
+    async def session(self):
+        """Pooled aiohttp session for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Sessions of loops that have since been closed cannot be reused
+            for stale_loop in [l for l in self._async_sessions if l.is_closed()]:
+                del self._async_sessions[stale_loop]
+            
+            session = self._async_sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=HTTP_POOL_LIMIT,
+                    limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                    ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                    keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+                )
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=HTTP_REQUEST_TIMEOUT)
+                )
+                self._async_sessions[loop] = session
+            return session
+    
+    def sync_client(self):
+        """Pooled blocking client shared by all threads"""
+        with self._lock:
+            if self._sync_client is None:
+                if httpx is not None:
+                    self._sync_client = httpx.Client(
+                        http2=True,
+                        limits=httpx.Limits(
+                            max_connections=HTTP_POOL_LIMIT,
+                            max_keepalive_connections=HTTP_POOL_LIMIT_PER_HOST,
+                            keepalive_expiry=HTTP_KEEPALIVE_TIMEOUT
+                        ),
+                        timeout=HTTP_REQUEST_TIMEOUT
+                    )
+                else:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(
+                        pool_connections=HTTP_POOL_LIMIT_PER_HOST,
+                        pool_maxsize=HTTP_POOL_LIMIT_PER_HOST
+                    )
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._sync_client = session
+            return self._sync_client
+    
+    @property
+    def sync_errors(self):
+        """Transport exceptions raised by the blocking client"""
+        if httpx is not None:
+            return (requests.RequestException, httpx.HTTPError)
+        return (requests.RequestException,)
+    
+    async def close_async(self):
+        """Close the session of the running loop (call once when the loop is done with HTTP)"""
+        with self._lock:
+            session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+    
+    def close(self):
+        with self._lock:
+            client, self._sync_client = self._sync_client, None
+        if client is not None:
+            client.close()
+
+SHARED_HTTP_CLIENT = SharedHTTPClient()
+
+# ============================================================================
+# GLOBAL OPENAI RATE LIMITER (CONCURRENCY CAP + RPM/TPM TOKEN BUCKETS)
+# ============================================================================
+
+class TokenBucket:
+    """Per-minute budget that refills continuously; reservations may go into debt"""
+    
+    def __init__(self, capacity_per_minute):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def reserve(self, amount):
+        """Take amount from the bucket and return how long the caller must wait for it"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+    
+    def adjust(self, amount):
+        """Give back (positive) or additionally charge (negative) part of an earlier reservation"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+class OpenAIRequestError(Exception):
+    """OpenAI answered with a non-retryable (or retries-exhausted) HTTP status"""
+    
+    def __init__(self, status):
+        super().__init__(f"OpenAI request failed with status {status}")
+        self.status = status
+
+class OpenAIRateLimiter:
+    """Process-wide OpenAI limiter shared by asyncio tasks and dashboard threads"""
+    
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, max_concurrent=MAX_CONCURRENT_GPT, rpm=OPENAI_RPM_LIMIT, tpm=OPENAI_TPM_LIMIT,
+                 max_retries=OPENAI_MAX_RETRIES, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0}
+    
+    @staticmethod
+    def estimate_tokens(payload):
+        """Prompt tokens plus the completion we expect (not the max_tokens ceiling); settle() corrects it"""
+        prompt_tokens = sum(count_tokens(message.get("content", "")) for message in payload.get("messages", []))
+        return prompt_tokens + min(payload.get("max_tokens", OPENAI_EXPECTED_COMPLETION_TOKENS), OPENAI_EXPECTED_COMPLETION_TOKENS)
+    
+    def _reserve(self, tokens):
+        with self._lock:
+            wait = max(self._requests.reserve(1), self._tokens.reserve(tokens))
+            return max(wait, self._paused_until - time.monotonic())
+    
+    def settle(self, reserved, usage):
+        """Reconcile a reservation with the response's usage; None means rejected (nothing used).
+        
+        Answers without usage keep the estimate.
+        """
+        if usage is None:
+            used = 0
+        elif "total_tokens" in usage:
+            used = usage["total_tokens"]
+        else:
+            return
+        with self._lock:
+            self._tokens.adjust(reserved - used)
+    
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def _pause(self, delay):
+        """After a 429 every caller waits, not just the one that was rejected"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+    
+    def backoff_delay(self, attempt, retry_after=None):
+        """Server-provided Retry-After if present, else jittered exponential backoff"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.5)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    @staticmethod
+    def parse_retry_after(headers):
+        """Seconds to wait from retry-after-ms / Retry-After response headers"""
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("Retry-After"):
+                return float(headers["Retry-After"])
+        except (TypeError, ValueError):
+            pass
+        return None
+    
+    async def acquire_async(self, tokens):
+        await asyncio.sleep(self._reserve(tokens))
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+    
+    def acquire(self, tokens):
+        time.sleep(self._reserve(tokens))
+        self._slots.acquire()
+    
+    def release(self):
+        self._slots.release()
+    
+    def _next_delay(self, attempt, status, headers):
+        if status == 429:
+            self._count("rate_limited")
+        retry_after = self.parse_retry_after(headers) if headers is not None else None
+        delay = self.backoff_delay(attempt, retry_after)
+        if status == 429:
+            self._pause(delay)
+        self._count("retries")
+        return delay
+    
+    async def post_chat_async(self, session, headers, payload):
+        """POST a chat completion with limiting and retries. Returns (status, json or None)."""
+        tokens = self.estimate_tokens(payload)
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            try:
+                self._count("requests")
+                async with session.post(OPENAI_CHAT_URL, headers=headers, json=payload) as response:
+                    status, response_headers = response.status, response.headers
+                    if status == 200:
+                        result = await response.json()
+                        self.settle(tokens, result.get("usage", {}))
+                        return status, result
+                    self.settle(tokens, None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                status, response_headers = None, None
+            finally:
+                self.release()
+            
+            if status is not None and (status not in self.RETRYABLE_STATUSES or attempt == self.max_retries):
+                return status, None
+            await asyncio.sleep(self._next_delay(attempt, status, response_headers))
+        return status, None
+    
+    async def stream_chat_async(self, session, headers, payload):
+        """POST a streaming chat completion and yield content deltas from the server-sent events.
+        
+        Retries (with the same limiting/backoff) only happen before the first delta is yielded;
+        a connection dropped mid-answer is raised, since the caller already consumed part of it.
+        """
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        tokens = self.estimate_tokens(payload)
+        started = False
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(tokens)
+            try:
+                self._count("requests")
+                async with session.post(OPENAI_CHAT_URL, headers=headers, json=payload) as response:
+                    status, response_headers = response.status, response.headers
+                    if status == 200:
+                        async for raw_line in response.content:
+                            line = raw_line.decode("utf-8").strip()
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+                            event = json.loads(data)
+                            if event.get("usage"):
+                                self.settle(tokens, event["usage"])  # final chunk, no choices
+                            if not event.get("choices"):
+                                continue
+                            delta = event["choices"][0].get("delta", {}).get("content")
+                            if delta:
+                                started = True
+                                yield delta
+                        return
+                    self.settle(tokens, None)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if started or attempt == self.max_retries:
+                    raise
+                status, response_headers = None, None
+            finally:
+                self.release()
+            
+            if status is not None and (status not in self.RETRYABLE_STATUSES or attempt == self.max_retries):
+                raise OpenAIRequestError(status)
+            await asyncio.sleep(self._next_delay(attempt, status, response_headers))
+        raise OpenAIRequestError(status)
+    
+    def post_chat_sync(self, headers, payload, timeout, http=None):
+        """Blocking variant for threads (dashboard helpers). Returns (status, json or None)."""
+        http = http or SHARED_HTTP_CLIENT.sync_client()
+        tokens = self.estimate_tokens(payload)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                self._count("requests")
+                response = http.post(OPENAI_CHAT_URL, headers=headers, json=payload, timeout=timeout)
+                status, response_headers = response.status_code, response.headers
+                if status == 200:
+                    result = response.json()
+                    self.settle(tokens, result.get("usage", {}))
+                    return status, result
+                self.settle(tokens, None)
+            except SHARED_HTTP_CLIENT.sync_errors:
+                if attempt == self.max_retries:
+                    raise
+                status, response_headers = None, None
+            finally:
+                self.release()
+            
+            if status is not None and (status not in self.RETRYABLE_STATUSES or attempt == self.max_retries):
+                return status, None
+            time.sleep(self._next_delay(attempt, status, response_headers))
+        return status, None
+
+OPENAI_RATE_LIMITER = OpenAIRateLimiter()
+
+# ============================================================================
+# PER-LISTING WATERMARKS FOR INCREMENTAL ANALYSIS
+# ============================================================================
+
+def review_hash(review):
+    """Identity of a scraped review: listing, date, type and exact comment"""
+    return content_hash(review.get("listing"), review.get("date"), review.get("type"), review.get("comment"))
+
+class ListingStateStore:
+    """Persists each listing's review watermark and its accumulated analysis, keyed by listing id"""
+    
+    def __init__(self, path=LISTING_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing_state (
+                    listing TEXT PRIMARY KEY,
+                    latest_review_date TEXT NOT NULL DEFAULT '',
+                    seen_hashes TEXT NOT NULL DEFAULT '{}',
+                    analysis TEXT,
+                    comments_analyzed INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )""")
+    
+    def get(self, listing):
+        """Return the stored state for a listing, or None on first sight"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latest_review_date, seen_hashes, analysis, comments_analyzed FROM listing_state WHERE listing = ?",
+                (listing,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "latest_review_date": row[0],
+            "seen_hashes": json.loads(row[1]),
+            "analysis": json.loads(row[2]) if row[2] else None,
+            "comments_analyzed": row[3]
+        }
+    
+    def replace(self, listing, state):
+        """Save state, or forget the listing when state is None"""
+        if state is not None:
+            return self.save(listing, state)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listing_state WHERE listing = ?", (listing,))
+    
+    def save(self, listing, state):
+        """Write back the watermark and merged analysis for a listing"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listing_state VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    listing,
+                    state["latest_review_date"],
+                    json.dumps(state["seen_hashes"]),
+                    json.dumps(state["analysis"], ensure_ascii=False) if state.get("analysis") else None,
+                    state["comments_analyzed"],
+                    time.time()
+                )
+            )
+    
+    @staticmethod
+    def is_seen(review, state):
+        """True if an earlier cycle already covered this review"""
+        if not state:
+            return False
+        date = review.get("date") or ""
+        latest = state["latest_review_date"]
+        return review_hash(review) in state["seen_hashes"] or bool(latest and date and date < latest)
+    
+    @staticmethod
+    def scrape_cutoff_date(state):
+        """Oldest review date worth requesting from the scraper (one day of slack for the boundary day)"""
+        if not state or not state.get("latest_review_date"):
+            return None
+        try:
+            latest = datetime.strptime(state["latest_review_date"], "%Y-%m-%d")
+        except ValueError:
+            return None
+        return (latest - timedelta(days=1)).strftime("%Y-%m-%d")
+    
+    @staticmethod
+    def split_new_reviews(reviews, state):
+        """Return (new_reviews, advanced_watermark) for one listing's scraped reviews.
+        
+        Reviews older than the watermark date were covered by earlier cycles; reviews on the
+        watermark date (or undated) are checked against the seen-hash set.
+        """
+        latest = state["latest_review_date"] if state else ""
+        seen = dict(state["seen_hashes"]) if state else {}
+        
+        new_reviews = []
+        for review in reviews:
+            h = review_hash(review)
+            date = review.get("date") or ""
+            if h in seen or (latest and date and date < latest):
+                continue
+            new_reviews.append(review)
+            seen[h] = date
+        
+        new_latest = max([latest] + [r.get("date") or "" for r in new_reviews])
+        # Only the boundary day (and undated reviews) need hash checks next cycle
+        seen = {h: d for h, d in seen.items() if not d or d >= new_latest}
+        return new_reviews, {"latest_review_date": new_latest, "seen_hashes": seen}
+
+# ============================================================================
+# PERSISTENT REVIEW STORE
+# ============================================================================
+
+class ReviewStore:
+    """Embedded SQLite store of every scraped review, deduplicated by review hash"""
+    
+    COLUMNS = ["review_hash", "listing", "date", "type", "comment", "scraped_at"]
+    
+    def __init__(self, path=REVIEW_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    review_hash TEXT NOT NULL,
+                    listing TEXT NOT NULL,
+                    date TEXT NOT NULL DEFAULT '',
+                    type TEXT NOT NULL,
+                    comment TEXT NOT NULL,
+                    scraped_at REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_hash ON reviews(review_hash)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_listing_date ON reviews(listing, date)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_date ON reviews(date)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reviews_type ON reviews(type)")
+    
+    def upsert_reviews(self, reviews):
+        """Bulk insert reviews, ignoring ones already stored. Returns the number of new rows."""
+        now = time.time()
+        rows = [
+            (review_hash(r), r["listing"], r.get("date") or "", r["type"], r["comment"], now)
+            for r in reviews
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO reviews VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(review_hash) DO NOTHING",
+                rows
+            )
+            return self._conn.total_changes - before
+    
+    def query(self, listings=None, review_type=None, since=None, until=None, limit=None):
+        """Load a slice of stored reviews as a DataFrame (newest first)"""
+        clauses, params = [], []
+        if listings:
+            listings = list(listings)
+            clauses.append(f"listing IN ({', '.join('?' * len(listings))})")
+            params.extend(listings)
+        if review_type:
+            clauses.append("type = ?")
+            params.append(review_type)
+        if since:
+            clauses.append("date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("date <= ?")
+            params.append(until)
+        
+        sql = "SELECT listing, date, type, comment FROM reviews"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+    
+    def type_counts(self, listings=None):
+        """{review type: stored reviews}, optionally for some listings only (counted in SQL, nothing loaded)"""
+        sql, params = "SELECT type, COUNT(*) FROM reviews", []
+        if listings:
+            listings = list(listings)
+            sql += f" WHERE listing IN ({', '.join('?' * len(listings))})"
+            params.extend(listings)
+        with self._lock:
+            return dict(self._conn.execute(sql + " GROUP BY type", params).fetchall())
+    
+    def listings(self):
+        """Listing ids that have stored reviews"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT listing FROM reviews ORDER BY listing")]
+    
+    def count(self, listing=None):
+        """Number of stored reviews, optionally for one listing"""
+        with self._lock:
+            if listing:
+                return self._conn.execute("SELECT COUNT(*) FROM reviews WHERE listing = ?", (listing,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0]
+
+# ============================================================================
+# COMPILED KEYWORD MATCHER (FALLBACK & LOCAL DETECTION)
+# ============================================================================
+
+# Comprehensive keyword lists
+CLEANING_KEYWORDS = {
+    'dirty': ['dirty', 'dirt', 'unclean', 'not clean', 'filthy', 'filth', 'grimy', 'grime', 'messy', 'mess'],
+    'stains': ['stained', 'stain', 'stains', 'spots', 'marks', 'residue'],
+    'odors': ['smell', 'smells', 'odor', 'odour', 'stink', 'musty', 'moldy', 'mold', 'mould'],
+    'dust': ['dust', 'dusty', 'hair', 'hairs'],
+    'general': ['gross', 'disgusting', 'nasty', 'needs cleaning', 'could be cleaner', 'poorly cleaned']
+}
+
+MAINTENANCE_KEYWORDS = {
+    'broken': ['broken', 'not working', "doesn't work", 'malfunction', 'out of order'],
+    'comfort': ['uncomfortable', 'hard', 'soft', 'loud', 'noisy'],
+    'temperature': ['hot', 'cold', 'warm', 'cool'],
+    'electrical': ['flickering', 'dim', 'bright', 'slow wifi', 'wifi slow'],
+    'plumbing': ['leaking', 'leak', 'dripping', 'drip', 'stuck', 'jammed']
+}
+
+# Inflections a keyword may carry ("smelly", "stinking", "dirtier", "leaks"); deliberately no
+# "ly"/"el"/"age" so "hardly", "hotel" and "message" do not match "hard", "hot" and "mess"
+KEYWORD_SUFFIXES = ("iness", "iest", "ing", "ier", "ies", "est", "es", "ed", "er", "s", "y")
+
+class KeywordMatcher:
+    """All keyword tables compiled once into a single word-bounded trie regex (one automaton, one pass).
+    
+    A keyword also matches with one of KEYWORD_SUFFIXES attached; matches report the keyword itself.
+    """
+    
+    def __init__(self, tables, suffixes=KEYWORD_SUFFIXES):
+        self.tables = list(tables)
+        self.keyword_categories = {}
+        for table, categories in tables.items():
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    self.keyword_categories.setdefault(keyword, []).append((table, category))
+        suffix_pattern = "(?:" + "|".join(map(re.escape, suffixes)) + ")?" if suffixes else ""
+        self.pattern = re.compile(r"\b(" + self._trie_pattern(self.keyword_categories) + ")" + suffix_pattern + r"\b")
+    
+    @staticmethod
+    def _trie_pattern(keywords):
+        """Alternation factored by common prefixes, so matching cost does not grow per keyword"""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            if "" in node:
+                # Optional and greedy: the longest keyword wins ("dirty" over "dirt")
+                return "(?:" + "|".join(branches) + ")?"
+            return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        
+        return build(trie)
+    
+    def find_keywords(self, comments):
+        """Series aligned with comments: list of matched keywords, in order of appearance"""
+        lowered = comments.fillna("").astype(str).str.lower().str.replace("\u2019", "'", regex=False)
+        return lowered.str.findall(self.pattern)
+    
+    def category_hits(self, comments):
+        """{position: {table: [(category, first keyword), ...]}} for comments with at least one hit"""
+        results, resolved = {}, {}
+        for position, keywords in enumerate(self.find_keywords(comments)):
+            if not keywords:
+                continue
+            keywords = tuple(keywords)
+            if keywords not in resolved:
+                resolved[keywords] = self._resolve_categories(keywords)
+            results[position] = resolved[keywords]
+        return results
+    
+    def _resolve_categories(self, keywords):
+        comment_hits, seen = {}, set()
+        for keyword in keywords:
+            for table, category in self.keyword_categories[keyword]:
+                if (table, category) not in seen:
+                    seen.add((table, category))
+                    comment_hits.setdefault(table, []).append((category, keyword))
+        return comment_hits
+
+KEYWORD_MATCHER = KeywordMatcher({"cleaning": CLEANING_KEYWORDS, "maintenance": MAINTENANCE_KEYWORDS})
+
+# ============================================================================
+# LOCAL PRE-TRIAGE GATE (ONLY ISSUE-BEARING COMMENTS REACH GPT-4)
+# ============================================================================
+
+# Complaint cues that flag a negative comment even without a category keyword
+COMPLAINT_CUES = [
+    'but', 'however', 'unfortunately', 'not', 'no', "didn't", "wasn't", "isn't", "couldn't",
+    'could', 'should', 'would', 'wish', 'lack', 'lacking', 'missing', 'problem', 'issue',
+    'need', 'needs', 'poor', 'bad', 'terrible', 'horrible', 'awful', 'too', 'small', 'tiny',
+    'expensive', 'late', 'difficult', 'hard to', 'annoying', 'disappointed', 'disappointing'
+]
+
+# Booking.com "disliked" answers that mean there was nothing to dislike
+NO_COMPLAINT_PATTERN = re.compile(
+    r"^\W*(nothing|none|nope|n/?a|no complaints?|nothing to (complain|dislike|report|say)( about)?"
+    r"|all (good|great|perfect)|everything was (good|great|perfect|fine)|-+)\W*$"
+)
+
+class CommentTriage:
+    """Routes only comments that likely contain issues to GPT and scores the rest locally"""
+    
+    POSITIVE_LOCAL_SCORE = 92
+    NEGATIVE_LOCAL_SCORE = 85
+    
+    def __init__(self, matcher=None):
+        self.matcher = matcher or KEYWORD_MATCHER
+        self.cue_pattern = re.compile(r"\b(?:" + "|".join(re.escape(cue) for cue in COMPLAINT_CUES) + r")\b")
+        self.stats = self._new_stats()
+    
+    @staticmethod
+    def _new_stats():
+        return {"comments_sent": 0, "comments_skipped": 0, "properties_sent": 0, "properties_skipped": 0}
+    
+    def flag_comments(self, comments, review_type):
+        """Boolean list: which comments likely mention a cleaning/maintenance issue"""
+        if not comments:
+            return []
+        series = pd.Series(list(comments), dtype=object).fillna("").astype(str)
+        has_keyword = self.matcher.find_keywords(series).str.len() > 0
+        if review_type == "positive":
+            return has_keyword.tolist()
+        
+        lowered = series.str.lower().str.strip()
+        no_complaint = lowered.str.match(NO_COMPLAINT_PATTERN) | (lowered.str.len() == 0)
+        has_cue = lowered.str.contains(self.cue_pattern)
+        return (has_keyword | (has_cue & ~no_complaint)).tolist()
+    
+    def reset_stats(self):
+        """Start a new cycle's counters (triage() accumulates across calls)"""
+        self.stats = self._new_stats()
+    
+    def triage(self, property_data_list):
+        """Split each listing's comments. Returns (gpt_property_data_list, {name: (local_analysis, weight)})."""
+        gpt_property_data_list, local_parts = [], {}
+        
+        for property_data in property_data_list:
+            positive, negative = property_data['positive_comments'], property_data['negative_comments']
+            positive_flags = self.flag_comments(positive, "positive")
+            negative_flags = self.flag_comments(negative, "negative")
+            flagged_positive = [c for c, flag in zip(positive, positive_flags) if flag]
+            flagged_negative = [c for c, flag in zip(negative, negative_flags) if flag]
+            skipped_positive = len(positive) - len(flagged_positive)
+            skipped_negative = len(negative) - len(flagged_negative)
+            
+            self.stats["comments_sent"] += len(flagged_positive) + len(flagged_negative)
+            self.stats["comments_skipped"] += skipped_positive + skipped_negative
+            
+            if skipped_positive + skipped_negative:
+                local_parts[property_data['name']] = (
+                    self.local_analysis(skipped_positive, skipped_negative),
+                    skipped_positive + skipped_negative
+                )
+            
+            if flagged_positive or flagged_negative:
+                self.stats["properties_sent"] += 1
+                gpt_property_data_list.append({
+                    **property_data,
+                    'positive_comments': flagged_positive,
+                    'negative_comments': flagged_negative
+                })
+            else:
+                self.stats["properties_skipped"] += 1
+        
+        return gpt_property_data_list, local_parts
+    
+    def local_analysis(self, positive_count, negative_count):
+        """Issue-free analysis for comments the triage kept away from GPT"""
+        total = positive_count + negative_count
+        satisfaction = (positive_count * self.POSITIVE_LOCAL_SCORE + negative_count * self.NEGATIVE_LOCAL_SCORE) / max(total, 1)
+        return {
+            "satisfaction_score": round(satisfaction, 1),
+            "cleaning_issues": [],
+            "maintenance_issues": [],
+            "guest_sentiment": "very satisfied" if satisfaction >= 90 else "satisfied",
+            "recommended_price_change": 0,
+            "confidence": 0.6,
+            "analysis_statistics": {
+                "total_comments_analyzed": total,
+                "negative_comments": negative_count,
+                "positive_comments": positive_count,
+                "cleaning_mentions_detected": 0,
+                "maintenance_mentions_detected": 0,
+                "comments_with_issues": 0
+            }
+        }
+
+# ============================================================================
+# NEAR-DUPLICATE COMMENT COLLAPSING (SHINGLES + MINHASH/LSH)
+# ============================================================================
+
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", 0.6))
+
+DEDUP_STOPWORDS = {
+    'the', 'a', 'an', 'was', 'were', 'is', 'are', 'be', 'been', 'very', 'really', 'quite', 'so',
+    'and', 'of', 'in', 'on', 'at', 'to', 'it', 'its', 'this', 'that', 'there', 'room', 'bit', 'little'
+}
+
+MENTION_COUNT_SUFFIX = re.compile(r"\s*\[mentioned by \d+ guests\]\s*$")
+
+class CommentDeduplicator:
+    """Collapses near-duplicate comments of one listing into representatives with a count"""
+    
+    NUM_PERM = 64
+    BANDS = 16
+    MERSENNE_PRIME = (1 << 61) - 1
+    
+    def __init__(self, threshold=DEDUP_SIMILARITY_THRESHOLD, seed=695):
+        self.threshold = threshold
+        self.rows = self.NUM_PERM // self.BANDS
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, self.MERSENNE_PRIME), rng.randrange(0, self.MERSENNE_PRIME))
+            for _ in range(self.NUM_PERM)
+        ]
+    
+    @staticmethod
+    def normalize(comment):
+        """Lowercase, strip punctuation and filler words"""
+        words = re.sub(r"[^a-z0-9' ]+", " ", comment.lower().replace("\u2019", "'")).split()
+        return [word for word in words if word not in DEDUP_STOPWORDS]
+    
+    @staticmethod
+    def shingles(words):
+        """Word unigrams plus unordered adjacent pairs - short complaints ("wifi slow") need both,
+        and "dirty bathroom" / "bathroom was dirty" must come out the same"""
+        return set(words) | {" ".join(sorted(pair)) for pair in zip(words, words[1:])}
+    
+    def minhash(self, shingle_set):
+        base = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingle_set]
+        return [min((a * h + b) % self.MERSENNE_PRIME for h in base) for a, b in self.permutations]
+    
+    def collapse(self, comments):
+        """Returns (representatives, {representative: cluster size}) preserving first-seen order"""
+        if len(comments) < 2:
+            return list(comments), {comment: 1 for comment in comments}
+        
+        shingle_sets = [self.shingles(self.normalize(comment)) for comment in comments]
+        parent = list(range(len(comments)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        # Identical normalized wording joins without hashing; LSH banding proposes candidates
+        # among the distinct wordings and exact Jaccard on shingles confirms them
+        exact, buckets = {}, {}
+        for i, shingle_set in enumerate(shingle_sets):
+            if not shingle_set:
+                continue
+            key = frozenset(shingle_set)
+            if key in exact:
+                parent[i] = exact[key]
+                continue
+            exact[key] = i
+            signature = self.minhash(shingle_set)
+            for band in range(self.BANDS):
+                band_key = (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                for j in buckets.setdefault(band_key, []):
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j and self._jaccard(shingle_set, shingle_sets[j]) >= self.threshold:
+                        parent[root_i] = root_j
+                buckets[band_key].append(i)
+        
+        clusters = {}
+        for i in range(len(comments)):
+            clusters.setdefault(find(i), []).append(i)
+        
+        representatives, counts = [], {}
+        for members in sorted(clusters.values(), key=lambda members: members[0]):
+            # The most detailed wording speaks for the cluster
+            representative = max((comments[i] for i in members), key=len)
+            representatives.append(representative)
+            counts[representative] = counts.get(representative, 0) + len(members)
+        return representatives, counts
+    
+    @staticmethod
+    def _jaccard(a, b):
+        return len(a & b) / len(a | b) if a and b else 0.0
+    
+    # Share of a quote's words that must come from one representative for the quote to count as that cluster
+    QUOTE_COVERAGE = 0.8
+    
+    @classmethod
+    def expand_issue_counts(cls, analysis, comment_counts):
+        """Attach each issue's cluster size as 'occurrences'.
+        
+        comment_counts holds one entry per cluster (its representative). GPT quotes those
+        representatives, possibly trimmed, so a quote resolves to the single cluster whose
+        representative has the same words or covers most of the quote's words (best overlap wins).
+        """
+        clusters = [(frozenset(cls.normalize(comment)), count) for comment, count in comment_counts.items()]
+        by_words = {words: count for words, count in clusters if words}
+        for issue_key in ("cleaning_issues", "maintenance_issues"):
+            for issue in analysis.get(issue_key, []):
+                quote = MENTION_COUNT_SUFFIX.sub("", issue.get("guest_comment", "")).strip()
+                issue["guest_comment"] = quote
+                words = frozenset(cls.normalize(quote))
+                occurrences = by_words.get(words, 1)
+                if words and words not in by_words:
+                    coverage, _, count = max(
+                        ((len(words & cluster) / len(words), cls._jaccard(words, cluster), count) for cluster, count in clusters),
+                        default=(0, 0, 1)
+                    )
+                    if coverage >= cls.QUOTE_COVERAGE:
+                        occurrences = count
+                issue["occurrences"] = max(occurrences, issue.get("occurrences", 1))
+        return analysis
+
+# ============================================================================
+# INCREMENTAL ISSUE PARSER FOR STREAMED GPT ANSWERS
+# ============================================================================
+
+class IncrementalIssueParser:
+    """Emits cleaning/maintenance issues from a partial JSON answer as soon as each array element closes.
+    
+    Only the top-level "cleaning_issues"/"maintenance_issues" arrays are tracked.
+    """
+    
+    ISSUE_KEYS = ("cleaning_issues", "maintenance_issues")
+    
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._current_key = None
+        self._array_kind = None
+        self._array_depth = None
+        self._element_start = None
+    
+    def feed(self, text):
+        """Add streamed text; returns [(issue_key, issue_dict), ...] completed by it"""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:pos + 1]
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":":
+                self._current_key = json.loads(self._last_string) if self._last_string else None
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._depth == 2 and self._current_key in self.ISSUE_KEYS:
+                    self._array_kind, self._array_depth = self._current_key, self._depth
+                elif char == "{" and self._array_kind is not None and self._depth == self._array_depth + 1:
+                    self._element_start = pos
+                self._current_key = None
+            elif char in "}]":
+                if char == "}" and self._element_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        completed.append((self._array_kind, json.loads(buffer[self._element_start:pos + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._element_start = None
+                elif char == "]" and self._array_kind is not None and self._depth == self._array_depth:
+                    self._array_kind = self._array_depth = None
+                self._depth -= 1
+            elif char == ",":
+                self._current_key = None
+            if char not in ' \t\r\n:"':
+                self._last_string = None
+        self._pos = len(buffer)
+        return completed
+
+class DeliveredIssueTracker:
+    """Wraps one analysis' on_issue callback and remembers which guest comments it already reported.
+    
+    A stream that fails midway has delivered some issues before its chunk falls back to keyword
+    analysis; the fallback issues whose comment was already quoted are then suppressed.
+    """
+    
+    def __init__(self, on_issue):
+        self.on_issue = on_issue
+        self.delivered = {issue_key: [] for issue_key in IncrementalIssueParser.ISSUE_KEYS}
+    
+    @staticmethod
+    def comment_words(issue):
+        comment = MENTION_COUNT_SUFFIX.sub("", str(issue.get("guest_comment", "")))
+        return frozenset(CommentDeduplicator.normalize(comment))
+    
+    def __call__(self, property_name, issue_key, issue):
+        words = self.comment_words(issue)
+        if words:
+            self.delivered.setdefault(issue_key, []).append(words)
+        return self.on_issue(property_name, issue_key, issue)
+    
+    def already_delivered(self, issue_key, issue):
+        """True when an issue of this kind already quoted (part of) the same guest comment"""
+        words = self.comment_words(issue)
+        return bool(words) and any(quoted <= words for quoted in self.delivered.get(issue_key, []))
 
 # ============================================================================
 # ENHANCED GPT-4 PROCESSOR WITH SUPERIOR CLEANING DETECTION
@@ -67,67 +1446,415 @@ MAX_CONCURRENT_EMAILS = 3
 class EnhancedGPTProcessor:
     """Enhanced GPT-4 processor that catches ALL cleaning and maintenance issues"""
     
-    def __init__(self, api_key: str):
+    INSPECTION_GUIDELINES = """CRITICAL CLEANING DETECTION INSTRUCTIONS:
+You MUST detect ANY mention of these cleaning-related words/concepts:
+
+🧹 CLEANING ISSUES TO DETECT:
+- dirty, dirt, dusty, dust, messy, mess, unclean, not clean, needs cleaning
+- stained, stains, spots, marks, residue, grime, grimy, filthy
+- smells, odor, odour, stinks, stinky, musty, moldy, mold, mildew
+- hair, hairs (any type), soap scum, grease, greasy, sticky, crusty
+- untidy, unkempt, sloppy, gross, disgusting, nasty, yucky
+- "could be cleaner", "not very clean", "poorly cleaned", "needs attention"
+- bathroom issues: toilet dirty, shower dirty, sink dirty, mirror spots
+- kitchen issues: dishes dirty, counters dirty, appliances dirty
+- bedroom issues: sheets dirty, pillows dirty, floor dirty, surfaces dirty
+- general: windows dirty, walls dirty, floors dirty, furniture dirty
+
+🔧 MAINTENANCE ISSUES TO DETECT:
+- broken, not working, doesn't work, malfunction, out of order
+- slow, fast, loud, noisy, quiet, silent, flickering, dim, bright
+- hot, cold, warm, cool, uncomfortable, hard, soft, loose, tight
+- stuck, jammed, leaking, dripping, cracked, chipped, torn, worn
+- WiFi slow, TV problems, AC issues, heating problems, bed uncomfortable
+- plumbing issues, electrical problems, appliance failures
+
+ANALYSIS REQUIREMENTS:
+1. Read EVERY comment word by word
+2. Extract MULTIPLE issues from single comments when present
+3. Even minor mentions count (like "a bit dirty" = cleaning issue)
+4. Classify location precisely (bathroom/kitchen/bedroom/living room)
+5. Rate severity realistically (guest complaints = at least Medium severity)"""
+    
+    INSPECTION_CLOSING = "CRITICAL: Do NOT miss cleaning issues. Every guest complaint about cleanliness costs revenue and reputation. Be thorough and comprehensive."
+    
+    def __init__(self, api_key: str, cache: Optional[PersistentCache] = None,
+                 rate_limiter: Optional[OpenAIRateLimiter] = None):
         self.api_key = api_key
         self.session = None
+        self.cache = cache
+        self.rate_limiter = rate_limiter or OPENAI_RATE_LIMITER
         
     async def create_session(self):
-        """Create reusable HTTP session for speed"""
-        if not self.session:
-            timeout = aiohttp.ClientTimeout(total=45)  # Increased timeout for thorough analysis
-            self.session = aiohttp.ClientSession(timeout=timeout)
+        """Attach the process-wide pooled session (kept warm across batches)"""
+        if not self.session or self.session.closed:
+            self.session = await SHARED_HTTP_CLIENT.session()
     
     async def close_session(self):
-        """Clean up session"""
-        if self.session:
-            await self.session.close()
+        """Detach from the pooled session; the pool itself stays open for the next batch"""
+        self.session = None
     
-    async def batch_analyze_properties(self, property_data_list):
-        """Analyze multiple properties with ENHANCED cleaning detection"""
+    async def batch_analyze_properties(self, property_data_list, pack_small=None, on_issue=None):
+        """Analyze multiple properties with ENHANCED cleaning detection.
+        
+        on_issue(property_name, issue_key, issue), sync or async, is called for each issue as soon as
+        it is parsed from the streamed GPT answer - before the property's analysis is complete.
+        """
         await self.create_session()
+        pack_small = PACK_SMALL_LISTINGS if pack_small is None else pack_small
+        
+        # Small listings share one packed request; large ones keep the single-property path
+        property_analyses = {}
+        single_properties = list(property_data_list)
+        packs = []
+        if pack_small:
+            single_properties, packs, property_analyses = self._plan_packed_requests(property_data_list)
+            for property_name, analysis in property_analyses.items():
+                await self._emit_issues(on_issue, property_name, analysis)
         
         # Create concurrent tasks for all properties
         tasks = []
-        for property_data in property_data_list:
+        for property_data in single_properties:
             task = self.analyze_single_property_enhanced(
                 property_data['name'],
                 property_data['positive_comments'],
-                property_data['negative_comments']
+                property_data['negative_comments'],
+                on_issue=on_issue,
+                comment_counts=property_data.get('comment_counts'),
+                cache_checked=property_data.get('cache_checked', False)
             )
             tasks.append(task)
+        for pack in packs:
+            tasks.append(self.analyze_packed_properties(pack, on_issue=on_issue))
+        
+        # Execute all analyses in parallel
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Process results
+        for i, result in enumerate(results[:len(single_properties)]):
+            property_name = single_properties[i]['name']
+            if isinstance(result, Exception):
+                print(f"❌ Error analyzing {property_name}: {result}")
+                property_analyses[property_name] = self._enhanced_fallback_analysis(single_properties[i]['negative_comments'])
+            else:
+                property_analyses[property_name] = result
+        
+        # Listings a packed answer did not cover go back through the single-property path
+        unresolved = []
+        for pack, result in zip(packs, results[len(single_properties):]):
+            packed_analyses = {} if isinstance(result, Exception) else result
+            for property_data in pack:
+                if property_data['name'] in packed_analyses:
+                    property_analyses[property_data['name']] = packed_analyses[property_data['name']]
+                else:
+                    unresolved.append(property_data)
+        if unresolved:
+            print(f"🔁 {len(unresolved)} packed listings missing from GPT answer, retrying individually")
+            retried = await asyncio.gather(*[
+                self.analyze_single_property_enhanced(
+                    p['name'], p['positive_comments'], p['negative_comments'],
+                    on_issue=on_issue, comment_counts=p.get('comment_counts'), cache_checked=p.get('cache_checked', False)
+                )
+                for p in unresolved
+            ], return_exceptions=True)
+            for property_data, result in zip(unresolved, retried):
+                if isinstance(result, Exception):
+                    result = self._enhanced_fallback_analysis(property_data['negative_comments'])
+                property_analyses[property_data['name']] = result
+        
+        await self.close_session()
+        return property_analyses
+    
+    def _plan_packed_requests(self, property_data_list):
+        """Split listings into (single-path listings, packs of small listings, already-known analyses)"""
+        single_properties, small_properties, known = [], [], {}
+        for property_data in property_data_list:
+            name = property_data['name']
+            positive, negative = property_data['positive_comments'], property_data['negative_comments']
+            if not positive and not negative:
+                known[name] = self._empty_analysis()
+                continue
+            if self.cache is not None:
+                cached = self.cache.get(self._analysis_cache_key(name, positive, negative, property_data.get('comment_counts')))
+                if cached is not None:
+                    print(f"⚡ Cache hit: {name} (comments unchanged, GPT skipped)")
+                    known[name] = cached
+                    continue
+                property_data = {**property_data, 'cache_checked': True}  # the single path must not count the miss again
+            
+            chunks = self._chunk_comments(positive, negative, comment_counts=property_data.get('comment_counts'))
+            tokens = sum(count_tokens(line) for line in chunks[0]["lines"])
+            if len(chunks) == 1 and tokens <= PACKED_LISTING_MAX_TOKENS:
+                small_properties.append({**property_data, 'lines': chunks[0]["lines"], 'tokens': tokens})
+            else:
+                single_properties.append(property_data)
+        
+        packs, current, used = [], [], 0
+        for property_data in small_properties:
+            if current and (used + property_data['tokens'] > ANALYSIS_CHUNK_TOKEN_BUDGET or len(current) >= PACKED_MAX_LISTINGS):
+                packs.append(current)
+                current, used = [], 0
+            current.append(property_data)
+            used += property_data['tokens']
+        if current:
+            packs.append(current)
+        
+        # A pack of one gains nothing over the single-property path
+        single_properties += [pack[0] for pack in packs if len(pack) == 1]
+        packs = [pack for pack in packs if len(pack) > 1]
+        if packs:
+            print(f"📦 PACKED PROMPTS: {sum(len(pack) for pack in packs)} small listings in {len(packs)} requests")
+        return single_properties, packs, known
+    
+    async def analyze_packed_properties(self, packed_properties, on_issue=None):
+        """Analyze several small listings in one request and split the keyed answer back per property"""
+        label = f"packed request ({len(packed_properties)} listings)"
+        answer = await self._request_analysis_json(label, self._build_packed_inspection_prompt(packed_properties))
+        if not isinstance(answer, dict):
+            return {}
+        
+        answer_by_name = {str(key).strip().lower(): value for key, value in answer.items()}
+        analyses = {}
+        for property_data in packed_properties:
+            name = property_data['name']
+            analysis = answer.get(name, answer_by_name.get(name.strip().lower()))
+            if not isinstance(analysis, dict) or "cleaning_issues" not in analysis:
+                continue
+            analyses[name] = analysis
+            await self._emit_issues(on_issue, name, analysis)
+            print(f"✅ Packed analysis complete: {name} ({len(analysis.get('cleaning_issues', []))} cleaning + {len(analysis.get('maintenance_issues', []))} maintenance issues)")
+            if self.cache is not None:
+                self.cache.set(
+                    self._analysis_cache_key(
+                        name, property_data['positive_comments'], property_data['negative_comments'],
+                        property_data.get('comment_counts')
+                    ),
+                    analysis
+                )
+        return analyses
+    
+    async def analyze_single_property_enhanced(self, property_name, positive_comments, negative_comments, on_issue=None,
+                                               comment_counts=None, cache_checked=False):
+        """ENHANCED analysis that catches ALL cleaning issues (streamed to on_issue when given).
+        
+        cache_checked: the caller already looked this comment set up in the cache and missed.
+        """
+        if not positive_comments and not negative_comments:
+            return self._empty_analysis()
+        
+        # Unchanged comment set -> reuse the stored analysis without calling GPT
+        cache_key = self._analysis_cache_key(property_name, positive_comments, negative_comments, comment_counts)
+        if self.cache is not None and not cache_checked:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"⚡ Cache hit: {property_name} (comments unchanged, GPT skipped)")
+                await self._emit_issues(on_issue, property_name, cached)
+                return cached
+        
+        # MAP: token-budgeted chunks analyzed in parallel, so no comment is dropped
+        chunks = self._chunk_comments(positive_comments, negative_comments, comment_counts=comment_counts)
+        if len(chunks) > 1:
+            print(f"🧩 {property_name}: {len(positive_comments) + len(negative_comments)} comments split into {len(chunks)} chunks of ≤{ANALYSIS_CHUNK_TOKEN_BUDGET} tokens")
+        
+        # Issues streamed before a chunk failed are not delivered again by its keyword fallback
+        if on_issue is not None:
+            on_issue = DeliveredIssueTracker(on_issue)
+        chunk_results = await asyncio.gather(*[self._analyze_chunk(property_name, chunk, on_issue) for chunk in chunks])
+        failed_chunks = sum(1 for result in chunk_results if result is None)
+        if failed_chunks == len(chunks):
+            fallback = self._enhanced_fallback_analysis(negative_comments)
+            await self._emit_issues(on_issue, property_name, fallback)
+            return fallback
+        
+        # REDUCE: failed chunks fall back to keyword analysis, then everything is merged
+        analyses = []
+        for chunk, result in zip(chunks, chunk_results):
+            if result is None:
+                result = self._enhanced_fallback_analysis(chunk["negative_comments"])
+                await self._emit_issues(on_issue, property_name, result)
+            analyses.append(result)
+        if len(analyses) == 1:
+            analysis = analyses[0]
+        else:
+            analysis = combine_weighted_analyses([
+                (chunk_analysis, len(chunk["lines"])) for chunk_analysis, chunk in zip(analyses, chunks)
+            ])
+        
+        # Validate detection quality
+        cleaning_count = len(analysis.get("cleaning_issues", []))
+        maintenance_count = len(analysis.get("maintenance_issues", []))
+        negative_count = len(negative_comments)
+        
+        print(f"✅ Enhanced analysis complete: {property_name}")
+        print(f"   📝 Total comments: {len(positive_comments) + negative_count} (Positive: {len(positive_comments)}, Negative: {negative_count})")
+        print(f"   🧹 Cleaning issues detected: {cleaning_count}")
+        print(f"   🔧 Maintenance issues detected: {maintenance_count}")
+        print(f"   📊 Detection rate: {(cleaning_count + maintenance_count) / max(negative_count, 1):.1f} issues per negative comment")
+        
+        # Quality check warnings
+        if negative_count > 2 and cleaning_count == 0:
+            print(f"   ⚠️ WARNING: {negative_count} negative comments but NO cleaning issues detected!")
+        
+        if negative_count > 5 and (cleaning_count + maintenance_count) < 2:
+            print(f"   ⚠️ WARNING: Low detection rate - only {cleaning_count + maintenance_count} issues from {negative_count} negative comments!")
         
-        # Execute all analyses in parallel
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if self.cache is not None and not failed_chunks:
+            self.cache.set(cache_key, analysis)
         
-        # Process results
-        property_analyses = {}
-        for i, result in enumerate(results):
-            property_name = property_data_list[i]['name']
-            if isinstance(result, Exception):
-                print(f"❌ Error analyzing {property_name}: {result}")
-                property_analyses[property_name] = self._enhanced_fallback_analysis(property_data_list[i]['negative_comments'])
-            else:
-                property_analyses[property_name] = result
+        return analysis
+    
+    def _chunk_comments(self, positive_comments, negative_comments, budget=None, comment_counts=None):
+        """Greedily pack labelled comments into chunks that fit the per-request token budget"""
+        budget = budget or ANALYSIS_CHUNK_TOKEN_BUDGET
+        comment_counts = comment_counts or {}
+        labelled = [("POSITIVE", i, comment) for i, comment in enumerate(positive_comments)]
+        labelled += [("NEGATIVE", i, comment) for i, comment in enumerate(negative_comments)]
         
-        await self.close_session()
-        return property_analyses
+        chunks = []
+        current = {"lines": [], "positive_comments": [], "negative_comments": []}
+        used = 0
+        for label, i, comment in labelled:
+            count = comment_counts.get(comment, 1)
+            comment = truncate_to_tokens(comment, budget)
+            line = f"{label} {i+1}: {comment}"
+            if count > 1:
+                line += f" [mentioned by {count} guests]"
+            cost = count_tokens(line)
+            if current["lines"] and used + cost > budget:
+                chunks.append(current)
+                current = {"lines": [], "positive_comments": [], "negative_comments": []}
+                used = 0
+            current["lines"].append(line)
+            current["positive_comments" if label == "POSITIVE" else "negative_comments"].append(comment)
+            used += cost
+        chunks.append(current)
+        return chunks
     
-    async def analyze_single_property_enhanced(self, property_name, positive_comments, negative_comments):
-        """ENHANCED analysis that catches ALL cleaning issues"""
-        if not positive_comments and not negative_comments:
-            return self._empty_analysis()
+    async def _analyze_chunk(self, property_name, chunk, on_issue=None):
+        """One GPT request for one chunk of comments. Returns the parsed analysis or None on failure."""
+        prompt = self._build_inspection_prompt(
+            property_name, chunk["lines"], len(chunk["positive_comments"]), len(chunk["negative_comments"])
+        )
+        if on_issue is not None:
+            return await self._stream_analysis_json(property_name, prompt, on_issue)
+        return await self._request_analysis_json(property_name, prompt)
+    
+    async def stream_property_issues(self, property_name, positive_comments, negative_comments):
+        """Async iterator of (issue_key, issue) as GPT streams them, ending with ("analysis", full_analysis)"""
+        await self.create_session()
+        queue = asyncio.Queue()
+        
+        async def on_issue(_, issue_key, issue):
+            await queue.put((issue_key, issue))
+        
+        async def run_analysis():
+            try:
+                analysis = await self.analyze_single_property_enhanced(
+                    property_name, positive_comments, negative_comments, on_issue=on_issue
+                )
+            except Exception as e:
+                print(f"❌ Error streaming analysis for {property_name}: {e}")
+                analysis = self._enhanced_fallback_analysis(negative_comments)
+            await queue.put(("analysis", analysis))
+        
+        task = asyncio.create_task(run_analysis())
+        while True:
+            issue_key, item = await queue.get()
+            yield issue_key, item
+            if issue_key == "analysis":
+                break
+        await task
+    
+    async def _emit_issues(self, on_issue, property_name, analysis):
+        """Send every issue of an already-complete analysis to on_issue (skipping ones a tracker already delivered)"""
+        if on_issue is None:
+            return
+        for issue_key in IncrementalIssueParser.ISSUE_KEYS:
+            for issue in analysis.get(issue_key, []):
+                if isinstance(on_issue, DeliveredIssueTracker) and on_issue.already_delivered(issue_key, issue):
+                    continue
+                await self._emit_issue(on_issue, property_name, issue_key, issue)
+    
+    async def _emit_issue(self, on_issue, property_name, issue_key, issue):
+        result = on_issue(property_name, issue_key, issue)
+        if asyncio.iscoroutine(result):
+            await result
+    
+    async def _stream_analysis_json(self, label, prompt, on_issue):
+        """Streaming variant of _request_analysis_json that emits issues while the answer arrives"""
+        headers, payload = self._inspection_request(prompt)
+        parser = IncrementalIssueParser()
+        emitted = 0
+        try:
+            async for delta in self.rate_limiter.stream_chat_async(self.session, headers, payload):
+                for issue_key, issue in parser.feed(delta):
+                    emitted += 1
+                    await self._emit_issue(on_issue, label, issue_key, issue)
+        except OpenAIRequestError as e:
+            print(f"❌ GPT API error for {label}: {e.status}")
+            return None
+        except Exception as e:
+            print(f"❌ Error in enhanced analysis for {label}: {e}")
+            return None
         
-        # Combine comments efficiently
-        all_comments = []
-        for i, comment in enumerate(positive_comments[:20]):  # Increased limit
-            all_comments.append(f"POSITIVE {i+1}: {comment}")
-        for i, comment in enumerate(negative_comments[:20]):  # Increased limit
-            all_comments.append(f"NEGATIVE {i+1}: {comment}")
+        try:
+            analysis = json.loads(parser.buffer.strip())
+        except json.JSONDecodeError:
+            print(f"⚠️ JSON decode error for {label}, using enhanced fallback")
+            return None
+        print(f"📡 Streamed analysis complete: {label} ({emitted} issues emitted progressively)")
+        return analysis
+    
+    def _inspection_request(self, prompt):
+        """Headers and chat payload for one inspection prompt"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
         
-        comments_text = "\n".join(all_comments)
+        payload = {
+            "model": GPT_MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are an expert property inspector and hospitality consultant. Your expertise is finding EVERY cleaning and maintenance issue in guest feedback. Missing issues costs money and guest satisfaction. Be extremely thorough - err on the side of detecting MORE issues rather than fewer."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.05,  # Very low for consistency
+            "max_tokens": 4000    # Increased for detailed analysis
+        }
+        return headers, payload
+    
+    async def _request_analysis_json(self, label, prompt):
+        """Send an inspection prompt to GPT and parse the JSON answer. Returns None on failure."""
+        try:
+            headers, payload = self._inspection_request(prompt)
+            status, result = await self.rate_limiter.post_chat_async(self.session, headers, payload)
+            if status == 200:
+                gpt_response = result["choices"][0]["message"]["content"].strip()
+                
+                try:
+                    return json.loads(gpt_response)
+                except json.JSONDecodeError:
+                    print(f"⚠️ JSON decode error for {label}, using enhanced fallback")
+                    return None
+            else:
+                print(f"❌ GPT API error for {label}: {status}")
+                return None
+                
+        except Exception as e:
+            print(f"❌ Error in enhanced analysis for {label}: {e}")
+            return None
+    
+    def _build_inspection_prompt(self, property_name, comment_lines, positive_count, negative_count):
+        """SUPER ENHANCED GPT prompt for MAXIMUM cleaning detection"""
+        comments_text = "\n".join(comment_lines)
         
-        # SUPER ENHANCED GPT prompt for MAXIMUM cleaning detection
-        enhanced_prompt = f"""
+        return f"""
 PROPERTY INSPECTION ANALYSIS - {property_name}
 
 You are a EXPERT PROPERTY INSPECTOR analyzing guest feedback. Your job is to find EVERY SINGLE cleaning and maintenance issue mentioned.
@@ -135,38 +1862,42 @@ You are a EXPERT PROPERTY INSPECTOR analyzing guest feedback. Your job is to fin
 GUEST COMMENTS TO ANALYZE:
 {comments_text}
 
-CRITICAL CLEANING DETECTION INSTRUCTIONS:
-You MUST detect ANY mention of these cleaning-related words/concepts:
+{self.INSPECTION_GUIDELINES}
 
-🧹 CLEANING ISSUES TO DETECT:
-- dirty, dirt, dusty, dust, messy, mess, unclean, not clean, needs cleaning
-- stained, stains, spots, marks, residue, grime, grimy, filthy
-- smells, odor, odour, stinks, stinky, musty, moldy, mold, mildew
-- hair, hairs (any type), soap scum, grease, greasy, sticky, crusty
-- untidy, unkempt, sloppy, gross, disgusting, nasty, yucky
-- "could be cleaner", "not very clean", "poorly cleaned", "needs attention"
-- bathroom issues: toilet dirty, shower dirty, sink dirty, mirror spots
-- kitchen issues: dishes dirty, counters dirty, appliances dirty
-- bedroom issues: sheets dirty, pillows dirty, floor dirty, surfaces dirty
-- general: windows dirty, walls dirty, floors dirty, furniture dirty
+Return comprehensive JSON:
+{self._analysis_schema(len(comment_lines), negative_count, positive_count)}
 
-🔧 MAINTENANCE ISSUES TO DETECT:
-- broken, not working, doesn't work, malfunction, out of order
-- slow, fast, loud, noisy, quiet, silent, flickering, dim, bright
-- hot, cold, warm, cool, uncomfortable, hard, soft, loose, tight
-- stuck, jammed, leaking, dripping, cracked, chipped, torn, worn
-- WiFi slow, TV problems, AC issues, heating problems, bed uncomfortable
-- plumbing issues, electrical problems, appliance failures
+{self.INSPECTION_CLOSING}
+"""
+    
+    def _build_packed_inspection_prompt(self, packed_properties):
+        """One prompt covering several small listings; the answer is a JSON map keyed by property name"""
+        sections = []
+        for property_data in packed_properties:
+            sections.append(f"=== PROPERTY: {property_data['name']} ===\n" + "\n".join(property_data['lines']))
+        properties_text = "\n\n".join(sections)
+        names = ", ".join(json.dumps(property_data['name'], ensure_ascii=False) for property_data in packed_properties)
+        
+        return f"""
+PORTFOLIO INSPECTION ANALYSIS - {len(packed_properties)} PROPERTIES
 
-ANALYSIS REQUIREMENTS:
-1. Read EVERY comment word by word
-2. Extract MULTIPLE issues from single comments when present
-3. Even minor mentions count (like "a bit dirty" = cleaning issue)
-4. Classify location precisely (bathroom/kitchen/bedroom/living room)
-5. Rate severity realistically (guest complaints = at least Medium severity)
+You are a EXPERT PROPERTY INSPECTOR analyzing guest feedback for several properties. Your job is to find EVERY SINGLE cleaning and maintenance issue mentioned, and attribute it ONLY to the property whose comments mention it.
 
-Return comprehensive JSON:
-{{
+GUEST COMMENTS TO ANALYZE (grouped by property):
+{properties_text}
+
+{self.INSPECTION_GUIDELINES}
+
+Return ONE JSON object whose keys are EXACTLY these property names: {names}
+Each value must be a complete analysis of that property in this format:
+{self._analysis_schema(0, 0, 0)}
+
+{self.INSPECTION_CLOSING}
+"""
+    
+    def _analysis_schema(self, total_comments, negative_count, positive_count):
+        """JSON format GPT must answer with for one property"""
+        return f"""{{
     "satisfaction_score": 75,
     "cleaning_issues": [
         {{
@@ -192,136 +1923,55 @@ Return comprehensive JSON:
     "recommended_price_change": -5,
     "confidence": 0.9,
     "analysis_statistics": {{
-        "total_comments_analyzed": {len(all_comments)},
-        "negative_comments": {len(negative_comments)},
-        "positive_comments": {len(positive_comments)},
+        "total_comments_analyzed": {total_comments},
+        "negative_comments": {negative_count},
+        "positive_comments": {positive_count},
         "cleaning_mentions_detected": 0,
         "maintenance_mentions_detected": 0,
         "comments_with_issues": 0
     }}
-}}
-
-CRITICAL: Do NOT miss cleaning issues. Every guest complaint about cleanliness costs revenue and reputation. Be thorough and comprehensive.
-"""
-        
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "gpt-4",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an expert property inspector and hospitality consultant. Your expertise is finding EVERY cleaning and maintenance issue in guest feedback. Missing issues costs money and guest satisfaction. Be extremely thorough - err on the side of detecting MORE issues rather than fewer."
-                    },
-                    {
-                        "role": "user",
-                        "content": enhanced_prompt
-                    }
-                ],
-                "temperature": 0.05,  # Very low for consistency
-                "max_tokens": 4000    # Increased for detailed analysis
-            }
-            
-            async with self.session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    gpt_response = result["choices"][0]["message"]["content"].strip()
-                    
-                    try:
-                        analysis = json.loads(gpt_response)
-                        
-                        # Validate detection quality
-                        cleaning_count = len(analysis.get("cleaning_issues", []))
-                        maintenance_count = len(analysis.get("maintenance_issues", []))
-                        negative_count = len(negative_comments)
-                        
-                        print(f"✅ Enhanced analysis complete: {property_name}")
-                        print(f"   📝 Total comments: {len(all_comments)} (Positive: {len(positive_comments)}, Negative: {negative_count})")
-                        print(f"   🧹 Cleaning issues detected: {cleaning_count}")
-                        print(f"   🔧 Maintenance issues detected: {maintenance_count}")
-                        print(f"   📊 Detection rate: {(cleaning_count + maintenance_count) / max(negative_count, 1):.1f} issues per negative comment")
-                        
-                        # Quality check warnings
-                        if negative_count > 2 and cleaning_count == 0:
-                            print(f"   ⚠️ WARNING: {negative_count} negative comments but NO cleaning issues detected!")
-                        
-                        if negative_count > 5 and (cleaning_count + maintenance_count) < 2:
-                            print(f"   ⚠️ WARNING: Low detection rate - only {cleaning_count + maintenance_count} issues from {negative_count} negative comments!")
-                        
-                        return analysis
-                        
-                    except json.JSONDecodeError:
-                        print(f"⚠️ JSON decode error for {property_name}, using enhanced fallback")
-                        return self._enhanced_fallback_analysis(negative_comments)
-                else:
-                    print(f"❌ GPT API error for {property_name}: {response.status}")
-                    return self._enhanced_fallback_analysis(negative_comments)
-                    
-        except Exception as e:
-            print(f"❌ Error in enhanced analysis for {property_name}: {e}")
-            return self._enhanced_fallback_analysis(negative_comments)
+}}"""
+    
+    def _analysis_cache_key(self, property_name, positive_comments, negative_comments, comment_counts=None):
+        """Content address of an analysis: property, model, prompt version and exact comment set"""
+        parts = [property_name, GPT_MODEL, PROMPT_VERSION, sorted(positive_comments), sorted(negative_comments)]
+        repeated = sorted((comment, count) for comment, count in (comment_counts or {}).items() if count > 1)
+        if repeated:
+            parts.append(repeated)
+        return content_hash(*parts)
     
     def _enhanced_fallback_analysis(self, negative_comments):
         """Enhanced fallback with aggressive keyword detection"""
         
-        # Comprehensive keyword lists
-        cleaning_keywords = {
-            'dirty': ['dirty', 'dirt', 'unclean', 'not clean', 'filthy', 'grimy', 'messy', 'mess'],
-            'stains': ['stained', 'stains', 'spots', 'marks', 'residue'],
-            'odors': ['smell', 'smells', 'odor', 'odour', 'stink', 'musty', 'moldy'],
-            'dust': ['dust', 'dusty', 'hair', 'hairs'],
-            'general': ['gross', 'disgusting', 'nasty', 'needs cleaning', 'could be cleaner', 'poorly cleaned']
-        }
-        
-        maintenance_keywords = {
-            'broken': ['broken', 'not working', "doesn't work", 'malfunction', 'out of order'],
-            'comfort': ['uncomfortable', 'hard', 'soft', 'loud', 'noisy'],
-            'temperature': ['hot', 'cold', 'warm', 'cool'],
-            'electrical': ['flickering', 'dim', 'bright', 'slow wifi', 'wifi slow'],
-            'plumbing': ['leaking', 'dripping', 'stuck', 'jammed']
-        }
-        
         cleaning_issues = []
         maintenance_issues = []
         
-        for comment in negative_comments:
-            comment_lower = comment.lower()
+        # One vectorized pass of the compiled matcher over all comments
+        comments = pd.Series(list(negative_comments), dtype=object)
+        for position, comment_hits in KEYWORD_MATCHER.category_hits(comments).items():
+            comment = comments.iloc[position]
             
-            # Check for cleaning issues (multiple per comment)
-            for category, keywords in cleaning_keywords.items():
-                for keyword in keywords:
-                    if keyword in comment_lower:
-                        cleaning_issues.append({
-                            "guest_comment": comment,
-                            "problem": f"Guest mentioned {category}: '{keyword}'",
-                            "location": "general",
-                            "severity": "Medium",
-                            "cleaning_type": category,
-                            "keywords_detected": [keyword]
-                        })
-                        break  # One per category per comment
+            # Cleaning issues (one per category per comment)
+            for category, keyword in comment_hits.get('cleaning', []):
+                cleaning_issues.append({
+                    "guest_comment": comment,
+                    "problem": f"Guest mentioned {category}: '{keyword}'",
+                    "location": "general",
+                    "severity": "Medium",
+                    "cleaning_type": category,
+                    "keywords_detected": [keyword]
+                })
             
-            # Check for maintenance issues (multiple per comment)
-            for category, keywords in maintenance_keywords.items():
-                for keyword in keywords:
-                    if keyword in comment_lower:
-                        maintenance_issues.append({
-                            "guest_comment": comment,
-                            "problem": f"Guest mentioned {category}: '{keyword}'",
-                            "category": "Other",
-                            "severity": "Medium",
-                            "urgency": "Soon",
-                            "keywords_detected": [keyword]
-                        })
-                        break  # One per category per comment
+            # Maintenance issues (one per category per comment)
+            for category, keyword in comment_hits.get('maintenance', []):
+                maintenance_issues.append({
+                    "guest_comment": comment,
+                    "problem": f"Guest mentioned {category}: '{keyword}'",
+                    "category": "Other",
+                    "severity": "Medium",
+                    "urgency": "Soon",
+                    "keywords_detected": [keyword]
+                })
         
         # Calculate satisfaction based on issues found
         total_issues = len(cleaning_issues) + len(maintenance_issues)
@@ -369,110 +2019,1218 @@ CRITICAL: Do NOT miss cleaning issues. Every guest complaint about cleanliness c
         }
 
 # ============================================================================
-# PARALLEL SCRAPING ENGINE (UNCHANGED)
+# RUN-COMPLETION WEBHOOK RECEIVER
+# ============================================================================
+
+class ScrapeWebhookReceiver:
+    """Small aiohttp server that turns Apify run-finished webhooks into queued run events.
+    
+    A forged SUCCEEDED event would trigger an early, partial dataset download, so a receiver
+    with a public URL refuses to start without a secret.
+    """
+    
+    def __init__(self, public_url=None, host=APIFY_WEBHOOK_HOST, port=APIFY_WEBHOOK_PORT, secret=APIFY_WEBHOOK_SECRET):
+        self.exposed = bool(public_url or APIFY_WEBHOOK_URL)
+        self.public_url = (public_url or APIFY_WEBHOOK_URL or f"http://localhost:{port}").rstrip("/")
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.queue = None
+        self._runner = None
+    
+    @property
+    def running(self):
+        return self._runner is not None
+    
+    def webhook_spec(self):
+        """Ad-hoc webhook definition for actor.start(webhooks=[...])"""
+        request_url = self.public_url + APIFY_WEBHOOK_PATH
+        if self.secret:
+            request_url += f"?token={self.secret}"
+        return {"event_types": APIFY_WEBHOOK_EVENTS, "request_url": request_url}
+    
+    async def start(self):
+        if self._runner is not None:
+            return
+        if self.exposed and not self.secret:
+            raise ValueError("APIFY_WEBHOOK_SECRET must be set when the webhook receiver has a public URL")
+        self.queue = asyncio.Queue()
+        app = web.Application()
+        app.router.add_post(APIFY_WEBHOOK_PATH, self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        print(f"📡 WEBHOOK RECEIVER: listening on {self.host}:{self.port}{APIFY_WEBHOOK_PATH} (public {self.public_url})")
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def handle(self, request):
+        if self.secret and not hmac.compare_digest(request.query.get("token", ""), self.secret):
+            return web.Response(status=403)
+        try:
+            payload = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400)
+        
+        # Default Apify payload: {"eventType", "eventData": {"actorRunId"}, "resource": <run object>}
+        resource = payload.get("resource") or {}
+        run_id = resource.get("id") or (payload.get("eventData") or {}).get("actorRunId")
+        if not run_id:
+            return web.Response(status=400)
+        await self.queue.put({
+            "run_id": run_id,
+            "status": resource.get("status") or payload.get("eventType", "").rsplit(".", 1)[-1].replace("_", "-"),
+            "dataset_id": resource.get("defaultDatasetId")
+        })
+        return web.Response(text="ok")
+
+# ============================================================================
+# LOCAL FAKE APIFY CLIENT (OFFLINE CYCLES AND TESTS)
+# ============================================================================
+
+class LocalListPage(NamedTuple):
+    """Same attributes as apify_client's ListPage"""
+    items: list
+    offset: int
+    limit: int
+    count: int
+    total: int
+
+class LocalApifyClient:
+    """In-process stand-in for ApifyClientAsync serving canned review items per listing URL.
+    
+    Pass `lambda api_key: client` as the scraper's client factory. Runs finish after run_seconds
+    (URLs in fail_urls end FAILED); runs started with webhooks POST the same run-finished payload
+    Apify sends, so ScrapeWebhookReceiver is exercised too. start_errors maps a URL to how many of
+    its start/call attempts raise before one succeeds. Every run input is kept in run_inputs.
+    """
+    
+    def __init__(self, reviews_by_url=None, run_seconds=0.0, fail_urls=(), start_errors=None):
+        self.reviews_by_url = reviews_by_url or {}
+        self.run_seconds = run_seconds
+        self.fail_urls = set(fail_urls)
+        self.start_errors = dict(start_errors or {})
+        self.run_inputs = []
+        self._runs = {}
+        self._datasets = {}
+        self._webhook_tasks = []
+    
+    def actor(self, actor_id):
+        return _LocalActor(self)
+    
+    def run(self, run_id):
+        return _LocalRun(self, run_id)
+    
+    def dataset(self, dataset_id):
+        return _LocalDataset(self._datasets.get(dataset_id, []))
+    
+    def _start(self, run_input, webhooks=None):
+        self.run_inputs.append(run_input)
+        url = run_input["startUrls"][0]["url"]
+        if self.start_errors.get(url, 0) > 0:
+            self.start_errors[url] -= 1
+            raise ConnectionError(f"could not start run for {url}")
+        run_id = f"local-run-{len(self._runs) + 1}"
+        dataset_id = f"local-dataset-{len(self._runs) + 1}"
+        
+        items = sorted(self.reviews_by_url.get(url, []), key=lambda item: item.get("reviewDate", ""), reverse=True)
+        cutoff = run_input.get("cutoffDate")
+        if cutoff:
+            items = [item for item in items if item.get("reviewDate", "")[:10] >= cutoff]
+        self._datasets[dataset_id] = items[:run_input.get("maxReviewsPerHotel", len(items))]
+        
+        run = {"id": run_id, "defaultDatasetId": dataset_id, "status": "RUNNING",
+               "_finishes_at": time.time() + self.run_seconds, "_final": "FAILED" if url in self.fail_urls else "SUCCEEDED"}
+        self._runs[run_id] = run
+        for webhook in webhooks or ():
+            self._webhook_tasks.append(asyncio.ensure_future(self._post_webhook(run, webhook)))
+        return self._public(run)
+    
+    def _refresh(self, run):
+        if run["status"] == "RUNNING" and time.time() >= run["_finishes_at"]:
+            run["status"] = run["_final"]
+        return run
+    
+    @staticmethod
+    def _public(run):
+        return {key: value for key, value in run.items() if not key.startswith("_")}
+    
+    async def _post_webhook(self, run, webhook):
+        await asyncio.sleep(self.run_seconds)
+        self._refresh(run)
+        payload = {"eventType": "ACTOR.RUN." + run["status"].replace("-", "_"),
+                   "eventData": {"actorRunId": run["id"]}, "resource": self._public(run)}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(webhook["request_url"], json=payload) as response:
+                await response.read()
+
+class _LocalActor:
+    def __init__(self, client):
+        self.client = client
+    
+    async def start(self, run_input=None, webhooks=None, **kwargs):
+        return self.client._start(run_input, webhooks)
+    
+    async def call(self, run_input=None, wait_secs=None, **kwargs):
+        run = self.client._start(run_input)
+        await asyncio.sleep(self.client.run_seconds)
+        return await self.client.run(run["id"]).get()
+
+class _LocalRun:
+    def __init__(self, client, run_id):
+        self.client = client
+        self.run_id = run_id
+    
+    async def get(self):
+        run = self.client._runs.get(self.run_id)
+        return self.client._public(self.client._refresh(run)) if run is not None else None
+    
+    async def abort(self):
+        self.client._runs[self.run_id]["status"] = "ABORTED"
+
+class _LocalDataset:
+    def __init__(self, items):
+        self._items = items
+    
+    async def list_items(self, offset=0, limit=None, fields=None, **kwargs):
+        page = self._items[offset:offset + limit if limit else None]
+        if fields:
+            page = [{field: item[field] for field in fields if field in item} for item in page]
+        return LocalListPage(items=page, offset=offset, limit=limit or len(page), count=len(page), total=len(self._items))
+
+# ============================================================================
+# PARALLEL SCRAPING ENGINE (FIRE-AND-POLL RUNS, RETRIED STARTS, INCREMENTAL PAGED DATASETS)
 # ============================================================================
 
 class ParallelScrapingEngine:
-    """High-speed parallel scraping for all 7 properties"""
+    """High-speed parallel scraping for every listing in the portfolio"""
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, review_store: Optional[ReviewStore] = None, client_factory=None,
+                 webhook_receiver: Optional[ScrapeWebhookReceiver] = None,
+                 listing_state: Optional[ListingStateStore] = None, portfolio: Optional[Portfolio] = None):
         self.api_key = api_key
+        self.portfolio = portfolio or Portfolio.default()
+        self.review_store = review_store
+        self.listing_state = listing_state if INCREMENTAL_SCRAPING else None
+        self.client_factory = client_factory or ApifyClientAsync  # swappable for a local fake
+        self.webhook_receiver = webhook_receiver
+        
+    async def scrape_all_properties_parallel(self, on_property=None):
+        """Scrape every portfolio listing in parallel batches for maximum speed.
+        
+        on_property(listing_id, reviews) is awaited as soon as each listing finishes. In the
+        semaphore mode it runs while the scrape slot is still held, so a slow consumer
+        throttles scraping; APIFY_FIRE_AND_POLL starts every run at once instead.
+        
+        Returns {listing_id: new reviews} for the listings scraped successfully. The reviews
+        themselves only live until on_property has consumed them (and in the review store),
+        so memory stays flat as the portfolio grows.
+        """
+        client = self.client_factory(self.api_key)  # one client (and connection pool) per cycle
+        if APIFY_FIRE_AND_POLL or self.webhook_receiver is not None:
+            return await self.scrape_all_properties_fire_and_poll(client, on_property=on_property)
         
-    async def scrape_all_properties_parallel(self):
-        """Scrape all 7 properties in parallel batches for maximum speed"""
-        print(f"🚀 PARALLEL SCRAPING: Starting {len(LISTINGS)} properties in batches of {MAX_CONCURRENT_SCRAPING}")
+        listings = self.portfolio.listings
+        print(f"🚀 PARALLEL SCRAPING: Starting {len(listings)} properties in batches of {MAX_CONCURRENT_SCRAPING}")
         
         semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPING)
         
-        async def scrape_with_semaphore(property_data):
+        async def scrape_with_semaphore(listing):
             async with semaphore:
-                return await self.scrape_single_property(property_data)
+                reviews = await self.scrape_single_property(listing, client=client)
+                if on_property is not None:
+                    await on_property(listing.listing_id, reviews)  # may be empty: nothing new since last cycle
+                return len(reviews)
         
         scraping_tasks = []
-        for name, url, price in LISTINGS:
-            task = scrape_with_semaphore((name, url, price))
+        for listing in listings:
+            task = scrape_with_semaphore(listing)
             scraping_tasks.append(task)
         
         start_time = time.time()
         results = await asyncio.gather(*scraping_tasks, return_exceptions=True)
         end_time = time.time()
         
-        all_reviews = []
-        successful_scrapes = 0
-        
-        for i, result in enumerate(results):
-            property_name = LISTINGS[i][0]
+        review_counts = {}
+        for listing, result in zip(listings, results):
             if isinstance(result, Exception):
-                print(f"❌ Scraping failed for {property_name}: {result}")
+                print(f"❌ Scraping failed for {listing.name}: {result}")
             else:
-                all_reviews.extend(result)
-                successful_scrapes += 1
-                print(f"✅ Scraped {len(result)} reviews from {property_name}")
+                review_counts[listing.listing_id] = result
+                print(f"✅ Scraped {result} reviews from {listing.name}")
         
-        print(f"🏁 PARALLEL SCRAPING COMPLETE: {successful_scrapes}/{len(LISTINGS)} properties in {end_time - start_time:.1f}s")
-        return all_reviews
+        print(f"🏁 PARALLEL SCRAPING COMPLETE: {len(review_counts)}/{len(listings)} properties in {end_time - start_time:.1f}s")
+        return review_counts
     
-    async def scrape_single_property(self, property_data):
-        """Optimized single property scraping"""
-        name, url, price = property_data
-        
-        client = ApifyClientAsync(self.api_key)
-        actor = client.actor("voyager/booking-reviews-scraper")
+    async def scrape_single_property(self, listing, client=None):
+        """Optimized single property scraping; reviews are keyed by listing_id"""
+        client = client or self.client_factory(self.api_key)
+        actor = client.actor(APIFY_REVIEWS_ACTOR)
         
         try:
-            print(f"🔄 Scraping: {name}")
-            
-            run = await actor.call(
-                run_input={
-                    "startUrls": [{"url": url}],
-                    "maxReviewsPerHotel": 40,  # Increased for better analysis
-                    "proxyConfiguration": {"useApifyProxy": True},
-                    "timeout": 120
-                },
-                wait_secs=120
-            )
-            
-            dataset = client.dataset(run["defaultDatasetId"])
-            result = await dataset.list_items()
-            items = result.items or []
-            
-            reviews = []
-            for item in items:
-                date = (item.get("reviewDate") or "").split("T")[0]
-                
-                if item.get("likedText"):
-                    reviews.append({
-                        "listing": name,
-                        "date": date,
-                        "type": "positive",
-                        "comment": item["likedText"]
-                    })
-                
-                if item.get("dislikedText"):
-                    reviews.append({
-                        "listing": name,
-                        "date": date,
-                        "type": "negative", 
-                        "comment": item["dislikedText"]
-                    })
+            print(f"🔄 Scraping: {listing.name}")
             
-            print(f"✅ {name}: {len(reviews)} reviews collected")
-            return reviews
+            run_input = self.actor_run_input(listing.url, self._watermark(listing.listing_id))
+            run = await self.start_with_retries(listing, lambda: actor.call(run_input=run_input, wait_secs=120))
+            return await self.collect_reviews(client, listing.listing_id, run["defaultDatasetId"])
             
         except Exception as e:
-            print(f"❌ Error scraping {name}: {e}")
+            print(f"❌ Error scraping {listing.name}: {e}")
             return []
+    
+    @staticmethod
+    def start_retry_delay(attempt):
+        """Jittered exponential backoff between attempts to start an actor run"""
+        return random.uniform(0.5, 1.0) * min(APIFY_START_RETRY_MAX_SECONDS, APIFY_START_RETRY_BASE_SECONDS * (2 ** attempt))
+    
+    async def start_with_retries(self, listing, start):
+        """Await start() (an actor start/call), retrying failures up to APIFY_START_RETRIES times"""
+        for attempt in range(APIFY_START_RETRIES + 1):
+            try:
+                return await start()
+            except Exception as e:
+                if attempt == APIFY_START_RETRIES:
+                    raise
+                delay = self.start_retry_delay(attempt)
+                print(f"⚠️ Starting scrape for {listing.name} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def scrape_all_properties_fire_and_poll(self, client, on_property=None):
+        """Start every actor run up front and download datasets as runs finish.
+        
+        Completions come from the webhook receiver when one is configured (with a slow
+        safety poll for lost webhooks), otherwise from one status-polling loop.
+        """
+        receiver = self.webhook_receiver
+        listings = self.portfolio.listings
+        if receiver is not None:
+            await receiver.start()
+            print(f"🚀 WEBHOOK SCRAPING: Starting {len(listings)} actor runs at once, downloads {MAX_CONCURRENT_SCRAPING} at a time")
+        else:
+            print(f"🚀 FIRE-AND-POLL SCRAPING: Starting {len(listings)} actor runs at once, downloads {MAX_CONCURRENT_SCRAPING} at a time")
+        start_time = time.time()
+        actor = client.actor(APIFY_REVIEWS_ACTOR)
+        start_options = {"webhooks": [receiver.webhook_spec()]} if receiver is not None else {}
+        
+        def start_run(listing):
+            run_input = self.actor_run_input(listing.url, self._watermark(listing.listing_id))
+            return self.start_with_retries(listing, lambda: actor.start(run_input=run_input, **start_options))
+        
+        started = await asyncio.gather(*(start_run(listing) for listing in listings), return_exceptions=True)
+        
+        review_counts = {}
+        pending = {}
+        for listing, run in zip(listings, started):
+            if isinstance(run, Exception):
+                print(f"❌ Could not start scrape for {listing.name}: {run}")
+            else:
+                pending[run["id"]] = (listing, run["defaultDatasetId"])
+                print(f"🔄 Scraping: {listing.name} (run {run['id']})")
+        
+        download_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPING)
+        downloads = []
+        
+        async def download(listing, dataset_id):
+            listing_id = listing.listing_id
+            try:
+                async with download_semaphore:
+                    reviews = await self.collect_reviews(client, listing_id, dataset_id)
+            except Exception as e:
+                print(f"❌ Error downloading reviews for {listing.name}: {e}")
+                return
+            review_counts[listing_id] = len(reviews)
+            if on_property is not None:
+                await on_property(listing_id, reviews)  # may be empty: nothing new since last cycle
+        
+        def settle(run_id, status):
+            listing, dataset_id = pending.pop(run_id)
+            if status == "SUCCEEDED":
+                downloads.append(asyncio.ensure_future(download(listing, dataset_id)))
+            else:
+                print(f"❌ Scraping failed for {listing.name}: actor run {status}")
+        
+        async def poll_pending():
+            run_ids = list(pending)
+            runs = await asyncio.gather(*(client.run(run_id).get() for run_id in run_ids), return_exceptions=True)
+            for run_id, run in zip(run_ids, runs):
+                if isinstance(run, Exception) or run is None:
+                    continue  # transient poll failure, try again next round
+                if run.get("status") == "SUCCEEDED" or run.get("status") in APIFY_TERMINAL_FAILURES:
+                    settle(run_id, run["status"])
+        
+        deadline = time.time() + APIFY_RUN_TIMEOUT_SECONDS
+        while pending:
+            if time.time() >= deadline:
+                for run_id, (listing, dataset_id) in pending.items():
+                    print(f"❌ Scraping timed out for {listing.name} after {APIFY_RUN_TIMEOUT_SECONDS}s")
+                    try:
+                        await client.run(run_id).abort()
+                    except Exception:
+                        pass
+                break
+            
+            if receiver is None:
+                await poll_pending()
+                if pending:
+                    await asyncio.sleep(APIFY_POLL_INTERVAL_SECONDS)
+                continue
+            
+            wait = min(APIFY_WEBHOOK_FALLBACK_POLL_SECONDS, max(deadline - time.time(), 0))
+            try:
+                event = await asyncio.wait_for(receiver.queue.get(), wait)
+            except asyncio.TimeoutError:
+                await poll_pending()
+                continue
+            # Events are only read after every run is registered; unknown ids belong to earlier cycles
+            if event["run_id"] in pending and (event["status"] == "SUCCEEDED" or event["status"] in APIFY_TERMINAL_FAILURES):
+                settle(event["run_id"], event["status"])
+        
+        await asyncio.gather(*downloads)
+        
+        for listing_id, count in review_counts.items():
+            print(f"✅ Scraped {count} reviews from {self.portfolio.label(listing_id)}")
+        
+        print(f"🏁 FIRE-AND-POLL SCRAPING COMPLETE: {len(review_counts)}/{len(listings)} properties in {time.time() - start_time:.1f}s")
+        return review_counts
+    
+    def _watermark(self, listing_id):
+        return self.listing_state.get(listing_id) if self.listing_state is not None else None
+    
+    @staticmethod
+    def actor_run_input(url, watermark=None):
+        run_input = {
+            "startUrls": [{"url": url}],
+            "maxReviewsPerHotel": MAX_REVIEWS_PER_LISTING,
+            "proxyConfiguration": {"useApifyProxy": True},
+            "timeout": 120
+        }
+        if INCREMENTAL_SCRAPING:
+            # Newest first so paging can stop at the first already-seen review
+            run_input["sortReviewsBy"] = "f_recent_desc"
+            cutoff = ListingStateStore.scrape_cutoff_date(watermark)
+            if cutoff:
+                run_input["cutoffDate"] = cutoff
+        return run_input
+    
+    async def collect_reviews(self, client, listing_id, dataset_id):
+        """Download a finished run's reviews page by page, persisting each page.
+        
+        Returns the listing's new reviews (at most MAX_REVIEWS_PER_LISTING) for its analysis.
+        """
+        reviews = []
+        stored = 0
+        async for page in self.iter_review_pages(client, listing_id, dataset_id, watermark=self._watermark(listing_id)):
+            reviews.extend(page)
+            if self.review_store is not None:
+                stored += self.review_store.upsert_reviews(page)
+        
+        label = self.portfolio.label(listing_id)
+        print(f"✅ {label}: {len(reviews)} reviews collected")
+        
+        if self.review_store is not None:
+            print(f"💾 {label}: {stored} new reviews persisted")
+        
+        return reviews
+    
+    async def iter_review_pages(self, client, listing_id, dataset_id, page_size=None, watermark=None):
+        """Yield review dicts one dataset page at a time (only the review fields are downloaded).
+        
+        With a watermark, already-seen reviews are dropped and paging stops at the first
+        page that reaches them (the dataset is sorted newest first). Otherwise paging ends on
+        an empty page or at the dataset total when the API reports one; a short page alone
+        does not end it.
+        """
+        page_size = page_size or APIFY_DATASET_PAGE_SIZE
+        dataset = client.dataset(dataset_id)
+        offset = 0
+        while True:
+            result = await dataset.list_items(offset=offset, limit=page_size, fields=APIFY_REVIEW_FIELDS)
+            items = result.items or []
+            page = []
+            reached_known = False
+            for item in items:
+                for review in self.reviews_from_item(listing_id, item):
+                    if ListingStateStore.is_seen(review, watermark):
+                        reached_known = True
+                    else:
+                        page.append(review)
+            if page:
+                yield page
+            if reached_known or not items:
+                break
+            offset = (result.offset or offset) + (result.count or len(items))
+            if result.total and offset >= result.total:
+                break
+    
+    @staticmethod
+    def reviews_from_item(listing_id, item):
+        """Positive/negative review dicts from one scraped Booking.com review"""
+        date = (item.get("reviewDate") or "").split("T")[0]
+        reviews = []
+        
+        if item.get("likedText"):
+            reviews.append({
+                "listing": listing_id,
+                "date": date,
+                "type": "positive",
+                "comment": item["likedText"]
+            })
+        
+        if item.get("dislikedText"):
+            reviews.append({
+                "listing": listing_id,
+                "date": date,
+                "type": "negative", 
+                "comment": item["dislikedText"]
+            })
+        return reviews
+
+# ============================================================================
+# POOLED SMTP TRANSPORT (LOG IN ONCE, REUSE CONNECTIONS ACROSS MESSAGES)
+# ============================================================================
+
+class SMTPConnectionPool:
+    """Up to max_size authenticated SMTP connections shared by the email threads.
+    
+    STARTTLS and login happen once per connection; idle connections are reused by the
+    next message and replaced transparently when the server has dropped them. After a
+    dropped connection, idle ones are checked with NOOP before the retry reuses them.
+    """
+    
+    # Errors after which the connection is unusable but the message can be resent on a fresh one
+    CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError, OSError)
+    
+    def __init__(self, sender_email, sender_password, host=SMTP_HOST, port=SMTP_PORT,
+                 max_size=MAX_CONCURRENT_EMAILS, timeout=SMTP_TIMEOUT_SECONDS, retries=SMTP_SEND_RETRIES,
+                 use_tls=SMTP_USE_TLS):
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.use_tls = use_tls
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.stats = {"connections": 0, "reused": 0, "reconnects": 0, "sent": 0}
+    
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+            if self.sender_password:
+                server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        self._count("connections")
+        return server
+    
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    def _checkout(self, validate=False):
+        while True:
+            with self._lock:
+                server = self._idle.pop() if self._idle else None
+            if server is None:
+                return self._connect()
+            if validate:
+                # Whatever dropped the last connection (server restart, idle timeout) may have dropped these too
+                try:
+                    if server.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP refused")
+                except Exception:
+                    self._discard(server)
+                    continue
+            self._count("reused")
+            return server
+    
+    def _checkin(self, server):
+        with self._lock:
+            self._idle.append(server)
+    
+    @staticmethod
+    def _discard(server):
+        try:
+            server.close()
+        except Exception:
+            pass
+    
+    def send(self, msg):
+        """Send one message over a pooled connection, reconnecting on a dropped one"""
+        with self._slots:
+            for attempt in range(self.retries + 1):
+                server = self._checkout(validate=attempt > 0)
+                try:
+                    server.send_message(msg)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # The server refused this message; the session itself is still good
+                    self._checkin(server)
+                    raise
+                except self.CONNECTION_ERRORS:
+                    self._discard(server)
+                    if attempt == self.retries:
+                        raise
+                    self._count("reconnects")
+                    continue
+                except Exception:
+                    self._discard(server)
+                    raise
+                self._checkin(server)
+                self._count("sent")
+                return True
+    
+    def close(self):
+        """QUIT every idle connection (call once the cycle's emails are out)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server in idle:
+            try:
+                server.quit()
+            except Exception:
+                self._discard(server)
+
+# ============================================================================
+# NATIVE ASYNCIO SMTP TRANSPORT (PIPELINED ENVELOPES OVER POOLED CONNECTIONS)
+# ============================================================================
+
+class AsyncSMTPConnection:
+    """One SMTP session on asyncio streams.
+    
+    When the server advertises PIPELINING, MAIL FROM / RCPT TO / DATA go out in a single
+    write, so each message costs two round trips instead of four.
+    """
+    
+    def __init__(self, host, port, timeout=SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.extensions = set()
+        self._reader = None
+        self._writer = None
+    
+    async def _read_reply(self):
+        """(code, text) of one possibly multi-line reply"""
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].decode("utf-8", "replace").rstrip("\r\n"))
+            if line[3:4] != b"-":
+                return int(line[:3]), "\n".join(lines)
+    
+    async def _command(self, line, expected=(250,)):
+        self._writer.write(line.encode("utf-8") + b"\r\n")
+        await self._writer.drain()
+        code, text = await self._read_reply()
+        if code not in expected:
+            raise smtplib.SMTPResponseException(code, text)
+        return text
+    
+    async def _ehlo(self):
+        text = await self._command(f"EHLO {socket.getfqdn()}")
+        self.extensions = {line.split(" ", 1)[0].upper() for line in text.split("\n")[1:]}
+    
+    async def connect(self, sender_email=None, sender_password=None, use_tls=SMTP_USE_TLS):
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        code, text = await self._read_reply()
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, text)
+        await self._ehlo()
+        if use_tls:
+            await self._command("STARTTLS", expected=(220,))
+            await self._writer.start_tls(ssl.create_default_context(), server_hostname=self.host)
+            await self._ehlo()
+        if sender_password:
+            token = base64.b64encode(f"\0{sender_email}\0{sender_password}".encode("utf-8")).decode("ascii")
+            await self._command(f"AUTH PLAIN {token}", expected=(235,))
+    
+    @staticmethod
+    def _payload(msg):
+        """Message bytes with CRLF line endings, dot-stuffed and terminated for DATA"""
+        data = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+        data = re.sub(rb"(?m)^\.", b"..", data)
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        return data + b".\r\n"
+    
+    async def send_message(self, msg):
+        """Send msg to its To/Cc recipients. Like smtplib's sendmail, the message goes to every
+        accepted recipient and the refused ones are returned as {recipient: (code, text)}."""
+        sender = msg["From"]
+        recipients = [address.strip() for field in ("To", "Cc") if msg[field] for address in msg[field].split(",")]
+        envelope = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{recipient}>" for recipient in recipients] + ["DATA"]
+        
+        if "PIPELINING" in self.extensions:
+            self._writer.write("".join(command + "\r\n" for command in envelope).encode("utf-8"))
+            await self._writer.drain()
+            replies = [await self._read_reply() for _ in envelope]
+        else:
+            replies = []
+            for command in envelope:
+                if command == "DATA" and not any(code in (250, 251) for code, _ in replies[1:]):
+                    break  # every recipient was refused
+                self._writer.write(command.encode("utf-8") + b"\r\n")
+                await self._writer.drain()
+                replies.append(await self._read_reply())
+                if len(replies) == 1 and replies[0][0] != 250:
+                    break
+        
+        mail_reply, rcpt_replies = replies[0], replies[1:len(recipients) + 1]
+        data_reply = replies[-1] if len(replies) == len(envelope) else None
+        refused = {recipient: reply for recipient, reply in zip(recipients, rcpt_replies) if reply[0] not in (250, 251)}
+        
+        error = None
+        if mail_reply[0] != 250:
+            error = smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], sender)
+        elif len(refused) == len(recipients):
+            error = smtplib.SMTPRecipientsRefused(refused)
+        elif data_reply is None or data_reply[0] != 354:
+            error = smtplib.SMTPDataError(*(data_reply or (554, "DATA not sent")))
+        if error is not None:
+            if data_reply is not None and data_reply[0] == 354:
+                # The server waits for a body that must reach nobody: end it, then reset the transaction
+                self._writer.write(b".\r\n")
+                await self._writer.drain()
+                await self._read_reply()
+            await self._command("RSET")
+            raise error
+        
+        self._writer.write(self._payload(msg))
+        await self._writer.drain()
+        code, text = await self._read_reply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, text)
+        return refused
+    
+    async def noop(self):
+        await self._command("NOOP")
+    
+    async def quit(self):
+        try:
+            await self._command("QUIT", expected=(221,))
+        finally:
+            await self.close()
+    
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+            self._writer = None
+
+class AsyncSMTPPool:
+    """Event-loop counterpart of SMTPConnectionPool: up to max_size authenticated AsyncSMTPConnections"""
+    
+    CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, asyncio.TimeoutError, OSError)
+    
+    def __init__(self, sender_email, sender_password, host=SMTP_HOST, port=SMTP_PORT,
+                 max_size=MAX_CONCURRENT_EMAILS, timeout=SMTP_TIMEOUT_SECONDS, retries=SMTP_SEND_RETRIES,
+                 use_tls=SMTP_USE_TLS):
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self.retries = retries
+        self.use_tls = use_tls
+        self._slots = None
+        self._idle = []
+        self.stats = {"connections": 0, "reused": 0, "reconnects": 0, "sent": 0}
+    
+    async def _checkout(self, validate=False):
+        while self._idle:
+            connection = self._idle.pop()
+            if validate:
+                # Like SMTPConnectionPool: after one dropped connection, idle ones are checked before reuse
+                try:
+                    await connection.noop()
+                except (smtplib.SMTPException, *self.CONNECTION_ERRORS):
+                    await connection.close()
+                    continue
+            self.stats["reused"] += 1
+            return connection
+        connection = AsyncSMTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            await connection.connect(self.sender_email, self.sender_password, use_tls=self.use_tls)
+        except BaseException:
+            await connection.close()
+            raise
+        self.stats["connections"] += 1
+        return connection
+    
+    async def send(self, msg):
+        """Send one message over a pooled connection, reconnecting on a dropped one"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_size)
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                connection = await self._checkout(validate=attempt > 0)
+                try:
+                    refused = await connection.send_message(msg)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # The server refused this message; the session itself is still good
+                    self._idle.append(connection)
+                    raise
+                except self.CONNECTION_ERRORS:
+                    await connection.close()
+                    if attempt == self.retries:
+                        raise
+                    self.stats["reconnects"] += 1
+                    continue
+                except BaseException:
+                    await connection.close()
+                    raise
+                self._idle.append(connection)
+                self.stats["sent"] += 1
+                if refused:
+                    print(f"⚠️ SMTP: '{msg['Subject']}' not delivered to refused recipients {', '.join(refused)}")
+                return True
+    
+    async def close(self):
+        """QUIT every idle connection; the semaphore is recreated on the next loop that sends"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                await connection.quit()
+            except (smtplib.SMTPException, OSError, asyncio.TimeoutError):
+                pass
+        self._slots = None
+
+class LocalSMTPSink:
+    """Minimal in-process SMTP server that accepts and counts everything (PIPELINING, AUTH, no TLS).
+    
+    Point SMTP_HOST/SMTP_PORT at it with SMTP_USE_TLS=false to exercise the email path offline.
+    Addresses in refuse_recipients get a 550 at RCPT TO; messages keeps (recipients, body) pairs.
+    """
+    
+    def __init__(self, host="127.0.0.1", port=0, keep_messages=100, refuse_recipients=()):
+        self.host = host
+        self.port = port
+        self.messages_received = 0
+        self.messages = []
+        self.keep_messages = keep_messages
+        self.refuse_recipients = set(refuse_recipients)
+        self.connections = 0
+        self._server = None
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"📭 SMTP SINK: listening on {self.host}:{self.port}")
+        return self
+    
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 localhost sink ready\r\n")
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                verb = line[:4].upper()
+                if verb == b"EHLO":
+                    writer.write(b"250-localhost\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN\r\n")
+                elif verb == b"AUTH":
+                    writer.write(b"235 2.7.0 Accepted\r\n")
+                elif verb == b"RCPT":
+                    recipient = line.decode("utf-8", "replace").split("<", 1)[-1].split(">", 1)[0]
+                    if recipient in self.refuse_recipients:
+                        writer.write(b"550 5.1.1 User unknown\r\n")
+                    else:
+                        recipients.append(recipient)
+                        writer.write(b"250 OK\r\n")
+                elif verb == b"DATA" and not recipients:
+                    writer.write(b"554 5.5.1 No valid recipients\r\n")
+                elif verb == b"DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    body = []
+                    while True:
+                        data_line = await reader.readline()
+                        if not data_line or data_line == b".\r\n":
+                            break
+                        body.append(data_line)
+                    self.messages_received += 1
+                    if self.keep_messages:
+                        self.messages = (self.messages + [(recipients, b"".join(body))])[-self.keep_messages:]
+                    recipients = []
+                    writer.write(b"250 2.0.0 Queued\r\n")
+                elif verb == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                elif verb in (b"MAIL", b"RSET"):
+                    recipients = []
+                    writer.write(b"250 OK\r\n")
+                elif verb in (b"HELO", b"NOOP"):
+                    writer.write(b"250 OK\r\n")
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def benchmark_smtp(messages=500, concurrency=MAX_CONCURRENT_EMAILS, body_size=4000):
+    """Messages/second and per-message latency of both transports against a LocalSMTPSink"""
+    sink = await LocalSMTPSink(keep_messages=0).start()
+    body = ("Guest said the bathroom was not clean. " * (body_size // 40 + 1))[:body_size]
+    
+    def make_message(i):
+        msg = MIMEText(body, "plain", "utf-8")
+        msg["Subject"] = f"Benchmark {i}"
+        msg["From"] = "bench@localhost"
+        msg["To"] = "team@localhost"
+        return msg
+    
+    def summarize(name, elapsed, latencies, stats):
+        latencies = sorted(latencies)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        print(f"   {name:<22} {messages / elapsed:8.0f} msg/s   p50 {p50:6.2f} ms   p95 {p95:6.2f} ms   "
+              f"{stats['connections']} connections")
+        return {"messages_per_second": messages / elapsed, "p50_ms": p50, "p95_ms": p95, **stats}
+    
+    results = {}
+    try:
+        print(f"📨 SMTP BENCHMARK: {messages} messages of {body_size} bytes, {concurrency} connections")
+        
+        # smtplib in threads over SMTPConnectionPool
+        pool = SMTPConnectionPool("bench@localhost", None, host=sink.host, port=sink.port,
+                                  max_size=concurrency, use_tls=False)
+        
+        def timed_sync_send(i):
+            started = time.perf_counter()
+            pool.send(make_message(i))
+            return time.perf_counter() - started
+        
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = await asyncio.gather(*(loop.run_in_executor(executor, timed_sync_send, i) for i in range(messages)))
+        results["threaded_smtplib"] = summarize("threaded smtplib", time.perf_counter() - started, latencies, pool.stats)
+        pool.close()
+        
+        # asyncio client with pipelined envelopes
+        async_pool = AsyncSMTPPool("bench@localhost", None, host=sink.host, port=sink.port,
+                                   max_size=concurrency, use_tls=False)
+        
+        gate = asyncio.Semaphore(concurrency)  # like the thread pool: latency excludes time spent queued
+        
+        async def timed_async_send(i):
+            async with gate:
+                started = time.perf_counter()
+                await async_pool.send(make_message(i))
+                return time.perf_counter() - started
+        
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed_async_send(i) for i in range(messages)))
+        results["asyncio_pipelined"] = summarize("asyncio pipelined", time.perf_counter() - started, latencies, async_pool.stats)
+        await async_pool.close()
+        
+        print(f"   📭 Sink received {sink.messages_received} messages")
+    finally:
+        await sink.stop()
+    return results
+
+# ============================================================================
+# EMAIL TEMPLATES (COMPILED ONCE, RENDERED FROM A ONE-PASS SUMMARY)
+# ============================================================================
+
+SEVERITY_EMOJI = {"High": "🚨", "Medium": "⚠️"}  # anything else: ℹ️
+URGENCY_EMOJI = {"Urgent": "⚡", "Soon": "🔜"}  # anything else: 📅
+GUEST_COMMENT_PREVIEW = 100
+
+# Keys of one summarized issue row; each is a named placeholder of the item templates
+ISSUE_ROW_FIELDS = ("index", "severity", "severity_emoji", "urgency", "urgency_emoji", "location",
+                    "category", "problem", "comment", "notice", "occurrences", "keywords")
+# Fields carrying guest or GPT text, escaped before they reach the HTML templates
+HTML_ESCAPED_FIELDS = ("severity", "urgency", "location", "category", "problem", "comment", "notice", "keywords")
+
+def summarize_issue_properties(properties, default_problem=""):
+    """One pass over every issue: per-property row dicts (ISSUE_ROW_FIELDS) plus the totals the emails quote"""
+    rows = []
+    total = high = urgent = 0
+    for property_name, issues in properties.items():
+        items = []
+        for index, issue in enumerate(issues, 1):
+            severity = issue.get('severity', 'Medium')
+            urgency = issue.get('urgency', 'Soon')
+            if severity == 'High':
+                high += 1
+            if urgency == 'Urgent':
+                urgent += 1
+            comment = issue.get('guest_comment', '')[:GUEST_COMMENT_PREVIEW]
+            if len(comment) == GUEST_COMMENT_PREVIEW:
+                comment += '...'
+            items.append({
+                "index": index, "severity": severity, "severity_emoji": SEVERITY_EMOJI.get(severity, "ℹ️"),
+                "urgency": urgency, "urgency_emoji": URGENCY_EMOJI.get(urgency, "📅"),
+                "location": issue.get('location', 'general').title(), "category": issue.get('category', 'General'),
+                "problem": issue.get('problem', default_problem), "comment": comment,
+                "notice": (issue.get('notice') or '').upper(), "occurrences": issue.get('occurrences', 1),
+                "keywords": ', '.join(issue.get('keywords_detected', ()))
+            })
+        total += len(issues)
+        rows.append((property_name, items))
+    return {
+        "properties": rows,
+        "property_count": len(rows),
+        "total": total,
+        "high": high,
+        "urgent": urgent,
+        "date": datetime.now().strftime('%Y-%m-%d %H:%M')
+    }
+
+class IssueEmailTemplate:
+    """Plain-text and HTML renderings of one issue email.
+    
+    Each variant is a dict of str.format templates (header, property, item, occurrences,
+    keywords, notice, property_end, footer) over named fields: the summary totals, the
+    property name/count, and ISSUE_ROW_FIELDS for items. Templates are bound to their
+    format_map once; render() appends parts to a list and joins it. In the item template
+    {occurrences}, {keywords} and {notice} are the rendered snippets (empty when unset).
+    """
+    
+    PARTS = ("header", "property", "item", "occurrences", "keywords", "notice", "property_end", "footer")
+    SNIPPETS = ("occurrences", "keywords", "notice")
+    
+    def __init__(self, plain, html_parts, default_problem):
+        self.plain = self._compile(plain)
+        self.html = self._compile(html_parts)
+        self.default_problem = default_problem
+    
+    def _compile(self, parts):
+        compiled = {part: parts[part].format_map for part in self.PARTS if part != "property_end"}
+        # A typo'd placeholder fails here at import (KeyError), not in the middle of a cycle's emails
+        sample = {**dict.fromkeys(ISSUE_ROW_FIELDS, ""), "name": "", "count": 0,
+                  "property_count": 0, "total": 0, "high": 0, "urgent": 0, "date": ""}
+        for render in compiled.values():
+            render(sample)
+        compiled["property_end"] = parts["property_end"]
+        return compiled
+    
+    def summarize(self, properties):
+        return summarize_issue_properties(properties, self.default_problem)
+    
+    def render(self, summary):
+        """(plain text, html) for a summarize() result"""
+        # Severity, location, category... repeat across thousands of issues, so each distinct string is escaped once
+        escaped = {}
+        
+        def escape(text):
+            result = escaped.get(text)
+            if result is None:
+                result = escaped[text] = html.escape(text)
+            return result
+        
+        return self._render(self.plain, summary, None), self._render(self.html, summary, escape)
+    
+    def _render(self, compiled, summary, escape):
+        item, occurrences, keywords, notice = compiled["item"], compiled["occurrences"], compiled["keywords"], compiled["notice"]
+        property_header, property_end = compiled["property"], compiled["property_end"]
+        parts = [compiled["header"](summary)]
+        append = parts.append
+        for property_name, items in summary["properties"]:
+            append(property_header({"name": escape(property_name) if escape else property_name, "count": len(items)}))
+            for row in items:
+                fields = dict(row)  # rows are shared by both renderings
+                if escape:
+                    for field in HTML_ESCAPED_FIELDS:
+                        fields[field] = escape(fields[field])
+                fields["occurrences"] = occurrences(fields) if row["occurrences"] > 1 else ""
+                fields["keywords"] = keywords(fields) if row["keywords"] else ""
+                fields["notice"] = notice(fields) if row["notice"] else ""
+                append(item(fields))
+            append(property_end)
+        append(compiled["footer"](summary))
+        return "".join(parts)
+
+EMAIL_RULE = "━" * 83
+
+HTML_ISSUE_PARTS = {
+    "property": "<h3>🏠 {name} ({count} issues detected)</h3>\n<ol>\n",
+    "occurrences": "<br>Reported by {occurrences} guests",
+    "keywords": "<br>Keywords: {keywords}",
+    "notice": " <strong>[{notice}]</strong>",
+    "property_end": "</ol>\n<hr>\n",
+}
+
+CLEANING_EMAIL_TEMPLATE = IssueEmailTemplate(
+    plain={
+        "header": "Hi Mourad,\n\n"
+                  "ENHANCED AI ANALYSIS has detected {total} cleaning issues across {property_count} properties that require immediate attention.\n\n"
+                  "🧹 DETAILED CLEANING ISSUES DETECTED:\n" + EMAIL_RULE + "\n\n",
+        "property": "🏠 {name} ({count} issues detected):\n\n",
+        "item": "   {index}. {severity_emoji} {severity} Priority - {location}{notice}\n"
+                "      Issue: {problem}\n"
+                "      Guest Said: \"{comment}\"\n"
+                "{occurrences}{keywords}\n",
+        "occurrences": "      Reported by {occurrences} guests\n",
+        "keywords": "      Keywords: {keywords}\n",
+        "notice": " [{notice}]",
+        "property_end": "─" * 80 + "\n\n",
+        "footer": "\n🎯 PRIORITY ACTION REQUIRED:\n" + EMAIL_RULE + "\n"
+                  "• Total Properties Affected: {property_count}\n"
+                  "• Total Issues to Address: {total}\n"
+                  "• High Priority Issues: {high}\n"
+                  "• Guest Complaints Analyzed: Multiple per property\n\n"
+                  "Focus on HIGH priority issues first (🚨), then medium (⚠️), then low (ℹ️).\n"
+                  "All issues detected are based on real guest complaints and affect our reputation.\n\n"
+                  "Analysis Date: {date}\n"
+                  "Generated by Enhanced AI Property Management System\n\n"
+                  "Best regards,\nEnhanced Property Management System\nPowered by Advanced AI Detection"
+    },
+    html_parts={
+        **HTML_ISSUE_PARTS,
+        "header": "<html><body>\n<p>Hi Mourad,</p>\n"
+                  "<p>ENHANCED AI ANALYSIS has detected <strong>{total} cleaning issues</strong> across {property_count} properties that require immediate attention.</p>\n"
+                  "<h2>🧹 DETAILED CLEANING ISSUES DETECTED</h2>\n",
+        "item": "<li>{severity_emoji} <strong>{severity} Priority - {location}</strong>{notice}<br>"
+                "Issue: {problem}<br>Guest Said: <em>&quot;{comment}&quot;</em>{occurrences}{keywords}</li>\n",
+        "footer": "<h2>🎯 PRIORITY ACTION REQUIRED</h2>\n<ul>\n"
+                  "<li>Total Properties Affected: {property_count}</li>\n"
+                  "<li>Total Issues to Address: {total}</li>\n"
+                  "<li>High Priority Issues: {high}</li>\n"
+                  "<li>Guest Complaints Analyzed: Multiple per property</li>\n</ul>\n"
+                  "<p>Focus on HIGH priority issues first (🚨), then medium (⚠️), then low (ℹ️).<br>\n"
+                  "All issues detected are based on real guest complaints and affect our reputation.</p>\n"
+                  "<p>Analysis Date: {date}<br>Generated by Enhanced AI Property Management System</p>\n"
+                  "<p>Best regards,<br>Enhanced Property Management System<br>Powered by Advanced AI Detection</p>\n"
+                  "</body></html>"
+    },
+    default_problem="cleaning issue"
+)
+
+MAINTENANCE_EMAIL_TEMPLATE = IssueEmailTemplate(
+    plain={
+        "header": "Hi Ahmed,\n\n"
+                  "ENHANCED AI ANALYSIS has detected {total} maintenance issues across {property_count} properties requiring your attention.\n\n"
+                  "🔧 DETAILED MAINTENANCE ISSUES DETECTED:\n" + EMAIL_RULE + "\n\n",
+        "property": "🏠 {name} ({count} issues detected):\n\n",
+        "item": "   {index}. {severity_emoji} {category} Issue - {urgency} {urgency_emoji}{notice}\n"
+                "      Problem: {problem}\n"
+                "      Guest Said: \"{comment}\"\n"
+                "{occurrences}{keywords}\n",
+        "occurrences": "      Reported by {occurrences} guests\n",
+        "keywords": "      Keywords: {keywords}\n",
+        "notice": " [{notice}]",
+        "property_end": "─" * 80 + "\n\n",
+        "footer": "\n🎯 MAINTENANCE PRIORITIES:\n" + EMAIL_RULE + "\n"
+                  "⚡ URGENT: Schedule immediately (same day)\n"
+                  "🔜 SOON: Schedule within 1-2 days  \n"
+                  "📅 CAN WAIT: Schedule within a week\n\n"
+                  "• Total Properties Affected: {property_count}\n"
+                  "• Total Issues to Address: {total}\n"
+                  "• Urgent Issues: {urgent}\n"
+                  "• Guest Complaints Analyzed: Multiple per property\n\n"
+                  "All issues detected are based on real guest feedback and impact guest satisfaction.\n\n"
+                  "Analysis Date: {date}\n"
+                  "Generated by Enhanced AI Property Management System\n\n"
+                  "Best regards,\nEnhanced Property Management System\nPowered by Advanced AI Detection"
+    },
+    html_parts={
+        **HTML_ISSUE_PARTS,
+        "header": "<html><body>\n<p>Hi Ahmed,</p>\n"
+                  "<p>ENHANCED AI ANALYSIS has detected <strong>{total} maintenance issues</strong> across {property_count} properties requiring your attention.</p>\n"
+                  "<h2>🔧 DETAILED MAINTENANCE ISSUES DETECTED</h2>\n",
+        "item": "<li>{severity_emoji} <strong>{category} Issue - {urgency}</strong> {urgency_emoji}{notice}<br>"
+                "Problem: {problem}<br>Guest Said: <em>&quot;{comment}&quot;</em>{occurrences}{keywords}</li>\n",
+        "footer": "<h2>🎯 MAINTENANCE PRIORITIES</h2>\n"
+                  "<p>⚡ URGENT: Schedule immediately (same day)<br>\n"
+                  "🔜 SOON: Schedule within 1-2 days<br>\n"
+                  "📅 CAN WAIT: Schedule within a week</p>\n<ul>\n"
+                  "<li>Total Properties Affected: {property_count}</li>\n"
+                  "<li>Total Issues to Address: {total}</li>\n"
+                  "<li>Urgent Issues: {urgent}</li>\n"
+                  "<li>Guest Complaints Analyzed: Multiple per property</li>\n</ul>\n"
+                  "<p>All issues detected are based on real guest feedback and impact guest satisfaction.</p>\n"
+                  "<p>Analysis Date: {date}<br>Generated by Enhanced AI Property Management System</p>\n"
+                  "<p>Best regards,<br>Enhanced Property Management System<br>Powered by Advanced AI Detection</p>\n"
+                  "</body></html>"
+    },
+    default_problem="maintenance needed"
+)
+
+def benchmark_email_rendering(issues=5000, properties=50, rounds=5):
+    """Time summarizing + rendering (plain and HTML) + MIME assembly for a synthetic issue set"""
+    per_property = max(1, issues // properties)
+    sample = {
+        f"Property {p}": [{
+            "severity": ("High", "Medium", "Low")[i % 3],
+            "urgency": ("Urgent", "Soon", "Can wait")[i % 3],
+            "location": "bathroom",
+            "category": "Plumbing",
+            "problem": f"Issue {i} <needs> attention & follow-up",
+            "guest_comment": "The shower drain was clogged and the towels were stained. " * 3,
+            "occurrences": 1 + i % 4,
+            "keywords_detected": ["clogged", "stained"] if i % 2 else [],
+            "notice": "new" if i % 5 == 0 else None
+        } for i in range(per_property)]
+        for p in range(properties)
+    }
+    email_system = FastEmailSystem({**EMAIL_CONFIG, 'sender_email': 'bench@localhost'})
+    print(f"🖨️ RENDER BENCHMARK: {per_property * properties} issues across {properties} properties, {rounds} rounds")
+    
+    results = {}
+    for name, template in (("cleaning", CLEANING_EMAIL_TEMPLATE), ("maintenance", MAINTENANCE_EMAIL_TEMPLATE)):
+        render_times, mime_times = [], []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            plain, html_content = template.render(template.summarize(sample))
+            rendered = time.perf_counter()
+            email_system._build_message("Benchmark", plain, "team@localhost", html_content).as_bytes()
+            render_times.append(rendered - started)
+            mime_times.append(time.perf_counter() - rendered)
+        render_ms = min(render_times) * 1000
+        mime_ms = min(mime_times) * 1000
+        print(f"   {name:<12} render {render_ms:8.2f} ms ({per_property * properties / (render_ms / 1000):,.0f} issues/s)   "
+              f"MIME {mime_ms:8.2f} ms   plain {len(plain) / 1024:,.0f} KiB   html {len(html_content) / 1024:,.0f} KiB")
+        results[name] = {"render_ms": render_ms, "mime_ms": mime_ms, "plain_bytes": len(plain), "html_bytes": len(html_content)}
+    return results
 
 # ============================================================================
-# FAST PARALLEL EMAIL SYSTEM (UNCHANGED)
+# FAST PARALLEL EMAIL SYSTEM
 # ============================================================================
 
 class FastEmailSystem:
-    """Parallel email sending system for speed"""
+    """Parallel email sending system for speed.
+    
+    With an outbox, cycles only enqueue their emails and OutboxDispatcher does the sending.
+    """
     
-    def __init__(self, config):
+    def __init__(self, config, outbox=None):
         self.config = config
-        
+        self.outbox = outbox
+        self.smtp_pool = SMTPConnectionPool(config.get('sender_email'), config.get('sender_password'))
+        self.async_smtp_pool = AsyncSMTPPool(config.get('sender_email'), config.get('sender_password'))
+        # StreamWriter.start_tls (for STARTTLS) needs Python 3.11+; older interpreters keep the threaded path
+        self.use_async_smtp = SMTP_ASYNC and (not SMTP_USE_TLS or hasattr(asyncio.StreamWriter, "start_tls"))
+        self._executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EMAILS, thread_name_prefix="email")
+    
+    async def _run_in_email_thread(self, fn):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+    
     async def send_all_emails_parallel(self, cleaning_properties, maintenance_properties, pricing_changes):
         """Send all emails in parallel for maximum speed"""
         print(f"📧 PARALLEL EMAIL SENDING: Starting batch email dispatch")
@@ -496,9 +3254,14 @@ class FastEmailSystem:
             return 0
         
         start_time = time.time()
-        results = await asyncio.gather(*[task for _, task in email_tasks], return_exceptions=True)
+        try:
+            results = await asyncio.gather(*[task for _, task in email_tasks], return_exceptions=True)
+        finally:
+            # One login per connection per cycle; the next cycle starts from a fresh pool
+            await self.close_transport()
         end_time = time.time()
         
+        outcome = "queued" if self.outbox is not None else "sent"
         emails_sent = 0
         for i, result in enumerate(results):
             email_type = email_tasks[i][0]
@@ -506,158 +3269,43 @@ class FastEmailSystem:
                 print(f"❌ {email_type} email failed: {result}")
             elif result:
                 emails_sent += 1
-                print(f"✅ {email_type} email sent successfully")
+                print(f"✅ {email_type} email {outcome} successfully")
             else:
                 print(f"❌ {email_type} email failed")
         
-        print(f"📧 PARALLEL EMAIL COMPLETE: {emails_sent}/{len(email_tasks)} emails sent in {end_time - start_time:.1f}s")
+        print(f"📧 PARALLEL EMAIL COMPLETE: {emails_sent}/{len(email_tasks)} emails {outcome} in {end_time - start_time:.1f}s")
+        if self.outbox is None:
+            self.print_transport_stats()
         return emails_sent
     
+    async def close_transport(self):
+        """QUIT the pooled SMTP sessions of whichever transport is in use"""
+        if self.use_async_smtp:
+            await self.async_smtp_pool.close()
+        else:
+            await self._run_in_email_thread(self.smtp_pool.close)
+    
+    def print_transport_stats(self):
+        smtp_stats = self.async_smtp_pool.stats if self.use_async_smtp else self.smtp_pool.stats
+        print(f"   🔌 SMTP: {smtp_stats['connections']} logins, {smtp_stats['reused']} reused connections, {smtp_stats['reconnects']} reconnects")
+    
     async def send_cleaning_email_async(self, cleaning_properties):
         """Send cleaning email to MOURAD"""
-        def send_email_sync():
-            subject = f"🧹 ENHANCED CLEANING ALERT - {len(cleaning_properties)} Properties Need Attention"
-            content = self._generate_enhanced_cleaning_content(cleaning_properties)
-            return self._send_email_sync(subject, content, self.config['cleaning_team_email'])
-        
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            return await loop.run_in_executor(executor, send_email_sync)
+        subject = f"🧹 ENHANCED CLEANING ALERT - {len(cleaning_properties)} Properties Need Attention"
+        content, html_content = CLEANING_EMAIL_TEMPLATE.render(CLEANING_EMAIL_TEMPLATE.summarize(cleaning_properties))
+        return await self._send_email_async(subject, content, self.config['cleaning_team_email'], html_content)
     
     async def send_maintenance_email_async(self, maintenance_properties):
         """Send maintenance email to AHMED"""
-        def send_email_sync():
-            subject = f"🔧 ENHANCED MAINTENANCE ALERT - {len(maintenance_properties)} Properties Need Attention"
-            content = self._generate_enhanced_maintenance_content(maintenance_properties)
-            return self._send_email_sync(subject, content, self.config['maintenance_team_email'])
-        
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            return await loop.run_in_executor(executor, send_email_sync)
+        subject = f"🔧 ENHANCED MAINTENANCE ALERT - {len(maintenance_properties)} Properties Need Attention"
+        content, html_content = MAINTENANCE_EMAIL_TEMPLATE.render(MAINTENANCE_EMAIL_TEMPLATE.summarize(maintenance_properties))
+        return await self._send_email_async(subject, content, self.config['maintenance_team_email'], html_content)
     
     async def send_pricing_email_async(self, pricing_changes):
         """Send pricing email to AHMED"""
-        def send_email_sync():
-            subject = f"💰 PRICING OPTIMIZATION REPORT - {len(pricing_changes)} Properties Adjusted"
-            content = self._generate_pricing_content(pricing_changes)
-            return self._send_email_sync(subject, content, self.config['pricing_team_email'])
-        
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            return await loop.run_in_executor(executor, send_email_sync)
-    
-    def _generate_enhanced_cleaning_content(self, cleaning_properties):
-        """Enhanced cleaning email with detailed issue breakdown"""
-        total_issues = sum(len(issues) for issues in cleaning_properties.values())
-        
-        content = f"""Hi Mourad,
-
-ENHANCED AI ANALYSIS has detected {total_issues} cleaning issues across {len(cleaning_properties)} properties that require immediate attention.
-
-🧹 DETAILED CLEANING ISSUES DETECTED:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-"""
-        
-        for property_name, issues in cleaning_properties.items():
-            content += f"🏠 {property_name} ({len(issues)} issues detected):\n\n"
-            
-            for i, issue in enumerate(issues, 1):
-                severity = issue.get('severity', 'Medium')
-                location = issue.get('location', 'general')
-                problem = issue.get('problem', 'cleaning issue')
-                guest_comment = issue.get('guest_comment', '')[:100]
-                keywords = issue.get('keywords_detected', [])
-                
-                severity_emoji = "🚨" if severity == "High" else "⚠️" if severity == "Medium" else "ℹ️"
-                
-                content += f"   {i}. {severity_emoji} {severity} Priority - {location.title()}\n"
-                content += f"      Issue: {problem}\n"
-                content += f"      Guest Said: \"{guest_comment}{'...' if len(guest_comment) == 100 else ''}\"\n"
-                if keywords:
-                    content += f"      Keywords: {', '.join(keywords)}\n"
-                content += "\n"
-            
-            content += "─" * 80 + "\n\n"
-        
-        content += f"""
-🎯 PRIORITY ACTION REQUIRED:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-• Total Properties Affected: {len(cleaning_properties)}
-• Total Issues to Address: {total_issues}
-• High Priority Issues: {sum(1 for issues in cleaning_properties.values() for issue in issues if issue.get('severity') == 'High')}
-• Guest Complaints Analyzed: Multiple per property
-
-Focus on HIGH priority issues first (🚨), then medium (⚠️), then low (ℹ️).
-All issues detected are based on real guest complaints and affect our reputation.
-
-Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-Generated by Enhanced AI Property Management System
-
-Best regards,
-Enhanced Property Management System
-Powered by Advanced AI Detection"""
-        
-        return content
-    
-    def _generate_enhanced_maintenance_content(self, maintenance_properties):
-        """Enhanced maintenance email with detailed issue breakdown"""
-        total_issues = sum(len(issues) for issues in maintenance_properties.values())
-        
-        content = f"""Hi Ahmed,
-
-ENHANCED AI ANALYSIS has detected {total_issues} maintenance issues across {len(maintenance_properties)} properties requiring your attention.
-
-🔧 DETAILED MAINTENANCE ISSUES DETECTED:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-"""
-        
-        for property_name, issues in maintenance_properties.items():
-            content += f"🏠 {property_name} ({len(issues)} issues detected):\n\n"
-            
-            for i, issue in enumerate(issues, 1):
-                category = issue.get('category', 'General')
-                severity = issue.get('severity', 'Medium')
-                urgency = issue.get('urgency', 'Soon')
-                problem = issue.get('problem', 'maintenance needed')
-                guest_comment = issue.get('guest_comment', '')[:100]
-                keywords = issue.get('keywords_detected', [])
-                
-                severity_emoji = "🚨" if severity == "High" else "⚠️" if severity == "Medium" else "ℹ️"
-                urgency_emoji = "⚡" if urgency == "Urgent" else "🔜" if urgency == "Soon" else "📅"
-                
-                content += f"   {i}. {severity_emoji} {category} Issue - {urgency} {urgency_emoji}\n"
-                content += f"      Problem: {problem}\n"
-                content += f"      Guest Said: \"{guest_comment}{'...' if len(guest_comment) == 100 else ''}\"\n"
-                if keywords:
-                    content += f"      Keywords: {', '.join(keywords)}\n"
-                content += "\n"
-            
-            content += "─" * 80 + "\n\n"
-        
-        content += f"""
-🎯 MAINTENANCE PRIORITIES:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-⚡ URGENT: Schedule immediately (same day)
-🔜 SOON: Schedule within 1-2 days  
-📅 CAN WAIT: Schedule within a week
-
-• Total Properties Affected: {len(maintenance_properties)}
-• Total Issues to Address: {total_issues}
-• Urgent Issues: {sum(1 for issues in maintenance_properties.values() for issue in issues if issue.get('urgency') == 'Urgent')}
-• Guest Complaints Analyzed: Multiple per property
-
-All issues detected are based on real guest feedback and impact guest satisfaction.
-
-Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-Generated by Enhanced AI Property Management System
-
-Best regards,
-Enhanced Property Management System
-Powered by Advanced AI Detection"""
-        
-        return content
+        subject = f"💰 PRICING OPTIMIZATION REPORT - {len(pricing_changes)} Properties Adjusted"
+        content = self._generate_pricing_content(pricing_changes)
+        return await self._send_email_async(subject, content, self.config['pricing_team_email'])
     
     def _generate_pricing_content(self, pricing_changes):
         """Pricing email content"""
@@ -688,34 +3336,330 @@ Generated by Enhanced AI Property Management System
 """
         return content
     
-    def _send_email_sync(self, subject, content, recipient):
-        """Synchronous email sending"""
+    def _build_message(self, subject, content, recipient, html_content=None):
+        """Plain-text email, or a multipart/alternative with an HTML part when one is given"""
+        if html_content:
+            msg = MIMEMultipart('alternative')
+            msg.attach(MIMEText(content, 'plain', 'utf-8'))
+            msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+        else:
+            msg = MIMEText(content, 'plain', 'utf-8')
+        msg['Subject'] = subject
+        msg['From'] = self.config['sender_email']
+        msg['To'] = recipient
+        return msg
+    
+    def _should_send(self, recipient):
         if self.config['demo_mode']:
             print(f"📝 DEMO: Email would be sent to {recipient}")
-            return True
-        
-        if not self.config['sender_email'] or not self.config['sender_password']:
-            print(f"❌ Email credentials missing")
             return False
-        
-        try:
-            msg = MIMEText(content, 'plain', 'utf-8')
-            msg['Subject'] = subject
-            msg['From'] = self.config['sender_email']
-            msg['To'] = recipient
-            
-            context = ssl.create_default_context()
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls(context=context)
-                server.login(self.config['sender_email'], self.config['sender_password'])
-                server.send_message(msg)
-            
+        if not self.config['sender_email'] or not self.config['sender_password']:
+            raise ValueError("Email credentials missing")
+        return True
+    
+    async def deliver(self, subject, content, recipient, html_content=None):
+        """Send one email now, on the event loop (pipelined asyncio SMTP) or an email thread. Raises on failure."""
+        if not self._should_send(recipient):
             return True
-            
+        msg = self._build_message(subject, content, recipient, html_content)
+        if self.use_async_smtp:
+            return await self.async_smtp_pool.send(msg)
+        return await self._run_in_email_thread(lambda: self.smtp_pool.send(msg))
+    
+    async def _send_email_async(self, subject, content, recipient, html_content=None):
+        """Queue the email in the outbox when there is one, else deliver it right away"""
+        try:
+            if self.outbox is not None:
+                self.outbox.enqueue(recipient, subject, content, html_content)
+                return True
+            return await self.deliver(subject, content, recipient, html_content)
         except Exception as e:
             print(f"❌ Email failed: {e}")
             return False
 
+# ============================================================================
+# ISSUE FINGERPRINT INDEX (SUPPRESS RE-NOTIFYING KNOWN PROBLEMS)
+# ============================================================================
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+URGENCY_RANK = {"can wait": 0, "soon": 1, "urgent": 2}
+
+class IssueIndex:
+    """Every issue ever reported, keyed by fingerprint, with first/last seen and resolved state.
+    
+    filter_notifiable() lets through only issues the team has not been told about yet,
+    issues whose severity/urgency went up since they were, and issues that came back after resolving.
+    """
+    
+    def __init__(self, path=ISSUE_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS issues (
+                    fingerprint TEXT PRIMARY KEY,
+                    listing TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    severity_rank INTEGER NOT NULL,
+                    urgency_rank INTEGER NOT NULL,
+                    times_seen INTEGER NOT NULL DEFAULT 1,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    resolved_at REAL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_open ON issues(listing, kind, resolved_at)")
+    
+    @staticmethod
+    def fingerprint(listing, kind, issue):
+        """Listing + issue_identity; stable across GPT rewording of 'problem'"""
+        place, comment = issue_identity(kind, issue)
+        return content_hash(listing, kind, place, comment)
+    
+    @staticmethod
+    def _ranks(issue):
+        return (SEVERITY_RANK.get(str(issue.get("severity", "Medium")).lower(), 1),
+                URGENCY_RANK.get(str(issue.get("urgency", "Soon")).lower(), 1))
+    
+    def get(self, fingerprint):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT listing, kind, category, severity_rank, urgency_rank, times_seen, first_seen, last_seen, resolved_at "
+                "FROM issues WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("listing", "kind", "category", "severity_rank", "urgency_rank", "times_seen",
+                         "first_seen", "last_seen", "resolved_at"), row))
+    
+    def filter_notifiable(self, kind, properties, analyzed_listings=()):
+        """Record this cycle's issues and return {listing: [new/escalated/reopened issues]}.
+        
+        Returned issues are copies tagged with "notice". Open issues of analyzed_listings that
+        were not reported this cycle are marked resolved.
+        """
+        now = time.time()
+        notifiable = {}
+        seen = set()
+        with self._lock, self._conn:
+            for listing, issues in properties.items():
+                for issue in issues:
+                    fingerprint = self.fingerprint(listing, kind, issue)
+                    if fingerprint in seen:
+                        continue
+                    seen.add(fingerprint)
+                    severity_rank, urgency_rank = self._ranks(issue)
+                    row = self._conn.execute(
+                        "SELECT severity_rank, urgency_rank, resolved_at FROM issues WHERE fingerprint = ?", (fingerprint,)
+                    ).fetchone()
+                    
+                    if row is None:
+                        notice = "new"
+                        self._conn.execute(
+                            "INSERT INTO issues (fingerprint, listing, kind, category, severity_rank, urgency_rank, first_seen, last_seen) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (fingerprint, listing, kind, issue.get("category") or issue.get("location") or "general",
+                             severity_rank, urgency_rank, now, now)
+                        )
+                    else:
+                        notice = ("reopened" if row[2] is not None
+                                  else "escalated" if severity_rank > row[0] or urgency_rank > row[1]
+                                  else None)
+                        self._conn.execute(
+                            "UPDATE issues SET severity_rank = MAX(severity_rank, ?), urgency_rank = MAX(urgency_rank, ?), "
+                            "times_seen = times_seen + 1, last_seen = ?, resolved_at = NULL WHERE fingerprint = ?",
+                            (severity_rank, urgency_rank, now, fingerprint)
+                        )
+                    if notice is not None:
+                        notifiable.setdefault(listing, []).append({**issue, "notice": notice})
+            
+            for listing in analyzed_listings:
+                open_fingerprints = self._conn.execute(
+                    "SELECT fingerprint FROM issues WHERE listing = ? AND kind = ? AND resolved_at IS NULL", (listing, kind)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE issues SET resolved_at = ? WHERE fingerprint = ?",
+                    [(now, fingerprint) for (fingerprint,) in open_fingerprints if fingerprint not in seen]
+                )
+        return notifiable
+
+# ============================================================================
+# DURABLE EMAIL OUTBOX AND DISPATCHER
+# ============================================================================
+
+class EmailOutbox:
+    """Persistent queue of outgoing emails; nothing a cycle produces is lost to a failed send.
+    
+    Dispatchers (dashboard, single-mode cycles, --mode dispatcher) claim due rows by moving
+    them to 'sending' with a lease, so concurrent dispatchers never send the same email twice.
+    """
+    
+    def __init__(self, path=OUTBOX_PATH, hold_seconds=OUTBOX_HOLD_SECONDS, lease_seconds=OUTBOX_SEND_LEASE_SECONDS):
+        self.path = path
+        self.hold_seconds = hold_seconds
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recipient TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    html TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+            # Outboxes created before HTML alternatives existed
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+            if "html" not in columns:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN html TEXT")
+            if "lease_expires" not in columns:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN claimed_by TEXT")
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN lease_expires REAL")
+    
+    def enqueue(self, recipient, subject, body, html_body=None):
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (recipient, subject, body, html, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient, subject, body, html_body, now + self.hold_seconds, now)
+            )
+        return cursor.lastrowid
+    
+    def claim_due(self, claimer, now=None):
+        """Lease pending emails whose hold/backoff has elapsed (and claims whose lease ran out), oldest first"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                rows = self._conn.execute(
+                    "SELECT id, recipient, subject, body, html, attempts, created_at FROM outbox "
+                    "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_expires < ?) "
+                    "ORDER BY created_at, id",
+                    (now, now)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'sending', claimed_by = ?, lease_expires = ? WHERE id = ?",
+                    [(claimer, now + self.lease_seconds, row[0]) for row in rows]
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return [dict(zip(("id", "recipient", "subject", "body", "html", "attempts", "created_at"), row)) for row in rows]
+    
+    def mark_sent(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL, lease_expires = NULL WHERE id = ?",
+                [(time.time(), email_id) for email_id in ids]
+            )
+    
+    def mark_failed(self, ids, error, retry_in, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        """Schedule another attempt in retry_in seconds, or give up ('dead') once attempts are used up"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?, lease_expires = NULL, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END WHERE id = ?",
+                [(str(error)[:500], time.time() + retry_in, max_attempts, email_id) for email_id in ids]
+            )
+    
+    def counts(self):
+        """{status: email count}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+class OutboxDispatcher:
+    """Drains the outbox: one digest per recipient, jittered exponential backoff, global send rate"""
+    
+    def __init__(self, outbox: EmailOutbox, email_system: FastEmailSystem, rate_per_minute=EMAIL_SEND_RATE_PER_MINUTE,
+                 digest_max=OUTBOX_DIGEST_MAX_MESSAGES, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 retry_base=OUTBOX_RETRY_BASE_SECONDS, retry_max=OUTBOX_RETRY_MAX_SECONDS):
+        self.outbox = outbox
+        self.email_system = email_system
+        self.bucket = TokenBucket(rate_per_minute)
+        self.digest_max = digest_max
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.dispatcher_id = f"{socket.gethostname()}-{os.getpid()}-{id(self):x}"
+    
+    @staticmethod
+    def compose_digest(emails):
+        """(subject, body, html body or None) for a batch of queued emails to one recipient"""
+        if len(emails) == 1:
+            return emails[0]["subject"], emails[0]["body"], emails[0]["html"]
+        subject = f"📬 ALERT DIGEST - {len(emails)} updates: " + " | ".join(email["subject"] for email in emails[:3])
+        intro = f"{len(emails)} alerts were queued for you since the last dispatch:"
+        sections = [intro + "\n"]
+        html_sections = [f"<p>{intro}</p>"]
+        for index, email in enumerate(emails, 1):
+            queued_at = datetime.fromtimestamp(email["created_at"]).strftime('%Y-%m-%d %H:%M')
+            heading = f"[{index}/{len(emails)}] {email['subject']} (queued {queued_at})"
+            sections.append(f"{'━' * 80}\n{heading}\n{'━' * 80}\n\n{email['body']}\n")
+            html_sections.append(f"<hr><h2>{html.escape(heading)}</h2>" +
+                                 (email["html"] or f"<pre>{html.escape(email['body'])}</pre>"))
+        # Only worth an HTML alternative if at least one queued email had one
+        html_body = "\n".join(html_sections) if any(email["html"] for email in emails) else None
+        return subject, "\n".join(sections), html_body
+    
+    def _retry_delay(self, attempts):
+        return random.uniform(0.5, 1.0) * min(self.retry_max, self.retry_base * (2 ** attempts))
+    
+    async def _send_batch(self, recipient, emails):
+        await asyncio.sleep(self.bucket.reserve(1))
+        ids = [email["id"] for email in emails]
+        subject, body, html_body = self.compose_digest(emails)
+        try:
+            await self.email_system.deliver(subject, body, recipient, html_body)
+        except Exception as e:
+            attempts = max(email["attempts"] for email in emails)
+            self.outbox.mark_failed(ids, e, self._retry_delay(attempts), self.max_attempts)
+            print(f"❌ OUTBOX: {len(emails)} emails to {recipient} failed (attempt {attempts + 1}): {e}")
+            return 0
+        self.outbox.mark_sent(ids)
+        return len(emails)
+    
+    async def run_once(self):
+        """Send everything that is due. Returns {"emails": messages delivered, "sends": SMTP sends}."""
+        by_recipient = {}
+        for email in self.outbox.claim_due(self.dispatcher_id):
+            by_recipient.setdefault(email["recipient"], []).append(email)
+        batches = [(recipient, emails[i:i + self.digest_max])
+                   for recipient, emails in by_recipient.items()
+                   for i in range(0, len(emails), self.digest_max)]
+        if not batches:
+            return {"emails": 0, "sends": 0}
+        
+        start_time = time.time()
+        try:
+            delivered = await asyncio.gather(*(self._send_batch(recipient, emails) for recipient, emails in batches))
+        finally:
+            await self.email_system.close_transport()
+        
+        result = {"emails": sum(delivered), "sends": sum(1 for count in delivered if count)}
+        print(f"📬 OUTBOX: {result['emails']} emails delivered in {result['sends']}/{len(batches)} sends "
+              f"({time.time() - start_time:.1f}s); queue {self.outbox.counts()}")
+        self.email_system.print_transport_stats()
+        return result
+    
+    async def run(self, poll_seconds=OUTBOX_POLL_SECONDS, exit_when_idle=False):
+        print(f"📬 OUTBOX DISPATCHER: draining {self.outbox.path} every {poll_seconds:.0f}s")
+        while True:
+            await self.run_once()
+            counts = self.outbox.counts()
+            if exit_when_idle and not counts.get("pending") and not counts.get("sending"):
+                return
+            await asyncio.sleep(poll_seconds)
+
 # ============================================================================
 # ENHANCED SMART PROPERTY MANAGER - FINAL VERSION
 # ============================================================================
@@ -723,21 +3667,39 @@ Generated by Enhanced AI Property Management System
 class UltraFastSmartPropertyManager:
     """Enhanced property manager with SUPERIOR cleaning detection"""
     
-    def __init__(self):
-        # Core data for all 7 properties
-        self.base_pricing = {name: price for name, url, price in LISTINGS}
+    def __init__(self, on_issue=None, portfolio: Optional[Portfolio] = None, data_dir=None, apify_client_factory=None):
+        """data_dir overrides DATA_DIR for every local store; apify_client_factory swaps in e.g. LocalApifyClient"""
+        # Core data for every listing in the portfolio, keyed by listing id (portfolio.label() for display)
+        self.portfolio = portfolio or load_portfolio()
+        self.base_pricing = self.portfolio.base_pricing()
         self.satisfaction_scores = {}
         self.detailed_analyses = {}
+        self.cycle_analyses = {}  # analyses of this cycle's new reviews only (what the issue index sees)
         self.pricing_decisions = {}
-        self.review_data = None
+        store_path = lambda default: os.path.join(data_dir, os.path.basename(default)) if data_dir else default
+        self.listing_state = ListingStateStore(store_path(LISTING_STATE_PATH))
+        self.review_store = ReviewStore(store_path(REVIEW_STORE_PATH))
+        self.on_issue = on_issue  # streamed issue callback (property label, issue_key, issue)
+        self.triage = CommentTriage() if TRIAGE_ENABLED else None
+        self.deduplicator = CommentDeduplicator()
         
         # Enhanced processing components
-        self.scraper = ParallelScrapingEngine(APIFY_API_KEY)
-        self.gpt_processor = EnhancedGPTProcessor(OPENAI_API_KEY)  # ENHANCED!
-        self.email_system = FastEmailSystem(EMAIL_CONFIG)
+        self.scraper = ParallelScrapingEngine(
+            APIFY_API_KEY,
+            review_store=self.review_store,
+            client_factory=apify_client_factory,
+            webhook_receiver=ScrapeWebhookReceiver() if APIFY_WEBHOOK_URL else None,
+            listing_state=self.listing_state,
+            portfolio=self.portfolio
+        )
+        self.analysis_cache = PersistentCache(store_path(ANALYSIS_CACHE_PATH))
+        self.gpt_processor = EnhancedGPTProcessor(OPENAI_API_KEY, cache=self.analysis_cache)  # ENHANCED!
+        self.issue_index = IssueIndex(store_path(ISSUE_INDEX_PATH)) if ISSUE_SUPPRESSION_ENABLED else None
+        self.outbox = EmailOutbox(store_path(OUTBOX_PATH)) if OUTBOX_ENABLED else None
+        self.email_system = FastEmailSystem(EMAIL_CONFIG, outbox=self.outbox)
         
         print("🚀 ENHANCED SMART PROPERTY MANAGEMENT SYSTEM - FINAL VERSION")
-        print(f"🏠 Portfolio: {len(LISTINGS)} properties (ALL 7 PROPERTIES)")
+        print(f"🏠 Portfolio: {self.portfolio.describe()}")
         print(f"🧹 ENHANCED CLEANING DETECTION: Catches ALL cleaning issues")
         print(f"🔧 COMPREHENSIVE MAINTENANCE DETECTION: Nothing gets missed")
         print(f"⚡ Parallel Processing: Maximum speed with maximum accuracy")
@@ -751,122 +3713,141 @@ class UltraFastSmartPropertyManager:
         print("\n🚀 ENHANCED SMART ANALYSIS STARTING")
         print("=" * 80)
         print(f"🆔 Cycle: {cycle_id}")
-        print(f"🏠 Properties: {len(LISTINGS)} (ALL 7 PROPERTIES)")
+        print(f"🏠 Properties: {len(self.portfolio)}")
         print(f"🧹 Enhanced Cleaning Detection: MAXIMUM SENSITIVITY")
         
-        # STEP 1: PARALLEL SCRAPING
-        print(f"\n⚡ STEP 1: PARALLEL SCRAPING")
+        review_counts, stage_done = await self._run_pipeline()
+        return await self._report_and_dispatch(cycle_id, total_start_time, stage_done, review_counts)
+    
+    def recent_reviews(self, limit=REVIEW_DATA_LIMIT):
+        """Newest stored reviews of the analyzed listings as a DataFrame, loaded on demand"""
+        return self.review_store.query(listings=list(self.detailed_analyses), limit=limit)
+    
+    async def _run_pipeline(self, on_reviews=None):
+        """Scrape → analyze → price every portfolio listing. Returns ({listing_id: new reviews}, stage completion times).
+        
+        Each listing's new reviews go straight to analysis (and to on_reviews(listing_id, reviews)
+        when given); no list of the whole portfolio's reviews is built.
+        """
+        # STEPS 1-3: PIPELINED SCRAPING → ANALYSIS → PRICING
+        print(f"\n⚡ STEPS 1-3: PIPELINED SCRAPING → AI ANALYSIS → PRICING")
         print("-" * 50)
         
-        scraping_start = time.time()
-        all_reviews = await self.scraper.scrape_all_properties_parallel()
-        scraping_time = time.time() - scraping_start
+        pipeline_start = time.time()
+        self.detailed_analyses = {}
+        self.cycle_analyses = {}
+        self.pricing_decisions = {}
+        if self.triage is not None:
+            self.triage.reset_stats()
         
-        if not all_reviews:
-            print("⚠️ No reviews collected")
-            return {"error": "No reviews", "cycle_id": cycle_id}
+        # Each listing moves on as soon as its own scrape is done instead of waiting for the slowest one
+        analysis_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        pricing_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stage_done = {}
         
-        self.review_data = pd.DataFrame(all_reviews)
-        unique_properties = self.review_data['listing'].nunique()
+        async def enqueue_scraped(listing_id, property_reviews):
+            if on_reviews is not None:
+                on_reviews(listing_id, property_reviews)
+            # Listings with nothing new still flow through so their stored analysis is reused
+            if property_reviews or self.listing_state.get(listing_id):
+                await analysis_queue.put((listing_id, property_reviews))
         
-        print(f"✅ SCRAPING COMPLETE: {len(all_reviews)} reviews from {unique_properties} properties in {scraping_time:.1f}s")
+        async def scrape_stage():
+            review_counts = await self.scraper.scrape_all_properties_parallel(on_property=enqueue_scraped)
+            stage_done["scraping"] = time.time() - pipeline_start
+            for _ in range(PIPELINE_ANALYSIS_WORKERS):
+                await analysis_queue.put(None)
+            return review_counts
         
-        # STEP 2: ENHANCED AI ANALYSIS
-        print(f"\n🧠 STEP 2: ENHANCED AI ANALYSIS WITH SUPERIOR DETECTION")
-        print("-" * 50)
+        async def analysis_worker():
+            finished = False
+            while not finished:
+                item = await analysis_queue.get()
+                if item is None:
+                    break
+                # Listings that finish scraping close together still share packed GPT requests
+                batch = [item]
+                linger_until = time.time() + (PIPELINE_PACK_LINGER_SECONDS if PACK_SMALL_LISTINGS else 0)
+                while len(batch) < PACKED_MAX_LISTINGS:
+                    try:
+                        item = await asyncio.wait_for(analysis_queue.get(), max(linger_until - time.time(), 0))
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        finished = True
+                        break
+                    batch.append(item)
+                for listing_id, analysis in (await self._analyze_listings(batch)).items():
+                    await pricing_queue.put((listing_id, analysis))
         
-        gpt_start = time.time()
+        async def analysis_stage():
+            await asyncio.gather(*(analysis_worker() for _ in range(PIPELINE_ANALYSIS_WORKERS)))
+            stage_done["analysis"] = time.time() - pipeline_start
+            await pricing_queue.put(None)
         
-        # Prepare data for enhanced GPT processing
-        property_data_list = []
-        for property_name in self.review_data['listing'].unique():
-            property_data = self.review_data[self.review_data['listing'] == property_name]
-            positive_comments = property_data[property_data['type'] == 'positive']['comment'].tolist()
-            negative_comments = property_data[property_data['type'] == 'negative']['comment'].tolist()
-            
-            property_data_list.append({
-                'name': property_name,
-                'positive_comments': positive_comments,
-                'negative_comments': negative_comments
-            })
-            
-            print(f"   🏠 {property_name}: {len(positive_comments)} positive, {len(negative_comments)} negative comments")
+        async def pricing_stage():
+            while True:
+                item = await pricing_queue.get()
+                if item is None:
+                    break
+                self._compute_pricing(*item)
+            stage_done["pricing"] = time.time() - pipeline_start
+        
+        stages = [asyncio.ensure_future(stage) for stage in (scrape_stage(), analysis_stage(), pricing_stage())]
+        try:
+            review_counts, _, _ = await asyncio.gather(*stages)
+        except Exception:
+            for stage in stages:
+                stage.cancel()
+            raise
+        return review_counts, stage_done
+    
+    async def _report_and_dispatch(self, cycle_id, total_start_time, stage_done, review_counts):
+        """Summaries and team emails for an analyzed + priced cycle. review_counts: {listing_id: new reviews}."""
+        scraping_time = stage_done["scraping"]
+        gpt_time = stage_done["analysis"]
+        pricing_time = stage_done["pricing"]
+        
+        new_reviews = sum(review_counts.values())
+        if not new_reviews and not self.detailed_analyses:
+            print("⚠️ No reviews collected")
+            return {"error": "No reviews", "cycle_id": cycle_id}
         
-        # Execute ENHANCED parallel analysis
-        self.detailed_analyses = await self.gpt_processor.batch_analyze_properties(property_data_list)
+        # Incremental scrapes only return new reviews; the store holds each listing's full history (see recent_reviews)
+        unique_properties = sum(1 for count in review_counts.values() if count)
+        
+        print(f"✅ SCRAPING COMPLETE: {new_reviews} new reviews from {unique_properties} properties at {scraping_time:.1f}s")
+        print(f"💾 REVIEW STORE: {self.review_store.count()} reviews persisted in total")
+        if self.triage is not None:
+            triage_stats = self.triage.stats
+            print(f"   🚦 TRIAGE: {triage_stats['comments_sent']} comments to GPT, {triage_stats['comments_skipped']} scored locally; "
+                  f"{triage_stats['properties_skipped']} properties skipped GPT entirely")
         
         # Extract satisfaction scores and display enhanced results
         total_cleaning_issues = 0
         total_maintenance_issues = 0
         
-        for property_name, analysis in self.detailed_analyses.items():
-            self.satisfaction_scores[property_name] = analysis.get('satisfaction_score', 80)
+        for listing_id, analysis in self.detailed_analyses.items():
+            self.satisfaction_scores[listing_id] = analysis.get('satisfaction_score', 80)
             cleaning_count = len(analysis.get('cleaning_issues', []))
             maintenance_count = len(analysis.get('maintenance_issues', []))
             total_cleaning_issues += cleaning_count
             total_maintenance_issues += maintenance_count
             
-            print(f"   ✅ {property_name}: {cleaning_count} cleaning + {maintenance_count} maintenance issues")
+            print(f"   ✅ {self.portfolio.label(listing_id)}: {cleaning_count} cleaning + {maintenance_count} maintenance issues")
         
-        gpt_time = time.time() - gpt_start
-        print(f"✅ ENHANCED ANALYSIS COMPLETE: {len(self.detailed_analyses)} properties analyzed in {gpt_time:.1f}s")
+        print(f"✅ ENHANCED ANALYSIS COMPLETE: {len(self.detailed_analyses)} properties analyzed by {gpt_time:.1f}s")
         print(f"🧹 TOTAL CLEANING ISSUES DETECTED: {total_cleaning_issues}")
         print(f"🔧 TOTAL MAINTENANCE ISSUES DETECTED: {total_maintenance_issues}")
+        print(f"⚡ ANALYSIS CACHE: {self.analysis_cache.hits} hits, {self.analysis_cache.misses} misses")
+        limiter_stats = self.gpt_processor.rate_limiter.stats
+        print(f"🚦 OPENAI LIMITER: {limiter_stats['requests']} requests, {limiter_stats['rate_limited']} rate-limited, {limiter_stats['retries']} retries")
         
-        # STEP 3: FAST PRICING DECISIONS
-        print(f"\n💰 STEP 3: SMART PRICING CALCULATIONS")
-        print("-" * 50)
-        
-        pricing_start = time.time()
-        total_revenue_impact = 0
-        
-        for property_name, analysis in self.detailed_analyses.items():
-            base_price = self.base_pricing.get(property_name, 200)
-            satisfaction = analysis.get('satisfaction_score', 80)
-            gpt_recommendation = analysis.get('recommended_price_change', 0)
-            
-            # Enhanced pricing calculation based on issues
-            cleaning_issues = len(analysis.get('cleaning_issues', []))
-            maintenance_issues = len(analysis.get('maintenance_issues', []))
-            total_issues = cleaning_issues + maintenance_issues
-            
-            # Base pricing adjustment
-            if satisfaction >= 90:
-                price_change_pct = 0.10
-            elif satisfaction >= 85:
-                price_change_pct = 0.05
-            elif satisfaction >= 75:
-                price_change_pct = 0.0
-            elif satisfaction >= 65:
-                price_change_pct = -0.05
-            else:
-                price_change_pct = -0.10
-            
-            # Issue penalty
-            issue_penalty = -(total_issues * 0.02)  # 2% per issue
-            
-            # Combine factors
-            final_change = price_change_pct + issue_penalty + (gpt_recommendation / 100 * 0.2)
-            final_change = max(-0.25, min(0.25, final_change))
-            
-            new_price = int(base_price * (1 + final_change))
-            price_change = new_price - base_price
-            
-            self.pricing_decisions[property_name] = {
-                'base_price': base_price,
-                'new_price': new_price,
-                'price_change': price_change,
-                'percentage_change': final_change * 100,
-                'satisfaction_score': satisfaction,
-                'cleaning_issues': cleaning_issues,
-                'maintenance_issues': maintenance_issues
-            }
-            
-            if abs(price_change) >= 5:
-                total_revenue_impact += price_change
-        
-        pricing_time = time.time() - pricing_start
-        print(f"✅ PRICING COMPLETE: {len(self.pricing_decisions)} decisions in {pricing_time:.1f}s")
+        total_revenue_impact = sum(
+            decision['price_change'] for decision in self.pricing_decisions.values()
+            if abs(decision['price_change']) >= 5
+        )
+        print(f"✅ PRICING COMPLETE: {len(self.pricing_decisions)} decisions by {pricing_time:.1f}s")
         
         # STEP 4: ENHANCED EMAIL DISPATCH
         print(f"\n📧 STEP 4: ENHANCED EMAIL DISPATCH")
@@ -883,10 +3864,28 @@ class UltraFastSmartPropertyManager:
                                 for name, analysis in self.detailed_analyses.items() 
                                 if analysis.get("maintenance_issues")}
         
+        if self.issue_index is not None:
+            # Only issues the teams have not heard about (or that got worse / came back) are emailed again.
+            # The index sees just this cycle's new reviews: listings without any keep their open issues as they are.
+            fresh_cleaning = {listing_id: analysis.get("cleaning_issues", []) for listing_id, analysis in self.cycle_analyses.items()}
+            fresh_maintenance = {listing_id: analysis.get("maintenance_issues", []) for listing_id, analysis in self.cycle_analyses.items()}
+            detected = (sum(len(issues) for issues in fresh_cleaning.values()),
+                        sum(len(issues) for issues in fresh_maintenance.values()))
+            analyzed = list(self.cycle_analyses)
+            cleaning_properties = self.issue_index.filter_notifiable("cleaning", fresh_cleaning, analyzed)
+            maintenance_properties = self.issue_index.filter_notifiable("maintenance", fresh_maintenance, analyzed)
+            print(f"   🔎 ISSUE INDEX: {sum(len(issues) for issues in cleaning_properties.values())}/{detected[0]} cleaning and "
+                  f"{sum(len(issues) for issues in maintenance_properties.values())}/{detected[1]} maintenance issues are new or escalated")
+        
         significant_pricing = {name: decision 
                              for name, decision in self.pricing_decisions.items() 
                              if abs(decision.get("price_change", 0)) >= 5}
         
+        # State is keyed by listing id; the teams read listing names
+        cleaning_properties = self.portfolio.labelled(cleaning_properties)
+        maintenance_properties = self.portfolio.labelled(maintenance_properties)
+        significant_pricing = self.portfolio.labelled(significant_pricing)
+        
         print(f"   📧 Cleaning email to Mourad: {len(cleaning_properties)} properties with {sum(len(issues) for issues in cleaning_properties.values())} issues")
         print(f"   📧 Maintenance email to Ahmed: {len(maintenance_properties)} properties with {sum(len(issues) for issues in maintenance_properties.values())} issues")
         print(f"   📧 Pricing email to Ahmed: {len(significant_pricing)} pricing adjustments")
@@ -903,18 +3902,18 @@ class UltraFastSmartPropertyManager:
         print(f"\n🏁 ENHANCED ANALYSIS COMPLETE")
         print("=" * 80)
         print(f"⚡ TOTAL TIME: {total_time:.1f} seconds")
-        print(f"🔄 Scraping Time: {scraping_time:.1f}s")
-        print(f"🧠 Enhanced Analysis Time: {gpt_time:.1f}s")
-        print(f"💰 Pricing Time: {pricing_time:.1f}s")
+        print(f"🔄 Scraping Done At: {scraping_time:.1f}s")
+        print(f"🧠 Enhanced Analysis Done At: {gpt_time:.1f}s (overlaps scraping)")
+        print(f"💰 Pricing Done At: {pricing_time:.1f}s (overlaps analysis)")
         print(f"📧 Email Time: {email_time:.1f}s")
         print("")
-        print(f"🏠 Properties Processed: {len(self.satisfaction_scores)}/7 (ALL PROPERTIES)")
+        print(f"🏠 Properties Processed: {len(self.satisfaction_scores)}/{len(self.portfolio)}")
         print(f"📊 Average Satisfaction: {sum(self.satisfaction_scores.values()) / len(self.satisfaction_scores):.1f}%" if self.satisfaction_scores else "N/A")
         print(f"🧹 CLEANING ISSUES DETECTED: {total_cleaning_issues} (Enhanced Detection)")
         print(f"🔧 MAINTENANCE ISSUES DETECTED: {total_maintenance_issues} (Enhanced Detection)")
         print(f"💰 Pricing Adjustments: {len(significant_pricing)} properties")
         print(f"💵 Revenue Impact: ${total_revenue_impact:+.0f} per night")
-        print(f"📧 Emails Sent: {emails_sent}")
+        print(f"📧 Emails {'Queued' if self.outbox is not None else 'Sent'}: {emails_sent}")
         print("")
         print(f"🎯 DETECTION IMPROVEMENT: Enhanced AI catches {total_cleaning_issues + total_maintenance_issues} total issues")
         print(f"📧 EMAIL ROUTING: Cleaning→Mourad, Maintenance→Ahmed, Pricing→Ahmed")
@@ -935,18 +3934,574 @@ class UltraFastSmartPropertyManager:
             "revenue_impact": total_revenue_impact,
             "emails_sent": emails_sent,
             "enhancement_note": f"Enhanced detection found {total_cleaning_issues + total_maintenance_issues} total issues",
-            "email_routing": "Cleaning→Mourad, Maintenance→Ahmed, Pricing→Ahmed"
+            "email_routing": "Cleaning→Mourad, Maintenance→Ahmed, Pricing→Ahmed",
+            "triage": dict(self.triage.stats) if self.triage is not None else None
+        }
+    
+    def use_portfolio(self, portfolio):
+        """Point the manager (and its scraper) at another set of listings, e.g. one shard"""
+        self.portfolio = portfolio
+        self.base_pricing = portfolio.base_pricing()
+        self.scraper.portfolio = portfolio
+    
+    async def dispatch_outbox(self):
+        """Send whatever the outbox has due (outside cycle timing); no-op without an outbox"""
+        if self.outbox is None:
+            return None
+        return await OutboxDispatcher(self.outbox, self.email_system).run_once()
+    
+    async def close(self):
+        """Release loop-bound resources (webhook receiver, pooled HTTP session)"""
+        if self.scraper.webhook_receiver is not None:
+            await self.scraper.webhook_receiver.stop()
+        await SHARED_HTTP_CLIENT.close_async()
+    
+    def _prepare_listing(self, listing_id, property_reviews):
+        """Reviews past the listing's watermark, near-duplicates collapsed.
+        
+        Returns (property_data or None when the stored analysis can be reused, state, watermark, new_comment_count).
+        """
+        state = self.listing_state.get(listing_id)
+        new_reviews, watermark = ListingStateStore.split_new_reviews(property_reviews, state)
+        
+        if not new_reviews and state and state.get("analysis"):
+            print(f"   ⏭️ {self.portfolio.label(listing_id)}: no new reviews since {state['latest_review_date'] or 'last cycle'}, reusing stored analysis")
+            return None, state, watermark, 0
+        
+        positive_comments = [r['comment'] for r in new_reviews if r['type'] == 'positive']
+        negative_comments = [r['comment'] for r in new_reviews if r['type'] == 'negative']
+        new_comment_count = len(positive_comments) + len(negative_comments)
+        
+        # Near-duplicate complaints collapse to one representative with a count
+        positive_representatives, positive_counts = self.deduplicator.collapse(positive_comments)
+        negative_representatives, negative_counts = self.deduplicator.collapse(negative_comments)
+        comment_counts = {**positive_counts}
+        for comment, count in negative_counts.items():
+            comment_counts[comment] = comment_counts.get(comment, 0) + count
+        
+        property_data = {
+            'name': listing_id,
+            'positive_comments': positive_representatives,
+            'negative_comments': negative_representatives,
+            'comment_counts': comment_counts
+        }
+        
+        collapsed = new_comment_count - len(positive_representatives) - len(negative_representatives)
+        print(f"   🏠 {self.portfolio.label(listing_id)}: {len(positive_comments)} new positive, {len(negative_comments)} new negative comments ({len(property_reviews)} scraped, {collapsed} near-duplicates collapsed)")
+        return property_data, state, watermark, new_comment_count
+    
+    async def _analyze_listings(self, scraped_listings):
+        """Analyze a group of freshly scraped listings [(listing_id, reviews)] and persist the results. Returns {listing_id: analysis}."""
+        analyses = {}
+        property_data_list, prepared = [], {}
+        for listing_id, property_reviews in scraped_listings:
+            property_data, state, watermark, new_count = self._prepare_listing(listing_id, property_reviews)
+            if property_data is None:
+                analyses[listing_id] = self.detailed_analyses[listing_id] = state["analysis"]
+                continue
+            property_data_list.append(property_data)
+            prepared[listing_id] = (state, watermark, new_count)
+        
+        if not property_data_list:
+            return analyses
+        
+        # Local triage: only comments likely to carry issues go to GPT, the rest are scored locally
+        gpt_property_data_list, local_parts = property_data_list, {}
+        if self.triage is not None:
+            gpt_property_data_list, local_parts = self.triage.triage(property_data_list)
+        
+        # Execute ENHANCED parallel analysis on new reviews only
+        on_issue = None
+        if self.on_issue is not None:
+            on_issue = lambda listing_id, issue_key, issue: self.on_issue(self.portfolio.label(listing_id), issue_key, issue)
+        gpt_analyses = await self.gpt_processor.batch_analyze_properties(gpt_property_data_list, on_issue=on_issue) if gpt_property_data_list else {}
+        gpt_weights = {p['name']: len(p['positive_comments']) + len(p['negative_comments']) for p in gpt_property_data_list}
+        
+        for property_data in property_data_list:
+            listing_id = property_data['name']
+            parts = []
+            if listing_id in gpt_analyses:
+                parts.append((gpt_analyses[listing_id], gpt_weights[listing_id]))
+            if listing_id in local_parts:
+                parts.append(local_parts[listing_id])
+            new_analysis = CommentDeduplicator.expand_issue_counts(
+                combine_weighted_analyses(parts) or self.gpt_processor._empty_analysis(),
+                property_data['comment_counts']
+            )
+            
+            # Merge new issues into the listing's stored analysis and advance its watermark
+            state, watermark, new_count = prepared[listing_id]
+            stored_analysis = state.get("analysis") if state else None
+            stored_count = state.get("comments_analyzed", 0) if state else 0
+            
+            if new_count:
+                self.cycle_analyses[listing_id] = new_analysis
+            merged = self._merge_incremental_analysis(stored_analysis, stored_count, new_analysis, new_count)
+            self.listing_state.save(listing_id, {
+                **watermark,
+                "analysis": merged,
+                "comments_analyzed": stored_count + new_count
+            })
+            analyses[listing_id] = self.detailed_analyses[listing_id] = merged
+        
+        return analyses
+    
+    def _compute_pricing(self, listing_id, analysis):
+        """Smart pricing decision for one analyzed listing"""
+        base_price = self.base_pricing.get(listing_id, DEFAULT_BASE_PRICE)
+        satisfaction = analysis.get('satisfaction_score', 80)
+        gpt_recommendation = analysis.get('recommended_price_change', 0)
+        
+        # Enhanced pricing calculation based on issues
+        cleaning_issues = len(analysis.get('cleaning_issues', []))
+        maintenance_issues = len(analysis.get('maintenance_issues', []))
+        total_issues = cleaning_issues + maintenance_issues
+        
+        # Base pricing adjustment
+        if satisfaction >= 90:
+            price_change_pct = 0.10
+        elif satisfaction >= 85:
+            price_change_pct = 0.05
+        elif satisfaction >= 75:
+            price_change_pct = 0.0
+        elif satisfaction >= 65:
+            price_change_pct = -0.05
+        else:
+            price_change_pct = -0.10
+        
+        # Issue penalty
+        issue_penalty = -(total_issues * 0.02)  # 2% per issue
+        
+        # Combine factors
+        final_change = price_change_pct + issue_penalty + (gpt_recommendation / 100 * 0.2)
+        final_change = max(-0.25, min(0.25, final_change))
+        
+        new_price = int(base_price * (1 + final_change))
+        price_change = new_price - base_price
+        
+        self.pricing_decisions[listing_id] = {
+            'base_price': base_price,
+            'new_price': new_price,
+            'price_change': price_change,
+            'percentage_change': final_change * 100,
+            'satisfaction_score': satisfaction,
+            'cleaning_issues': cleaning_issues,
+            'maintenance_issues': maintenance_issues
         }
+        return self.pricing_decisions[listing_id]
+    
+    def _merge_incremental_analysis(self, stored, stored_count, update, update_count):
+        """Fold an analysis of new reviews into the accumulated analysis of a listing.
+        
+        The new batch goes first, so a repeated complaint keeps its latest wording and the
+        oldest issues are the ones dropped past MERGED_MAX_ISSUES. History counts as at most
+        MERGED_HISTORY_MAX_WEIGHT comments, so scores keep following recent reviews.
+        """
+        if not stored or stored_count <= 0:
+            return update
+        if update_count <= 0:
+            return stored
+        
+        merged = combine_weighted_analyses([(update, update_count), (stored, min(stored_count, MERGED_HISTORY_MAX_WEIGHT))])
+        for issue_key in ("cleaning_issues", "maintenance_issues"):
+            merged[issue_key] = merged[issue_key][:MERGED_MAX_ISSUES]
+        merged["guest_sentiment"] = update.get("guest_sentiment", stored.get("guest_sentiment", "neutral"))
+        return merged
+
+# ============================================================================
+# SHARDED CYCLES: SQLITE LEASE QUEUE, WORKERS AND COORDINATOR
+# ============================================================================
+
+class ShardQueue:
+    """Shared SQLite queue of listing shards, leased to workers with heartbeats and bounded retries.
+    
+    Works across processes on one machine, or across machines when the file sits on storage
+    with working SQLite locking; the file uses a rollback journal, since WAL only works on a
+    single host. The queue file is the only storage the nodes share: each shard carries its
+    listings' state (watermark + accumulated analysis) to the worker, and the result carries
+    the updated state and new reviews back to the coordinator, which owns the listing state,
+    review store, issue index and outbox. Worker analysis caches stay node-local; a miss only
+    costs a GPT request. Unfinished shards of a cycle older than max_age_seconds (a timed-out
+    or crashed coordinator) expire instead of keeping idle-exiting workers busy.
+    """
+    
+    def __init__(self, path=WORK_QUEUE_PATH, lease_seconds=SHARD_LEASE_SECONDS, max_attempts=SHARD_MAX_ATTEMPTS,
+                 max_age_seconds=CYCLE_TIMEOUT_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path, journal_mode="DELETE")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS shards (
+                cycle_id TEXT NOT NULL,
+                shard_id INTEGER NOT NULL,
+                listings TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (cycle_id, shard_id)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_shards_status ON shards(status, created_at)")
+        self._conn.commit()
+    
+    def enqueue_cycle(self, cycle_id, shards, states=None):
+        """shards: list of listing lists; states: {listing_id: listing state}.
+        
+        Listings and their state travel with the shard so workers need no portfolio file or shared state.
+        """
+        now = time.time()
+        states = states or {}
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO shards (cycle_id, shard_id, listings, created_at) VALUES (?, ?, ?, ?)",
+                [(cycle_id, shard_id, json.dumps([{**listing._asdict(), "state": states.get(listing.listing_id)}
+                                                  for listing in shard], ensure_ascii=False), now)
+                 for shard_id, shard in enumerate(shards)]
+            )
+            self._conn.commit()
+    
+    def claim(self, worker_id):
+        """Lease the oldest pending (or lease-expired) shard. Returns a shard dict or None."""
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                # Cycles nobody waits for any more are not worth working on
+                self._conn.execute(
+                    "UPDATE shards SET status = 'expired', error = 'cycle abandoned', lease_expires = NULL "
+                    "WHERE status IN ('pending', 'leased') AND created_at < ?",
+                    (now - self.max_age_seconds,)
+                )
+                # Shards whose workers keep dying are given up on instead of looping forever
+                self._conn.execute(
+                    "UPDATE shards SET status = 'failed', error = 'lease expired too many times' "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    "SELECT cycle_id, shard_id, listings, attempts FROM shards "
+                    "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY created_at, shard_id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                        "WHERE cycle_id = ? AND shard_id = ?",
+                        (worker_id, now + self.lease_seconds, row[0], row[1])
+                    )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        
+        if row is None:
+            return None
+        records = json.loads(row[2])
+        states = {record["listing_id"]: record.pop("state", None) for record in records}
+        listings = [Listing(**{**record, "tags": tuple(record.get("tags") or ())}) for record in records]
+        return {"cycle_id": row[0], "shard_id": row[1], "listings": listings, "states": states, "attempt": row[3] + 1}
+    
+    def _update_owned(self, sql, params, cycle_id, shard_id, worker_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                sql + " WHERE cycle_id = ? AND shard_id = ? AND worker = ? AND status = 'leased'",
+                (*params, cycle_id, shard_id, worker_id)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+    
+    def heartbeat(self, cycle_id, shard_id, worker_id):
+        """Extend the lease; False means the shard was reclaimed by someone else"""
+        return self._update_owned("UPDATE shards SET lease_expires = ?", (time.time() + self.lease_seconds,),
+                                  cycle_id, shard_id, worker_id)
+    
+    def complete(self, cycle_id, shard_id, worker_id, result):
+        return self._update_owned("UPDATE shards SET status = 'done', result = ?, lease_expires = NULL",
+                                  (json.dumps(result, default=str),), cycle_id, shard_id, worker_id)
+    
+    def fail(self, cycle_id, shard_id, worker_id, error):
+        """Give the shard back for another attempt, or mark it failed once attempts are used up"""
+        return self._update_owned(
+            "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL, error = ?",
+            (self.max_attempts, str(error)[:500]), cycle_id, shard_id, worker_id
+        )
+    
+    def cancel_cycle(self, cycle_id, reason="cycle abandoned"):
+        """Expire a cycle's unfinished shards; workers holding a lease lose it at their next heartbeat"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE shards SET status = 'expired', error = ?, lease_expires = NULL "
+                "WHERE cycle_id = ? AND status IN ('pending', 'leased')",
+                (reason, cycle_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+    
+    def progress(self, cycle_id):
+        """{status: shard count} for one cycle"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE cycle_id = ? GROUP BY status", (cycle_id,)
+            ).fetchall()
+        return dict(rows)
+    
+    def has_open_work(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM shards WHERE status IN ('pending', 'leased') AND created_at >= ? LIMIT 1",
+                (time.time() - self.max_age_seconds,)
+            ).fetchone()
+        return row is not None
+    
+    def results(self, cycle_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM shards WHERE cycle_id = ? AND status = 'done'", (cycle_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+class ShardWorker:
+    """Leases shards, scrapes and analyzes their listings, and writes the analyses back.
+    
+    The worker's listing state is overwritten from each shard before it runs, so state left
+    over from earlier shards (or other coordinators) never leaks into a cycle.
+    """
+    
+    def __init__(self, queue: ShardQueue, worker_id=None, manager: Optional[UltraFastSmartPropertyManager] = None):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.manager = manager or UltraFastSmartPropertyManager()
+    
+    async def run(self, exit_when_idle=False, idle_poll_seconds=5):
+        print(f"👷 WORKER {self.worker_id}: waiting for shards in {self.queue.path}")
+        processed = 0
+        try:
+            while True:
+                shard = self.queue.claim(self.worker_id)
+                if shard is None:
+                    # Leased shards may still come back if their worker dies, so only leave once all are settled
+                    if exit_when_idle and not self.queue.has_open_work():
+                        break
+                    await asyncio.sleep(idle_poll_seconds)
+                    continue
+                await self.process(shard)
+                processed += 1
+        finally:
+            await self.manager.close()
+        print(f"👷 WORKER {self.worker_id}: done, {processed} shards processed")
+        return processed
+    
+    async def process(self, shard):
+        cycle_id, shard_id = shard["cycle_id"], shard["shard_id"]
+        print(f"👷 WORKER {self.worker_id}: shard {shard_id} of {cycle_id} ({len(shard['listings'])} listings, attempt {shard['attempt']})")
+        
+        lease_lost = asyncio.Event()
+        
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(self.queue.lease_seconds / 3)
+                if not self.queue.heartbeat(cycle_id, shard_id, self.worker_id):
+                    lease_lost.set()
+                    return
+        
+        heartbeat_task = asyncio.ensure_future(heartbeat())
+        try:
+            self.manager.use_portfolio(Portfolio(shard["listings"]))
+            listing_ids = [listing.listing_id for listing in shard["listings"]]
+            for listing_id in listing_ids:
+                self.manager.listing_state.replace(listing_id, shard["states"].get(listing_id))
+            # The coordinator's review store only learns about this shard's reviews through the result
+            shard_reviews = []
+            review_counts, stage_done = await self.manager._run_pipeline(
+                on_reviews=lambda listing_id, reviews: shard_reviews.extend(reviews)
+            )
+            result = {
+                "analyses": self.manager.detailed_analyses,
+                "cycle_analyses": self.manager.cycle_analyses,
+                "states": {listing_id: self.manager.listing_state.get(listing_id) for listing_id in listing_ids},
+                "reviews": shard_reviews,
+                "review_counts": review_counts,
+                "stage_done": stage_done,
+                "worker": self.worker_id
+            }
+        except Exception as e:
+            print(f"❌ WORKER {self.worker_id}: shard {shard_id} failed: {e}")
+            self.queue.fail(cycle_id, shard_id, self.worker_id, e)
+            return False
+        finally:
+            heartbeat_task.cancel()
+        
+        if lease_lost.is_set() or not self.queue.complete(cycle_id, shard_id, self.worker_id, result):
+            print(f"⚠️ WORKER {self.worker_id}: lease on shard {shard_id} was lost, result discarded")
+            return False
+        return True
+
+class ShardCoordinator:
+    """Splits the portfolio into shards, waits for workers, then prices and emails the whole cycle"""
+    
+    def __init__(self, queue: ShardQueue, manager: Optional[UltraFastSmartPropertyManager] = None, shard_size=SHARD_SIZE):
+        self.queue = queue
+        self.manager = manager or UltraFastSmartPropertyManager()
+        self.shard_size = shard_size
+    
+    def enqueue(self, cycle_id):
+        listings = self.manager.portfolio.listings
+        shards = [listings[i:i + self.shard_size] for i in range(0, len(listings), self.shard_size)]
+        states = {listing.listing_id: self.manager.listing_state.get(listing.listing_id) for listing in listings}
+        self.queue.enqueue_cycle(cycle_id, shards, states)
+        return len(shards)
+    
+    async def run_cycle(self, timeout=CYCLE_TIMEOUT_SECONDS, poll_seconds=2, on_enqueued=None):
+        total_start_time = time.time()
+        cycle_id = f"sharded_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"  # unique even for back-to-back cycles
+        shard_count = self.enqueue(cycle_id)
+        
+        print("\n🚀 SHARDED ANALYSIS STARTING")
+        print("=" * 80)
+        print(f"🆔 Cycle: {cycle_id}")
+        print(f"🏠 Properties: {len(self.manager.portfolio)} in {shard_count} shards of up to {self.shard_size}")
+        print(f"🗂️ Queue: {self.queue.path}")
+        if on_enqueued is not None:
+            await on_enqueued(cycle_id)
+        
+        last_progress = None
+        while True:
+            progress = self.queue.progress(cycle_id)
+            if progress != last_progress:
+                print(f"   📊 Shards: {progress.get('done', 0)} done, {progress.get('leased', 0)} in progress, "
+                      f"{progress.get('pending', 0)} pending, {progress.get('failed', 0)} failed")
+                last_progress = progress
+            if progress.get("done", 0) + progress.get("failed", 0) + progress.get("expired", 0) >= shard_count:
+                break
+            if time.time() - total_start_time > timeout:
+                expired = self.queue.cancel_cycle(cycle_id, f"cycle timed out after {timeout}s")
+                print(f"⚠️ Cycle timed out after {timeout}s; {expired} unfinished shards expired, reporting the shards that finished")
+                break
+            await asyncio.sleep(poll_seconds)
+        analysis_done = time.time() - total_start_time
+        
+        # Aggregate: every worker wrote its listings' merged analyses; pricing and emails happen once, here
+        self.manager.detailed_analyses = {}
+        self.manager.cycle_analyses = {}
+        self.manager.pricing_decisions = {}
+        review_counts = {}
+        for result in self.queue.results(cycle_id):
+            self.manager.detailed_analyses.update(result["analyses"])
+            self.manager.cycle_analyses.update(result.get("cycle_analyses", {}))
+            # Workers' stores are node-local: their state and new reviews land in the coordinator's
+            for listing_id, state in result.get("states", {}).items():
+                if state is not None:
+                    self.manager.listing_state.save(listing_id, state)
+            self.manager.review_store.upsert_reviews(result.get("reviews", []))
+            review_counts.update(result["review_counts"])
+        for listing_id, analysis in self.manager.detailed_analyses.items():
+            self.manager._compute_pricing(listing_id, analysis)
+        
+        stage_done = {"scraping": analysis_done, "analysis": analysis_done, "pricing": time.time() - total_start_time}
+        report = await self.manager._report_and_dispatch(cycle_id, total_start_time, stage_done, review_counts)
+        report["shards"] = self.queue.progress(cycle_id)
+        return report
 
 # ============================================================================
 # USAGE
 # ============================================================================
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Enhanced smart property management cycle")
+    parser.add_argument("--mode", choices=["single", "coordinator", "worker", "dispatcher", "smtp-benchmark", "render-benchmark"],
+                        default="single",
+                        help="single: whole cycle in this process; coordinator/worker: sharded over a shared queue; "
+                             "dispatcher: drain the email outbox; smtp-benchmark: email transports against a local SMTP sink; "
+                             "render-benchmark: email templating for thousands of issues")
+    parser.add_argument("--queue", default=WORK_QUEUE_PATH, help="shared SQLite work queue file")
+    parser.add_argument("--portfolio", help="CSV/JSON/SQLite portfolio source (defaults to PORTFOLIO_SOURCE)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="coordinator: also start this many worker processes on this machine")
+    parser.add_argument("--worker-id", help="worker: name used for leases (default host-pid)")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="worker/dispatcher: stop once the queue has no open shards / the outbox has nothing pending")
+    parser.add_argument("--no-dispatch", action="store_true",
+                        help="single/coordinator: leave queued emails to a separate --mode dispatcher process")
+    parser.add_argument("--messages", type=int, default=500, help="smtp-benchmark: messages per transport")
+    parser.add_argument("--issues", type=int, default=5000, help="render-benchmark: issues per email")
+    return parser.parse_args(argv)
+
+async def stop_local_workers(workers, grace_seconds=WORKER_EXIT_GRACE_SECONDS):
+    """Give local worker processes grace_seconds to exit on their own, then terminate (and finally kill) the rest.
+    
+    Also runs when the coordinator fails or is cancelled, so no local worker outlives it.
+    """
+    if not workers:
+        return
+    try:
+        await asyncio.wait([asyncio.ensure_future(worker.wait()) for worker in workers], timeout=grace_seconds)
+    finally:
+        running = [worker for worker in workers if worker.returncode is None]
+        for worker in running:
+            print(f"⚠️ Stopping local worker {worker.pid}")
+            worker.terminate()
+        if running:
+            await asyncio.wait([asyncio.ensure_future(worker.wait()) for worker in running], timeout=10)
+            for worker in running:
+                if worker.returncode is None:
+                    worker.kill()
+
+async def main(args=None):
     """Run the enhanced system"""
-    manager = UltraFastSmartPropertyManager()
-    result = await manager.run_ultra_fast_analysis()
-    return result
+    args = args or parse_args([])
+    
+    if args.mode == "smtp-benchmark":
+        return await benchmark_smtp(messages=args.messages)
+    
+    if args.mode == "render-benchmark":
+        return benchmark_email_rendering(issues=args.issues)
+    
+    if args.mode == "worker":
+        return await ShardWorker(ShardQueue(args.queue), worker_id=args.worker_id).run(exit_when_idle=args.exit_when_idle)
+    
+    if args.mode == "dispatcher":
+        email_system = FastEmailSystem(EMAIL_CONFIG)
+        return await OutboxDispatcher(EmailOutbox(), email_system).run(exit_when_idle=args.exit_when_idle)
+    
+    manager = UltraFastSmartPropertyManager(portfolio=load_portfolio(args.portfolio) if args.portfolio else None)
+    try:
+        if args.mode == "single":
+            result = await manager.run_ultra_fast_analysis()
+            if not args.no_dispatch:
+                await manager.dispatch_outbox()
+            return result
+        
+        workers = []
+        
+        async def start_local_workers(cycle_id):
+            for i in range(args.local_workers):
+                workers.append(await asyncio.create_subprocess_exec(
+                    sys.executable, os.path.abspath(__file__), "--mode", "worker", "--queue", args.queue,
+                    "--worker-id", f"{socket.gethostname()}-local-{i + 1}", "--exit-when-idle"
+                ))
+            if workers:
+                print(f"👷 Started {len(workers)} local worker processes")
+        
+        coordinator = ShardCoordinator(ShardQueue(args.queue), manager=manager, shard_size=args.shard_size)
+        try:
+            result = await coordinator.run_cycle(on_enqueued=start_local_workers)
+        finally:
+            await stop_local_workers(workers)
+        if not args.no_dispatch:
+            await manager.dispatch_outbox()
+        return result
+    finally:
+        await manager.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))